@@ -0,0 +1,196 @@
+"""
+Admission control for scrape jobs.
+
+Jobs wait here until they can run without overloading the host:
+  - jobs the result cache can answer ("cached") always go before ones that
+    need a live search ("live"), and don't need a browser or memory headroom
+  - a live Selenium job needs a free browser slot (one per pooled driver)
+  - a live job needs ADMISSION_SCRAPE_MB of available memory on top of
+    ADMISSION_MIN_FREE_MB, counting jobs started in the last few seconds as
+    already using theirs; one live job may always run so nothing starves
+Within each priority, clients are served round-robin, so one client queueing
+many jobs cannot hold everyone else back. When the queue (or a client's share
+of it) is full, put() raises QueueFull with a Retry-After estimate.
+"""
+from __future__ import annotations
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Optional
+
+ADMISSION_MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", "50"))
+ADMISSION_MAX_PER_CLIENT = int(os.environ.get("ADMISSION_MAX_PER_CLIENT", "5"))
+ADMISSION_SCRAPE_MB = int(os.environ.get("ADMISSION_SCRAPE_MB", "300"))
+ADMISSION_MIN_FREE_MB = int(os.environ.get("ADMISSION_MIN_FREE_MB", "256"))
+RAMP_UP = 10.0  # seconds a just-started live job is assumed not to have allocated its memory yet
+PRIORITIES = ("cached", "live")
+
+
+def available_memory_mb() -> Optional[float]:
+    """MemAvailable from /proc/meminfo, or None where that is not available."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class QueueFull(Exception):
+    def __init__(self, message: str, reason: str, retry_after: int):
+        super().__init__(message)
+        self.reason = reason  # "queue_full" | "client_limit"
+        self.retry_after = retry_after
+
+
+@dataclass
+class Ticket:
+    item: Any
+    client: str
+    priority: str  # "cached" | "live"
+    browser: bool
+    enqueued: float = field(default_factory=time.monotonic)
+    started: Optional[float] = None
+
+
+class Admission:
+    def __init__(self, browser_slots: int = 2, max_queue: int = ADMISSION_MAX_QUEUE,
+                 max_per_client: int = ADMISSION_MAX_PER_CLIENT, scrape_mb: float = ADMISSION_SCRAPE_MB,
+                 min_free_mb: float = ADMISSION_MIN_FREE_MB,
+                 memory: Callable[[], Optional[float]] = available_memory_mb,
+                 on_admit: Optional[Callable[[Ticket, float], None]] = None):
+        """on_admit(ticket, waited_seconds) is called (under the lock, keep it cheap) whenever a job starts."""
+        self.browser_slots = browser_slots
+        self.max_queue = max_queue
+        self.max_per_client = max_per_client
+        self.scrape_mb = scrape_mb
+        self.min_free_mb = min_free_mb
+        self._memory = memory
+        self._on_admit = on_admit
+        self._queues: Dict[str, "OrderedDict[str, Deque[Ticket]]"] = {p: OrderedDict() for p in PRIORITIES}
+        self._per_client: Dict[str, int] = {}
+        self._queued = 0
+        self._running: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        self._browsers = 0
+        self._live_starts: Deque[float] = deque()
+        self._avg_run = 10.0  # seconds, moving average of finished jobs
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def _retry_after(self, ahead: int) -> int:
+        slots = max(1, sum(self._running.values()))
+        return max(1, min(300, math.ceil(self._avg_run * (ahead + 1) / slots)))
+
+    def put(self, item: Any, client: str, cached: bool = False, browser: bool = True) -> Ticket:
+        """Queue item for `client`; raises QueueFull when there is no room for it."""
+        with self._cond:
+            if self._queued >= self.max_queue:
+                raise QueueFull("Server is busy, try again later", "queue_full", self._retry_after(self._queued))
+            mine = self._per_client.get(client, 0)
+            if mine >= self.max_per_client:
+                raise QueueFull(f"Too many queued requests from this client ({mine})", "client_limit",
+                                self._retry_after(mine))
+            ticket = Ticket(item, client, "cached" if cached else "live", browser and not cached)
+            self._queues[ticket.priority].setdefault(client, deque()).append(ticket)
+            self._per_client[client] = mine + 1
+            self._queued += 1
+            self._cond.notify()
+            return ticket
+
+    def _memory_ok(self, now: float) -> bool:
+        if self._running["live"] == 0:
+            return True
+        free = self._memory()
+        if free is None:
+            return True
+        while self._live_starts and now - self._live_starts[0] > RAMP_UP:
+            self._live_starts.popleft()
+        return free - self.scrape_mb * len(self._live_starts) >= self.scrape_mb + self.min_free_mb
+
+    def _pick(self) -> Optional[Ticket]:
+        memory_ok = None  # read at most once per pick
+        for priority in PRIORITIES:
+            clients = self._queues[priority]
+            for client in list(clients):
+                head = clients[client][0]
+                if priority == "live":
+                    if head.browser and self._browsers >= self.browser_slots:
+                        continue
+                    if memory_ok is None:
+                        memory_ok = self._memory_ok(time.monotonic())
+                    if not memory_ok:
+                        continue
+                ticket = clients[client].popleft()
+                if clients[client]:
+                    clients.move_to_end(client)  # round-robin: this client goes to the back
+                else:
+                    del clients[client]
+                return ticket
+        return None
+
+    def get(self) -> Optional[Ticket]:
+        """Block until a queued item may start and return its ticket; None once closed."""
+        with self._cond:
+            while not self._closed:
+                ticket = self._pick()
+                if ticket is not None:
+                    break
+                # Memory is re-checked periodically; slots freed by done() wake us directly
+                self._cond.wait(1.0 if self._queued else None)
+            else:
+                return None
+            self._queued -= 1
+            left = self._per_client[ticket.client] - 1
+            if left:
+                self._per_client[ticket.client] = left
+            else:
+                del self._per_client[ticket.client]
+            ticket.started = time.monotonic()
+            self._running[ticket.priority] += 1
+            if ticket.browser:
+                self._browsers += 1
+            if ticket.priority == "live":
+                self._live_starts.append(ticket.started)
+            if self._on_admit is not None:
+                self._on_admit(ticket, ticket.started - ticket.enqueued)
+            return ticket
+
+    def done(self, ticket: Ticket):
+        """Release the slots held by a ticket returned from get()."""
+        with self._cond:
+            self._running[ticket.priority] -= 1
+            if ticket.browser:
+                self._browsers -= 1
+            self._avg_run = 0.8 * self._avg_run + 0.2 * (time.monotonic() - ticket.started)
+            self._cond.notify_all()
+
+    def drain(self) -> list:
+        """Remove and return every queued item, e.g. to cancel them on shutdown."""
+        with self._cond:
+            items = [t.item for clients in self._queues.values() for q in clients.values() for t in q]
+            for clients in self._queues.values():
+                clients.clear()
+            self._per_client.clear()
+            self._queued = 0
+            return items
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            out: Dict[str, float] = {}
+            for p in PRIORITIES:
+                out[f"queued_{p}"] = sum(len(q) for q in self._queues[p].values())
+                out[f"running_{p}"] = self._running[p]
+            out["clients_waiting"] = len(self._per_client)
+            out["browsers_in_use"] = self._browsers
+            out["avg_run_seconds"] = round(self._avg_run, 3)
+            return out
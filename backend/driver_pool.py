@@ -0,0 +1,164 @@
+"""
+Pool of pre-warmed Chrome drivers parked on the Old Question Papers search page.
+
+Each driver is created once, navigated to the search form, and then handed out
+per request. After a request it is sent back to the search form in the
+background; drivers that crash, fail a health check, or reach `max_uses` are
+quit and replaced with a fresh one so the pool always holds `size` slots.
+"""
+from __future__ import annotations
+import queue
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+
+def _tpd():
+    # Selenium is imported on first use so the backend can start without a browser
+    import tiet_papers_downloader
+    return tiet_papers_downloader
+
+
+class PooledDriver:
+    def __init__(self, driver, search_url: str):
+        self.driver = driver
+        self.search_url = search_url
+        self.uses = 0
+
+
+class DriverPool:
+    def __init__(self, size: int = 2, max_uses: int = 25, headless: Optional[bool] = None,
+                 retry_delay: float = 5.0):
+        self.size = size
+        self.max_uses = max_uses
+        self.headless = headless  # None: use tiet_papers_downloader.HEADLESS
+        self.retry_delay = retry_delay  # seconds before retrying a driver that failed to start
+        self._idle: "queue.Queue[PooledDriver]" = queue.Queue()
+        self._all = set()
+        self._timers = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        # Warm-up and recycling happen off the request path
+        self._workers = ThreadPoolExecutor(max_workers=max(1, size), thread_name_prefix="driver-pool")
+
+    def start(self):
+        for _ in range(self.size):
+            self._workers.submit(self._spawn)
+
+    def _spawn(self):
+        """Create a driver, park it on the search page and make it available."""
+        try:
+            tpd = _tpd()
+            headless = tpd.HEADLESS if self.headless is None else self.headless
+            drv = tpd.make_driver(tpd.DOWNLOAD_DIR, headless)
+        except Exception as e:
+            print(f"Driver pool: failed to start driver: {e}")
+            self._retry_later()
+            return
+        try:
+            _tpd().open_search_page(drv)
+        except Exception as e:
+            print(f"Driver pool: failed to open search page: {e}")
+            self._quit(drv)
+            self._retry_later()
+            return
+        pd = PooledDriver(drv, drv.current_url)
+        with self._lock:
+            if self._closed:
+                self._quit(drv)
+                return
+            self._all.add(pd)
+        self._idle.put(pd)
+
+    def _retry_later(self):
+        """Spawn again after retry_delay, unless the pool is closed by then (close() cancels the timer)."""
+        with self._lock:
+            if self._closed:
+                return
+            timer = threading.Timer(self.retry_delay, lambda: self._respawn(timer))
+            timer.daemon = True
+            self._timers.add(timer)
+        timer.start()
+
+    def _respawn(self, timer: threading.Timer):
+        with self._lock:
+            self._timers.discard(timer)
+            if self._closed:
+                return
+            try:
+                self._workers.submit(self._spawn)
+            except RuntimeError:
+                pass  # executor already shut down
+
+    def _quit(self, drv):
+        try:
+            drv.quit()
+        except Exception:
+            pass
+
+    def _discard(self, pd: PooledDriver):
+        with self._lock:
+            self._all.discard(pd)
+        self._quit(pd.driver)
+        if not self._closed:
+            self._spawn()
+
+    def _healthy(self, pd: PooledDriver) -> bool:
+        try:
+            tpd = _tpd()
+            return (tpd.find_course_code_input(pd.driver) is not None
+                    or tpd.find_course_name_input(pd.driver) is not None)
+        except Exception:
+            return False
+
+    def _recycle(self, pd: PooledDriver):
+        """Return a used driver to the search form, or replace it if it is worn out or broken."""
+        if pd.uses >= self.max_uses:
+            self._discard(pd)
+            return
+        try:
+            pd.driver.get(pd.search_url)
+            _tpd().WebDriverWait(pd.driver, 15).until(lambda d: self._healthy(pd))
+        except Exception:
+            self._discard(pd)
+            return
+        self._idle.put(pd)
+
+    @contextmanager
+    def checkout(self, timeout: float = 60):
+        """
+        Borrow a driver that is already on the search page.
+        Raises queue.Empty if none becomes free within `timeout` seconds.
+        """
+        while True:
+            pd = self._idle.get(timeout=timeout)
+            if self._healthy(pd):
+                break
+            self._workers.submit(self._discard, pd)
+        pd.uses += 1
+        try:
+            yield pd.driver
+        except Exception:
+            # The driver may be in any state after a crash; don't hand it out again
+            self._workers.submit(self._discard, pd)
+            raise
+        else:
+            self._workers.submit(self._recycle, pd)
+
+    def stats(self) -> dict:
+        with self._lock:
+            live = len(self._all)
+        return {"size": self.size, "live": live, "idle": self._idle.qsize()}
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            drivers = list(self._all)
+            self._all.clear()
+            timers, self._timers = self._timers, set()
+        for timer in timers:
+            timer.cancel()
+        for pd in drivers:
+            self._quit(pd.driver)
+        self._workers.shutdown(wait=False)
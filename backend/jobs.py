@@ -0,0 +1,185 @@
+"""
+In-process job queue for scrape requests.
+
+Jobs run on a fixed set of worker threads so the event loop never blocks on a
+scrape; which queued job starts next is decided by an Admission controller.
+Submitting a job that is identical to one still queued or running returns the
+existing job instead of starting a second execution. Finished jobs are kept
+for `keep_for` seconds so clients can poll for the result.
+
+Progress events reported by the job (see papers.run)
+are recorded on the job and can be followed live with Job.follow().
+"""
+from __future__ import annotations
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Dict, Hashable, List, Optional, Tuple
+
+from admission import Admission
+
+
+@dataclass
+class Job:
+    id: str
+    key: Hashable
+    params: dict
+    status: str = "queued"  # queued -> running -> done | failed
+    output: str = ""
+    result: Optional[dict] = None
+    error: str = ""
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    future: Optional[Future] = field(default=None, repr=False)
+    run: Optional[Callable[..., dict]] = field(default=None, repr=False)
+    events: List[Tuple[str, dict]] = field(default_factory=list, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    _waiters: list = field(default_factory=list, repr=False)
+
+    def emit(self, name: str, data: dict):
+        """Record an event (called from worker threads) and wake any followers."""
+        with self._lock:
+            self.events.append((name, data))
+            waiters = list(self._waiters)
+        for loop, ev in waiters:
+            loop.call_soon_threadsafe(ev.set)
+
+    def finish(self, status: str, result: Optional[dict] = None, error: str = ""):
+        """Set the final state and emit it as the last event, atomically for followers."""
+        output = (result or {}).get("output", "")
+        with self._lock:
+            self.output = output
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+            self.status = status
+            self.events.append((status, {"output": output, "error": error}))
+            waiters = list(self._waiters)
+        for loop, ev in waiters:
+            loop.call_soon_threadsafe(ev.set)
+
+    async def follow(self) -> AsyncIterator[Tuple[str, dict]]:
+        """Yield every event from the start, then new ones as they happen, until the job finishes."""
+        ev = asyncio.Event()
+        entry = (asyncio.get_running_loop(), ev)
+        with self._lock:
+            self._waiters.append(entry)
+        try:
+            i = 0
+            while True:
+                ev.clear()
+                with self._lock:
+                    new = self.events[i:]
+                    finished = self.finished_at is not None
+                for item in new:
+                    yield item
+                i += len(new)
+                if finished and i >= len(self.events):
+                    return
+                if not new:
+                    await ev.wait()
+        finally:
+            with self._lock:
+                self._waiters.remove(entry)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "params": self.params,
+            "output": self.output,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    def __init__(self, run: Callable[..., dict], workers: int = 4, keep_for: float = 3600,
+                 admission: Optional[Admission] = None):
+        """
+        `run(on_event=..., **params)` performs one job and returns a JSON-able dict with an "output" message.
+        Jobs start in the order `admission` lets them (see admission.py), on `workers` threads.
+        """
+        self._run = run
+        self.keep_for = keep_for
+        self.admission = admission or Admission()
+        self._jobs: Dict[str, Job] = {}
+        self._inflight: Dict[Hashable, Job] = {}
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._worker, name=f"job_{i}", daemon=True) for i in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, key: Hashable, run: Optional[Callable[..., dict]] = None, client: str = "",
+               cached: bool = False, browser: bool = True, **params) -> Job:
+        """
+        Queue run(**params) (the manager's default `run` unless given), or return the in-flight job with the
+        same key. `client`, `cached` and `browser` are passed to Admission.put(), which may raise QueueFull.
+        """
+        with self._lock:
+            self._prune()
+            job = self._inflight.get(key)
+            if job is not None:
+                return job
+            job = Job(uuid.uuid4().hex, key, params, run=run, future=Future())
+            self.admission.put(job, client, cached, browser)
+            self._jobs[job.id] = job
+            self._inflight[key] = job
+            return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _worker(self):
+        while True:
+            ticket = self.admission.get()
+            if ticket is None:
+                return
+            try:
+                self._execute(ticket.item)
+            finally:
+                self.admission.done(ticket)
+
+    def _execute(self, job: Job) -> Job:
+        cancelled = not job.future.set_running_or_notify_cancel()
+        try:
+            if cancelled:
+                job.finish("failed", error="Cancelled")
+                return job
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.finish("done", result=(job.run or self._run)(on_event=job.emit, **job.params))
+            except Exception as e:
+                job.finish("failed", error=str(e) or type(e).__name__)
+        finally:
+            with self._lock:
+                if self._inflight.get(job.key) is job:
+                    del self._inflight[job.key]
+        job.future.set_result(job)
+        return job
+
+    def _prune(self):
+        cutoff = time.time() - self.keep_for
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            out: Dict[str, int] = {}
+            for job in self._jobs.values():
+                out[job.status] = out.get(job.status, 0) + 1
+            return out
+
+    def shutdown(self):
+        self.admission.close()
+        for job in self.admission.drain():
+            job.future.cancel()
@@ -1,9 +1,33 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-import subprocess
+import asyncio
+import json
+import os
+import sys
+import queue
 import pathlib
 import time
+import uuid
+
+# The scraper lives next to the backend; import it in-process so drivers can be reused
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "exam-parser"))
+import papers
+import metrics
+import export
+from driver_pool import DriverPool
+from result_cache import default_result_cache
+from catalog import CatalogIndex
+from jobs import Job, JobManager
+from admission import Admission, QueueFull
+
+DRIVER_POOL_SIZE = int(os.environ.get("DRIVER_POOL_SIZE", "2"))
+DRIVER_MAX_USES = int(os.environ.get("DRIVER_MAX_USES", "25"))
+DRIVER_CHECKOUT_TIMEOUT = 120
+# Cache hits and HTTP-engine searches don't need a browser, so allow more jobs than drivers
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", str(DRIVER_POOL_SIZE * 2)))
+# Take the client from X-Forwarded-For (only when behind a trusted reverse proxy)
+TRUST_PROXY = os.environ.get("ADMISSION_TRUST_PROXY", "0") == "1"
 
 app = FastAPI()
 
@@ -15,25 +39,280 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+pool = DriverPool(size=DRIVER_POOL_SIZE, max_uses=DRIVER_MAX_USES)
+catalog_index = CatalogIndex()
+
+@app.on_event("startup")
+def start_pool():
+    pool.start()
+
+@app.on_event("shutdown")
+def stop_pool():
+    jobs.shutdown()
+    pool.close()
+
+def scrape(by_code: bool, query: str, merge: bool, exam_filter: str, engine: str, on_event=None) -> dict:
+    try:
+        result = papers.run(query, "code" if by_code else "name", exam_filter, merge, engine,
+                            checkout=lambda: pool.checkout(timeout=DRIVER_CHECKOUT_TIMEOUT), on_event=on_event)
+        return result.to_dict()
+    except queue.Empty:
+        raise RuntimeError("All browsers are busy, try again shortly")
+
+admission = Admission(browser_slots=DRIVER_POOL_SIZE,
+                      on_admit=lambda t, waited: metrics.observe("tiet_admission_wait_seconds", waited,
+                                                                  priority=t.priority))
+jobs = JobManager(scrape, workers=JOB_WORKERS, admission=admission)
+
+def refresh_job(task, on_event=None) -> dict:
+    task()
+    return {"output": "Result cache refreshed"}
+
+def run_refresh(key, task):
+    """
+    Stale-while-revalidate refreshes go through the job queue like any other live search, so they take a
+    browser slot instead of checking out a pooled driver behind admission control's back.
+    """
+    jobs.submit(("refresh",) + tuple(key), run=refresh_job, client="(refresh)", task=task)
+
+if default_result_cache() is not None:
+    default_result_cache().runner = run_refresh
+
+def client_id(request: Request) -> str:
+    if TRUST_PROXY and request.headers.get("x-forwarded-for"):
+        return request.headers["x-forwarded-for"].split(",")[0].strip()
+    return request.client.host if request.client else ""
+
+def cached_search(by_code: bool, query: str) -> bool:
+    """Whether the result cache can answer this search without touching the site."""
+    cache = default_result_cache()
+    return cache is not None and cache.has(by_code, query)
+
+def busy_response(e: QueueFull) -> JSONResponse:
+    metrics.inc("tiet_admission_rejected_total", reason=e.reason)
+    return JSONResponse({"error": str(e)}, status_code=429, headers={"Retry-After": str(e.retry_after)})
+
+def submit_job(data: dict, client: str = "") -> Job:
+    """
+    Queue a scrape for a /run-script style request body; identical in-flight requests share one job.
+    Raises QueueFull when admission control turns it away.
+    """
+    by_code = str(data.get("option")) != "2"
+    value = str(data.get("value") or "").strip()
+    query = papers.normalize_course_code(value) if by_code else value
+    merge = str(data.get("mergePdfs", False)).lower() == "true"
+    exam_filter = str(data.get("examFilter", "all"))
+    engine = str(data.get("engine", papers.SEARCH_ENGINE)).lower()
+    key = (by_code, query.lower(), merge, exam_filter)
+    return jobs.submit(key, client=client, cached=cached_search(by_code, query), browser=engine != "http",
+                       by_code=by_code, query=query, merge=merge, exam_filter=exam_filter, engine=engine)
+
+def scrape_batch(queries: list, merge: bool, exam_filter: str, engine: str, on_event=None) -> dict:
+    try:
+        result = papers.run_batch(queries, exam_filter, merge, engine,
+                                  checkout=lambda: pool.checkout(timeout=DRIVER_CHECKOUT_TIMEOUT), on_event=on_event)
+        return result.to_dict()
+    except queue.Empty:
+        raise RuntimeError("All browsers are busy, try again shortly")
+
+def submit_batch(data: dict, client: str = "") -> Job:
+    """Queue a batch; `courses` holds course codes or {"option": "1"|"2", "value": ...} objects."""
+    queries = []
+    for item in data.get("courses") or []:
+        if isinstance(item, dict):
+            by_code = str(item.get("option")) != "2"
+            value = str(item.get("value") or "").strip()
+        else:
+            by_code, value = True, str(item).strip()
+        if value:
+            queries.append((papers.normalize_course_code(value) if by_code else value, "code" if by_code else "name"))
+    merge = str(data.get("mergePdfs", False)).lower() == "true"
+    exam_filter = str(data.get("examFilter", "all"))
+    engine = str(data.get("engine", papers.SEARCH_ENGINE)).lower()
+    key = ("batch", tuple((q.lower(), by) for q, by in queries), merge, exam_filter)
+    cached = all(cached_search(by == "code", q) for q, by in queries)
+    return jobs.submit(key, run=scrape_batch, client=client, cached=cached, browser=engine != "http",
+                       queries=queries, merge=merge, exam_filter=exam_filter, engine=engine)
+
 @app.post("/run-script")
 async def run_script(request: Request):
     data = await request.json()
-    option = data.get("option")
-    value = data.get("value")
-    mergePdfs = data.get("mergePdfs", False)
-    examFilter = data.get("examFilter", "all")
-    script_path = pathlib.Path("../exam-parser/tiet_papers_downloader.py").resolve()
-    import os
-    env = os.environ.copy()
-    env["PYTHONIOENCODING"] = "utf-8"
-    try:
-        cmd = ["python", str(script_path), str(option), str(value), str(mergePdfs), str(examFilter)]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120, env=env)
-        output = result.stdout
-        error = result.stderr
-    except Exception as e:
-        return JSONResponse({"error": str(e)}, status_code=500)
-    return JSONResponse({"output": output, "error": error})
+    try:
+        job = submit_job(data, client_id(request))
+    except QueueFull as e:
+        return busy_response(e)
+    await asyncio.wrap_future(job.future)
+    if job.status == "failed":
+        return JSONResponse({"error": job.error}, status_code=500)
+    return JSONResponse({**job.result, "error": ""})
+
+@app.post("/jobs")
+async def create_job(request: Request):
+    data = await request.json()
+    try:
+        job = submit_job(data, client_id(request))
+    except QueueFull as e:
+        return busy_response(e)
+    return JSONResponse({"id": job.id, "status": job.status}, status_code=202)
+
+@app.post("/batch")
+async def create_batch(request: Request):
+    """Search and download many courses in one job; follow it with /jobs/{id} or /jobs/{id}/events."""
+    data = await request.json()
+    if not data.get("courses"):
+        return JSONResponse({"error": "No courses given"}, status_code=400)
+    try:
+        job = submit_batch(data, client_id(request))
+    except QueueFull as e:
+        return busy_response(e)
+    return JSONResponse({"id": job.id, "status": job.status}, status_code=202)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "Unknown job"}, status_code=404)
+    return job.to_dict()
+
+async def sse_events(job: Job):
+    yield f"event: job\ndata: {json.dumps({'id': job.id})}\n\n"
+    async for name, data in job.follow():
+        yield f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(job: Job) -> StreamingResponse:
+    return StreamingResponse(sse_events(job), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-Sent Events for a job: everything so far, then live events until it finishes."""
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "Unknown job"}, status_code=404)
+    return sse_response(job)
+
+@app.get("/stream")
+async def stream(request: Request, option: str = "1", value: str = "", mergePdfs: bool = False,
+                 examFilter: str = "all", engine: str = None):
+    """Start (or join) a job and stream its events; usable directly from an EventSource."""
+    data = {"option": option, "value": value, "mergePdfs": mergePdfs, "examFilter": examFilter}
+    if engine:
+        data["engine"] = engine
+    try:
+        return sse_response(submit_job(data, client_id(request)))
+    except QueueFull as e:
+        return busy_response(e)
+
+def search_for_export(by_code: bool, query: str, exam_filter: str, engine: str, on_event=None) -> dict:
+    """Search job for /export; the records go back to the endpoint in the job result."""
+    try:
+        records = papers.search(query, "code" if by_code else "name", exam_filter, engine,
+                                checkout=lambda: pool.checkout(timeout=DRIVER_CHECKOUT_TIMEOUT), on_event=on_event)
+    except queue.Empty:
+        raise RuntimeError("All browsers are busy, try again shortly")
+    except papers.SearchTimeout as e:
+        return {"output": str(e), "timeout": True, "records": None}
+    return {"output": "", "timeout": False, "records": records}
+
+def export_job(task, on_event=None) -> dict:
+    return {"output": "", "value": task()}
+
+def submit_export(client: str, task) -> Job:
+    """
+    Queue the download half of an export as one of the client's jobs, so it waits for admission and
+    counts against the client's share of the queue like the search before it. Raises QueueFull.
+    """
+    return jobs.submit(("export-download", uuid.uuid4().hex), run=export_job, client=client, browser=False,
+                       task=task)
+
+@app.get("/export")
+async def export_papers(request: Request, option: str = "1", value: str = "", examFilter: str = "all",
+                        format: str = "zip", engine: str = None):
+    """
+    Search, then stream the papers to the client: `format=zip` sends a ZIP whose entries are written
+    as each download lands; `format=pdf` sends the merged PDF once it is ready.
+    """
+    if format not in {"zip", "pdf"}:
+        return JSONResponse({"error": "format must be zip or pdf"}, status_code=400)
+    by_code = option != "2"
+    value = value.strip()
+    if not value:
+        return JSONResponse({"error": "No course given"}, status_code=400)
+    query = papers.normalize_course_code(value) if by_code else value
+    engine = (engine or papers.SEARCH_ENGINE).lower()
+    client = client_id(request)
+    try:
+        job = jobs.submit(("export", by_code, query.lower(), examFilter), run=search_for_export,
+                          client=client, cached=cached_search(by_code, query), browser=engine != "http",
+                          by_code=by_code, query=query, exam_filter=examFilter, engine=engine)
+    except QueueFull as e:
+        return busy_response(e)
+    await asyncio.wrap_future(job.future)
+    if job.status == "failed":
+        return JSONResponse({"error": job.error}, status_code=503)
+    if job.result["timeout"]:
+        return JSONResponse({"error": job.result["output"]}, status_code=504)
+    records = job.result["records"]
+    if not records:
+        return JSONResponse({"error": "No results found."}, status_code=404)
+    session = records.session or papers.default_engine().warm()
+    try:
+        if format == "zip":
+            exp = export.export_zip(records, session, query, start=lambda download: submit_export(client, download))
+        else:
+            job = submit_export(client, lambda: export.export_merged(records, session, query))
+    except QueueFull as e:
+        return busy_response(e)
+    if format == "pdf":
+        await asyncio.wrap_future(job.future)
+        if job.status == "failed":
+            return JSONResponse({"error": job.error}, status_code=503)
+        exp = job.result["value"]
+        if exp is None:
+            return JSONResponse({"error": "No papers could be downloaded"}, status_code=502)
+    # No Content-Length: the body is sent chunked as it is produced
+    return StreamingResponse(exp.chunks, media_type=exp.media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{exp.filename}"',
+                                      "X-Accel-Buffering": "no"})
+
+@app.delete("/cache/results")
+async def invalidate_results(option: str = None, value: str = None):
+    """Drop cached search results: one query, every query of one kind, or everything."""
+    cache = default_result_cache()
+    if cache is None:
+        return {"removed": 0}
+    by_code = None if option is None else option != "2"
+    query = None
+    if value is not None and by_code is not None:
+        query = papers.normalize_course_code(value) if by_code else value
+    return {"removed": cache.invalidate(by_code, query)}
+
+@app.get("/catalog/search")
+def catalog_search(q: str, by: str = "code", examFilter: str = "all", semester: str = None,
+                   yearFrom: int = None, yearTo: int = None, limit: int = 500):
+    """Answer code, prefix or fuzzy name searches from the locally crawled catalog."""
+    catalog_index.reload(force=False)
+    query = papers.normalize_course_code(q) if by in {"code", "prefix"} else q
+    years = None if yearFrom is None and yearTo is None else (yearFrom, yearTo)
+    t0 = time.perf_counter()
+    records = catalog_index.search(query, by, limit, exam_type=None if examFilter == "all" else examFilter,
+                                   semester=semester, years=years)
+    return {"records": records, "count": len(records),
+            "elapsed_us": round((time.perf_counter() - t0) * 1e6, 1), "catalog_size": len(catalog_index)}
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus text format: phase latency histograms, counters and current pool/job gauges."""
+    counts = jobs.counts()
+    for status in ("queued", "running", "done", "failed"):
+        metrics.set_gauge("tiet_jobs", counts.get(status, 0), status=status)
+    for name, value in pool.stats().items():
+        metrics.set_gauge("tiet_driver_pool", value, state=name)
+    stats = admission.stats()
+    for priority in ("cached", "live"):
+        metrics.set_gauge("tiet_admission_queue", stats[f"queued_{priority}"], priority=priority)
+        metrics.set_gauge("tiet_admission_running", stats[f"running_{priority}"], priority=priority)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/")
 def root():
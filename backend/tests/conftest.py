@@ -0,0 +1,11 @@
+import os
+import pathlib
+import sys
+import tempfile
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+# main.py imports the scraper, which reads these at import time: keep caches out of the user's home
+_scratch = pathlib.Path(tempfile.mkdtemp(prefix="tiet-backend-tests-"))
+os.environ.setdefault("TIET_CACHE_DIR", str(_scratch / "cache"))
+os.environ.setdefault("TIET_DOWNLOAD_DIR", str(_scratch / "downloads"))
@@ -0,0 +1,120 @@
+import threading
+
+import pytest
+
+from admission import Admission, QueueFull
+from jobs import JobManager
+
+
+def order(admission, n):
+    """Items of the next n admitted tickets, finishing each one straight away."""
+    out = []
+    for _ in range(n):
+        ticket = admission.get()
+        out.append(ticket.item)
+        admission.done(ticket)
+    return out
+
+
+def get_in_thread(admission):
+    got = []
+    t = threading.Thread(target=lambda: got.append(admission.get()), daemon=True)
+    t.start()
+    return t, got
+
+
+def test_cached_jobs_go_first():
+    admission = Admission()
+    admission.put("live", "a")
+    admission.put("cached", "b", cached=True)
+    assert order(admission, 2) == ["cached", "live"]
+
+
+def test_clients_are_served_round_robin():
+    admission = Admission()
+    for item in ("a1", "a2", "a3"):
+        admission.put(item, "a", cached=True)
+    admission.put("b1", "b", cached=True)
+    assert order(admission, 4) == ["a1", "b1", "a2", "a3"]
+
+
+def test_live_job_waits_for_a_browser_slot():
+    admission = Admission(browser_slots=1, memory=lambda: None)
+    admission.put("x", "a")
+    admission.put("y", "b")
+    admission.put("z", "c", browser=False)
+    first = admission.get()
+    assert first.item == "x"
+    # y needs the busy browser; z doesn't, so it goes ahead
+    assert order(admission, 1) == ["z"]
+    t, got = get_in_thread(admission)
+    t.join(0.2)
+    assert not got
+    admission.done(first)
+    t.join(2)
+    assert got[0].item == "y"
+    assert admission.stats()["browsers_in_use"] == 1
+
+
+def test_live_job_waits_for_memory():
+    admission = Admission(browser_slots=4, scrape_mb=300, min_free_mb=256, memory=lambda: 700)
+    admission.put("x", "a")
+    admission.put("y", "b")
+    first = admission.get()  # one live job may always run
+    admission.put("c", "c", cached=True)
+    # 700 MB free, minus the just-started job's 300, leaves less than 300 + 256
+    assert order(admission, 1) == ["c"]
+    t, got = get_in_thread(admission)
+    t.join(0.2)
+    assert not got
+    admission.done(first)
+    t.join(2)
+    assert got[0].item == "y"
+
+
+def test_full_queue_raises_with_retry_after():
+    admission = Admission(max_queue=2)
+    admission.put(1, "a")
+    admission.put(2, "b")
+    with pytest.raises(QueueFull) as e:
+        admission.put(3, "c")
+    assert e.value.reason == "queue_full"
+    # Two jobs ahead at the initial 10s estimate, nothing running yet
+    assert e.value.retry_after == 30
+
+
+def test_client_limit_only_refuses_that_client():
+    admission = Admission(max_per_client=2)
+    admission.put(1, "a")
+    admission.put(2, "a")
+    with pytest.raises(QueueFull) as e:
+        admission.put(3, "a")
+    assert e.value.reason == "client_limit"
+    assert e.value.retry_after >= 1
+    admission.put(4, "b")
+    assert admission.stats()["clients_waiting"] == 2
+
+
+def test_job_manager_refuses_past_the_queue_limit():
+    release = threading.Event()
+    started = threading.Event()
+
+    def run(on_event, n):
+        started.set()
+        release.wait(5)
+        return {"output": str(n)}
+
+    jobs = JobManager(run, workers=1, admission=Admission(max_queue=1))
+    try:
+        running = jobs.submit("one", client="a", n=1)
+        assert started.wait(2)
+        queued = jobs.submit("two", client="a", n=2)
+        assert jobs.submit("two", client="b", n=2) is queued  # same key joins the queued job
+        with pytest.raises(QueueFull):
+            jobs.submit("three", client="b", n=3)
+        release.set()
+        assert queued.future.result(5).result == {"output": "2"}
+        assert running.future.result(5).status == "done"
+    finally:
+        release.set()
+        jobs.shutdown()
@@ -0,0 +1,55 @@
+import threading
+import time
+import types
+
+import driver_pool
+from driver_pool import DriverPool
+
+
+def failing_browser(monkeypatch):
+    attempts = []
+
+    def make_driver(download_dir, headless):
+        attempts.append(time.monotonic())
+        raise RuntimeError("chrome not found")
+    monkeypatch.setattr(driver_pool, "_tpd", lambda: types.SimpleNamespace(
+        HEADLESS=True, DOWNLOAD_DIR=None, make_driver=make_driver))
+    return attempts
+
+
+def test_failed_start_is_retried(monkeypatch):
+    attempts = failing_browser(monkeypatch)
+    pool = DriverPool(size=1, retry_delay=0.05)
+    pool.start()
+    deadline = time.monotonic() + 2
+    while len(attempts) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    pool.close()
+    assert len(attempts) >= 3
+
+
+def test_close_cancels_pending_retry(monkeypatch):
+    attempts = failing_browser(monkeypatch)
+    errors = []
+    monkeypatch.setattr(threading, "excepthook", errors.append)
+    pool = DriverPool(size=1, retry_delay=0.2)
+    pool.start()
+    deadline = time.monotonic() + 2
+    while not pool._timers and time.monotonic() < deadline:
+        time.sleep(0.01)
+    timer = next(iter(pool._timers))
+    pool.close()
+    timer.join(1)
+    time.sleep(0.3)
+    assert len(attempts) == 1
+    assert not pool._timers
+    assert errors == []
+
+
+def test_retry_firing_after_close_is_a_no_op(monkeypatch):
+    failing_browser(monkeypatch)
+    pool = DriverPool(size=1)
+    pool.close()
+    pool._respawn(threading.Timer(0, lambda: None))  # must not submit to the shut-down executor
+    pool._retry_later()
+    assert not pool._timers
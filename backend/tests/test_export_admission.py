@@ -0,0 +1,64 @@
+import io
+import zipfile
+
+import pytest
+import requests
+from fastapi.testclient import TestClient
+
+import main
+import export
+import papers
+from admission import QueueFull
+from downloads import DownloadResult
+
+RECORDS = [{"course_code": "UCS503", "course_name": "Software Engineering", "year": str(2020 + i),
+            "semester": "ODD", "exam_type": "EST", "download_href": f"https://example.org/{i}.pdf"}
+           for i in range(2)]
+
+
+@pytest.fixture
+def site(monkeypatch):
+    """The search finds RECORDS and each download writes a small file; returns the keys of queued jobs."""
+    def search(on_event=None, **params):
+        return {"output": "", "timeout": False, "records": papers.SearchResults(RECORDS, requests.Session())}
+    monkeypatch.setattr(main, "search_for_export", search)
+
+    def download_many(session, jobs, on_result=None, **kw):
+        for job in jobs:
+            job.dest.parent.mkdir(parents=True, exist_ok=True)
+            job.dest.write_bytes(b"%PDF-1.4 " + job.url.encode())
+            if on_result:
+                on_result(DownloadResult(job, True, job.dest.stat().st_size))
+    monkeypatch.setattr(export, "download_many", download_many)
+
+    keys = []
+    put = main.jobs.admission.put
+
+    def record_put(job, client, cached=False, browser=True):
+        keys.append((job.key[0], client, browser))
+        return put(job, client, cached, browser)
+    monkeypatch.setattr(main.jobs.admission, "put", record_put)
+    return keys
+
+
+def test_zip_downloads_run_as_a_job_of_the_client(site):
+    r = TestClient(main.app).get("/export", params={"value": "UCS503", "examFilter": "EST-zip"})
+    assert r.status_code == 200
+    names = zipfile.ZipFile(io.BytesIO(r.content)).namelist()
+    assert len(names) == 2 and all(n.endswith(".pdf") for n in names)
+    assert site == [("export", "testclient", True), ("export-download", "testclient", False)]
+
+
+def test_download_turned_away_by_admission_is_a_429(site, monkeypatch):
+    put = main.jobs.admission.put
+
+    def refuse_downloads(job, client, cached=False, browser=True):
+        if job.key[0] == "export-download":
+            raise QueueFull("Too many queued requests from this client (5)", "client_limit", 7)
+        return put(job, client, cached, browser)
+    monkeypatch.setattr(main.jobs.admission, "put", refuse_downloads)
+    client = TestClient(main.app)
+    for fmt in ("zip", "pdf"):
+        r = client.get("/export", params={"value": "UCS503", "examFilter": f"EST-{fmt}-busy", "format": fmt})
+        assert r.status_code == 429 and r.headers["Retry-After"] == "7"
+    assert not list(export.EXPORT_DIR.glob("export-*"))  # the refused ZIP export left no scratch dir
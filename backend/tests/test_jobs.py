@@ -0,0 +1,114 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from jobs import JobManager
+
+
+def stepped_run(gate: threading.Event):
+    """A job that emits two events, waits for `gate`, emits a third and returns."""
+    def run(on_event, fail=False):
+        on_event("rows_found", {"rows": 2})
+        on_event("record", {"n": 1})
+        gate.wait(5)
+        on_event("record", {"n": 2})
+        if fail:
+            raise RuntimeError("site down")
+        return {"output": "2 papers"}
+    return run
+
+
+@pytest.fixture
+def manager():
+    m = JobManager(lambda on_event: {"output": ""}, workers=1)
+    yield m
+    m.shutdown()
+
+
+async def collect(job, timeout=5):
+    async def go():
+        return [item async for item in job.follow()]
+    return await asyncio.wait_for(go(), timeout)
+
+
+EXPECTED = [("rows_found", {"rows": 2}), ("record", {"n": 1}), ("record", {"n": 2}),
+            ("done", {"output": "2 papers", "error": ""})]
+
+
+def test_late_follower_gets_the_whole_history(manager):
+    gate = threading.Event()
+    gate.set()
+    job = manager.submit("k", run=stepped_run(gate))
+    job.future.result(5)
+    assert asyncio.run(collect(job)) == EXPECTED
+
+
+def test_followers_see_live_events_in_order_and_stop_on_finish(manager):
+    gate = threading.Event()
+    job = manager.submit("k", run=stepped_run(gate))
+
+    async def main():
+        early = asyncio.create_task(collect(job))
+        while len(job.events) < 2:
+            await asyncio.sleep(0.01)
+        midway = asyncio.create_task(collect(job))  # joins after two events were emitted
+        await asyncio.sleep(0.05)
+        assert not early.done() and not midway.done()
+        gate.set()
+        return await early, await midway
+    early, midway = asyncio.run(main())
+    assert early == EXPECTED and midway == EXPECTED
+
+
+def test_failed_job_ends_the_stream_with_its_error(manager):
+    gate = threading.Event()
+    gate.set()
+    job = manager.submit("k", run=stepped_run(gate), fail=True)
+    events = asyncio.run(collect(job))
+    assert events[-1] == ("failed", {"output": "", "error": "site down"})
+    assert job.status == "failed"
+
+
+def test_identical_submission_joins_the_running_job(manager):
+    gate = threading.Event()
+    job = manager.submit("k", run=stepped_run(gate))
+    assert manager.submit("k", run=stepped_run(gate)) is job
+    gate.set()
+    job.future.result(5)
+    assert manager.submit("k", run=stepped_run(gate)) is not job  # finished jobs aren't joined
+
+
+def test_job_result_and_failure_are_recorded(manager):
+    gate = threading.Event()
+    gate.set()
+    ok = manager.submit("ok", run=stepped_run(gate))
+    bad = manager.submit("bad", run=stepped_run(gate), fail=True)
+    assert ok.future.result(5).to_dict()["result"] == {"output": "2 papers"}
+    assert bad.future.result(5).status == "failed" and bad.error == "site down"
+    assert manager.get(bad.id) is bad
+    assert manager.counts() == {"done": 1, "failed": 1}
+
+
+def parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_job_events_endpoint_streams_sse():
+    from fastapi.testclient import TestClient
+    import main
+    gate = threading.Event()
+    gate.set()
+    job = main.jobs.submit(("test-events",), run=stepped_run(gate), client="test")
+    client = TestClient(main.app)
+    with client.stream("GET", f"/jobs/{job.id}/events") as r:
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/event-stream")
+        body = r.read().decode()
+    assert parse_sse(body) == [("job", {"id": job.id})] + EXPECTED
+    assert client.get("/jobs/nope/events").status_code == 404
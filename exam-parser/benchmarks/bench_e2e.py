@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark against the local replica site (see replica.py).
+
+For each scenario a replica is started with that scenario's result-set size,
+then a fresh interpreter runs papers.run() against it (search, extraction,
+download, merge) with empty caches. The report gives per scenario:
+  seconds       wall time of the whole run
+  phases        seconds per phase from the run's timings (http_search, download, merge, ...)
+  extract_ms    parse_results_html() on the scenario's results page (best of 5)
+  files, bytes (downloaded), disk_bytes (left in the download dir), throughput, peak_rss_mb
+  server        what the replica saw, including TCP connections opened (conns)
+
+Scenarios: small (5 rows), medium (50 rows), huge (500 rows); override with --rows.
+--baseline compares against an earlier report and exits non-zero when a
+scenario's wall time or any phase is more than --tolerance slower.
+
+Usage: python bench_e2e.py [--scenarios small,medium,huge] [--latency 0.05] [--bandwidth 2e6]
+                           [--out report.json] [--baseline old.json]
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import pathlib
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = pathlib.Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+SCENARIOS = {
+    "small": {"rows": 5, "pages": 2, "page_kb": 20},
+    "medium": {"rows": 50, "pages": 4, "page_kb": 20},
+    "huge": {"rows": 500, "pages": 4, "page_kb": 20},
+}
+QUERY = "UCS503"
+
+
+def run_worker(engine: str, merge: bool) -> dict:
+    """Runs in a fresh interpreter whose environment points the scraper at the replica."""
+    import papers
+    from http_search import parse_results_html
+    papers.DOWNLOAD_DIR = pathlib.Path(os.environ["BENCH_DOWNLOAD_DIR"])
+    t0 = time.perf_counter()
+    result = papers.run(QUERY, "code", merge=merge, engine=engine, use_cache=False)
+    seconds = time.perf_counter() - t0
+
+    # Extraction on its own, on the same results page the run parsed
+    import requests
+    html = requests.post(papers.ROOT_URL + "/oldpapers/", data={"ccode": QUERY}).text
+    best = float("inf")
+    for _ in range(5):
+        t = time.perf_counter()
+        rows = parse_results_html(html, papers.ROOT_URL)
+        best = min(best, time.perf_counter() - t)
+    report = result.report
+    return {"ok": result.ok, "output": result.message, "seconds": round(seconds, 3), "phases": result.timings,
+            "extract_ms": round(best * 1000, 3), "rows": len(rows),
+            "files": report.done if report else 0, "failed": len(report.failed) if report else 0,
+            "bytes": report.bytes if report else 0,
+            "disk_bytes": sum(p.stat().st_size for p in pathlib.Path(os.environ["BENCH_DOWNLOAD_DIR"]).rglob("*.pdf")),
+            "throughput": round(report.throughput, 1) if report else 0.0,
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+
+
+def run_scenario(name: str, spec: dict, args) -> dict:
+    from replica import Replica
+    replica = Replica(spec["rows"], spec["pages"], spec["page_kb"], args.latency, args.bandwidth,
+                      pages_dir=args.pages_dir).start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ,
+                       TIET_ROOT_URL=replica.url,
+                       TIET_CACHE_DIR=str(pathlib.Path(tmp) / "cache"),
+                       TIET_CATALOG_DB=str(pathlib.Path(tmp) / "catalog.sqlite3"),
+                       TIET_RESULT_CACHE="0",
+                       TIET_DOWNLOAD_RATE=str(args.rate),
+                       TIET_LEAN_ALLOWED_HOSTS="127.0.0.1,localhost",
+                       BENCH_DOWNLOAD_DIR=str(pathlib.Path(tmp) / "downloads"))
+            out = subprocess.run([sys.executable, __file__, "--worker", "--engine", args.engine]
+                                 + (["--no-merge"] if args.no_merge else []),
+                                 env=env, capture_output=True, text=True)
+            if out.returncode != 0:
+                raise RuntimeError(f"scenario {name} failed:\n{out.stderr[-2000:]}")
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+    finally:
+        replica.stop()
+    result.update(spec, scenario=name, server=replica.stats)
+    return result
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Human-readable regressions of `report` against `baseline`."""
+    regressions = []
+    for name, cur in report["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        pairs = [("seconds", cur["seconds"], old["seconds"]), ("extract_ms", cur["extract_ms"], old["extract_ms"])]
+        pairs += [(f"phase {p}", v, old.get("phases", {}).get(p)) for p, v in cur.get("phases", {}).items()]
+        for label, new, prev in pairs:
+            # Ignore sub-50 ms figures: they are mostly noise
+            if prev and new > prev * (1 + tolerance) and new - prev > 0.05 * (1000 if label == "extract_ms" else 1):
+                regressions.append(f"{name}: {label} {prev} -> {new} (+{(new / prev - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scenarios", default="small,medium,huge")
+    ap.add_argument("--rows", type=int, help="override the row count of every scenario")
+    ap.add_argument("--latency", type=float, default=0.05, help="seconds added to every response")
+    ap.add_argument("--bandwidth", type=float, default=2e6, help="bytes/second per connection (0 = unlimited)")
+    ap.add_argument("--rate", type=float, default=50.0,
+                    help="download requests/second per host (the live-site default of 4 would dominate)")
+    ap.add_argument("--engine", default="http", choices=("http", "selenium"))
+    ap.add_argument("--no-merge", action="store_true")
+    ap.add_argument("--pages-dir", type=pathlib.Path, help="recorded HTML for the replica (see replica.py)")
+    ap.add_argument("--out", type=pathlib.Path, help="write the JSON report here (default: stdout)")
+    ap.add_argument("--baseline", type=pathlib.Path, help="earlier report to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before flagging, e.g. 0.2 = 20%%")
+    ap.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.engine, not args.no_merge)))
+        return
+
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": sys.version.split()[0],
+              "config": {"latency": args.latency, "bandwidth": args.bandwidth, "rate": args.rate,
+                         "engine": args.engine, "merge": not args.no_merge},
+              "scenarios": {}}
+    print(f"{'scenario':>8} {'rows':>5} {'files':>5} {'seconds':>8} {'extract ms':>10} {'MB':>7} {'MB/s':>6} {'RSS MB':>7} {'conns':>5}",
+          file=sys.stderr)
+    for name in args.scenarios.split(","):
+        spec = dict(SCENARIOS[name])
+        if args.rows:
+            spec["rows"] = args.rows
+        r = run_scenario(name, spec, args)
+        report["scenarios"][name] = r
+        print(f"{name:>8} {r['rows']:>5} {r['files']:>5} {r['seconds']:>8.2f} {r['extract_ms']:>10.2f} "
+              f"{r['bytes'] / 1e6:>7.2f} {r['throughput'] / 1e6:>6.2f} {r['peak_rss_mb']:>7.1f} "
+              f"{r['server']['connections']:>5}", file=sys.stderr)
+
+    text = json.dumps(report, indent=1)
+    if args.out:
+        args.out.write_text(text)
+    else:
+        print(text)
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: results-table extraction time vs. row count.
+
+Loads a synthetic results page with N rows into headless Chrome and times
+  per-cell      collect_results_rows() + row_to_record()  (one WebDriver call per cell)
+  script        collect_records() via a single execute_script
+  page_source   driver.page_source + parse_results_html()
+
+Usage: python bench_extraction.py [--rows 10,50,200,1000] [--repeat 3]
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+import tiet_papers_downloader as tpd
+from http_search import parse_results_html
+
+
+def results_page(n: int) -> str:
+    rows = "\n".join(
+        f"<tr><td>UCS{500 + i % 100}</td><td>Course Name {i}</td><td>{2010 + i % 15}</td>"
+        f"<td>{'ODD' if i % 2 else 'EVEN'}</td><td>{('MST', 'EST', 'AUX')[i % 3]}</td>"
+        f"<td><a href='/papers/{i}.pdf'>Download</a></td></tr>"
+        for i in range(n)
+    )
+    return (
+        "<html><body><p>These results matches your search criteria</p><table>"
+        "<tr><th>Course Code</th><th>Course Name</th><th>Year</th><th>Semester</th><th>Exam Type</th><th></th></tr>"
+        f"{rows}</table></body></html>"
+    )
+
+
+def per_cell(driver):
+    return [tpd.row_to_record(r) for r in tpd.collect_results_rows(driver)]
+
+
+def page_source(driver):
+    return parse_results_html(driver.page_source, driver.current_url)
+
+
+STRATEGIES = {"per-cell": per_cell, "script": tpd.collect_records, "page_source": page_source}
+
+
+def best_of(fn, driver, repeat: int):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            out = fn(driver)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", default="10,50,200,1000")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    counts = [int(x) for x in args.rows.split(",")]
+
+    driver = tpd.make_driver(pathlib.Path(tempfile.gettempdir()), headless=True)
+    try:
+        print(f"{'rows':>6}  " + "  ".join(f"{name:>12}" for name in STRATEGIES) + "  speedup")
+        with tempfile.TemporaryDirectory() as tmp:
+            for n in counts:
+                page = pathlib.Path(tmp) / f"results_{n}.html"
+                page.write_text(results_page(n), encoding="utf-8")
+                driver.get(page.as_uri())
+                times, outputs = {}, {}
+                for name, fn in STRATEGIES.items():
+                    times[name], outputs[name] = best_of(fn, driver, args.repeat)
+                # All strategies must agree on the extracted records
+                assert outputs["script"] == outputs["per-cell"], "script extraction differs from per-cell"
+                assert [r["course_code"] for r in outputs["page_source"]] == \
+                       [r["course_code"] for r in outputs["per-cell"]], "page_source extraction differs"
+                speedup = times["per-cell"] / times["script"] if times["script"] else float("inf")
+                print(f"{n:>6}  " + "  ".join(f"{times[k] * 1000:>10.1f}ms" for k in STRATEGIES)
+                      + f"  {speedup:>6.1f}x")
+    finally:
+        driver.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark: default vs. lean Chrome profile on the live search page.
+
+For each mode, starts a fresh driver and reports
+  startup     make_driver() wall time (includes resolving chromedriver)
+  page_load   open_search_page() wall time (home page -> Old Question Papers form)
+  requests    resources the pages fetched (Performance API, blocked requests excluded)
+  kb          bytes transferred for the documents and their resources
+
+Needs network access to the TIET site.
+
+Usage: python bench_lean.py [--repeat 3]
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+import tiet_papers_downloader as tpd
+
+# Network usage of the current document; the navigation entry covers the HTML itself
+PAGE_WEIGHT_JS = """
+const nav = performance.getEntriesByType('navigation');
+const res = performance.getEntriesByType('resource');
+const bytes = [...nav, ...res].reduce((n, e) => n + (e.transferSize || 0), 0);
+return [res.length, bytes];
+"""
+
+
+def measure(lean: bool) -> dict:
+    t0 = time.perf_counter()
+    driver = tpd.make_driver(pathlib.Path(tempfile.gettempdir()), headless=True, lean=lean)
+    t1 = time.perf_counter()
+    try:
+        weights = []
+        # open_search_page() loads two documents; sample the home page before following the link
+        driver.get(tpd.ROOT_URL)
+        weights.append(driver.execute_script(PAGE_WEIGHT_JS))
+        with contextlib.redirect_stdout(io.StringIO()):
+            tpd.open_old_papers(driver)
+            tpd.WebDriverWait(driver, 30).until(
+                lambda d: tpd.find_course_code_input(d) is not None or tpd.find_course_name_input(d) is not None)
+        t2 = time.perf_counter()
+        weights.append(driver.execute_script(PAGE_WEIGHT_JS))
+    finally:
+        driver.quit()
+    return {"startup": t1 - t0, "page_load": t2 - t1,
+            "requests": sum(w[0] for w in weights), "kb": sum(w[1] for w in weights) / 1024}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    print(f"{'mode':>8} {'startup':>9} {'page_load':>10} {'requests':>9} {'kb':>9}")
+    for name, lean in (("default", False), ("lean", True)):
+        runs = [measure(lean) for _ in range(args.repeat)]
+        best = min(runs, key=lambda r: r["page_load"])
+        print(f"{name:>8} {best['startup']:>8.2f}s {best['page_load']:>9.2f}s {best['requests']:>9} "
+              f"{best['kb']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark: merge-at-end vs. the streaming merge pipeline.
+
+Generates synthetic course groups of PDFs, then simulates downloads landing
+one every --latency seconds and measures, per strategy,
+  total      wall time from the first download starting to the merged files existing
+  tail       time spent merging after the last download landed
+  peak_rss   peak resident memory of the process (each run is a fresh subprocess),
+             plus the largest merge worker for the processes strategy
+
+Strategies:
+  legacy        wait for every download, then merge each group with PdfMerger
+  incremental   MergePipeline with processes=0 (in-process, appends as files land)
+  processes     MergePipeline with worker processes (one per finished group)
+
+Usage: python bench_merge.py [--pages 50,200,800] [--groups 1,4] [--files 8] [--latency 0.05]
+"""
+from __future__ import annotations
+import argparse
+import json
+import pathlib
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+STRATEGIES = ("legacy", "incremental", "processes")
+
+
+def make_pdf(path: pathlib.Path, pages: int, page_kb: int):
+    from PyPDF2 import PdfWriter
+    from PyPDF2.generic import DecodedStreamObject, NameObject
+    writer = PdfWriter()
+    filler = (b"0 0 m 100 100 l S\n" * (page_kb * 1024 // 18 + 1))[: page_kb * 1024]
+    for _ in range(pages):
+        page = writer.add_blank_page(595, 842)
+        content = DecodedStreamObject()
+        content.set_data(filler)
+        page[NameObject("/Contents")] = writer._add_object(content)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def build_fixture(root: pathlib.Path, groups: int, files: int, pages: int, page_kb: int) -> dict:
+    per_file = max(1, pages // files)
+    layout = {}
+    for g in range(groups):
+        gdir = root / f"G{g}"
+        gdir.mkdir(parents=True, exist_ok=True)
+        recs = []
+        for i in range(files):
+            p = gdir / f"paper_{i}.pdf"
+            make_pdf(p, per_file, page_kb)
+            recs.append({"path": str(p), "year": str(2010 + i // 2), "semester": "ODD",
+                         "exam_type": ("MST", "EST")[i % 2]})
+        layout[f"G{g}"] = recs
+    return layout
+
+
+def run_worker(strategy: str, fixture: pathlib.Path, latency: float) -> dict:
+    """Runs inside a fresh interpreter so peak RSS belongs to one strategy only."""
+    from downloads import DownloadJob
+    from merge import MergePipeline
+    layout = json.loads(fixture.read_text())
+    jobs = {key: [DownloadJob("", pathlib.Path(r["path"]), r) for r in recs] for key, recs in layout.items()}
+    dests = {key: fixture.parent / f"{key}_{strategy}_merged.pdf" for key in jobs}
+    # Interleave groups the way parallel downloads land
+    order = [j for batch in zip(*jobs.values()) for j in batch]
+    start = time.perf_counter()
+    pipeline = None
+    if strategy != "legacy":
+        pipeline = MergePipeline(jobs, dests, processes=4 if strategy == "processes" else 0)
+    for job in order:
+        time.sleep(latency)
+        if pipeline is not None:
+            pipeline.landed(job.dest, True)
+    landed = time.perf_counter()
+    if pipeline is not None:
+        pipeline.wait()
+    else:
+        from PyPDF2 import PdfMerger
+        for key, group in jobs.items():
+            merger = PdfMerger()
+            for job in group:
+                merger.append(str(job.dest))
+            merger.write(str(dests[key]))
+            merger.close()
+    end = time.perf_counter()
+    return {"total": round(end - start, 3), "tail": round(end - landed, 3),
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "peak_child_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", default="50,200,800", help="total pages per group")
+    ap.add_argument("--groups", default="1,4")
+    ap.add_argument("--files", type=int, default=8, help="PDFs per group")
+    ap.add_argument("--page-kb", type=int, default=8)
+    ap.add_argument("--latency", type=float, default=0.05, help="seconds between downloads landing")
+    ap.add_argument("--worker", nargs=2, metavar=("STRATEGY", "FIXTURE"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker[0], pathlib.Path(args.worker[1]), args.latency)))
+        return
+
+    print(f"{'groups':>6} {'pages':>6} {'strategy':>12} {'total s':>8} {'tail s':>7} {'peak MB':>8} {'worker MB':>9}")
+    for groups in [int(g) for g in args.groups.split(",")]:
+        for pages in [int(p) for p in args.pages.split(",")]:
+            for strategy in STRATEGIES:
+                with tempfile.TemporaryDirectory() as tmp:
+                    root = pathlib.Path(tmp)
+                    fixture = root / "fixture.json"
+                    fixture.write_text(json.dumps(build_fixture(root, groups, args.files, pages, args.page_kb)))
+                    out = subprocess.run([sys.executable, __file__, "--latency", str(args.latency),
+                                          "--worker", strategy, str(fixture)],
+                                         capture_output=True, text=True, check=True)
+                    r = json.loads(out.stdout.strip().splitlines()[-1])
+                print(f"{groups:>6} {pages:>6} {strategy:>12} {r['total']:>8} {r['tail']:>7} {r['peak_rss_mb']:>8} {r['peak_child_rss_mb']:>9}")
+
+
+if __name__ == "__main__":
+    main()
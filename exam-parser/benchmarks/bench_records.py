@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark: list of record dicts vs. RecordTable (record_table.py) on a
+synthetic full-catalog result set.
+
+Reports
+  memory    bytes still allocated after building each representation (tracemalloc)
+            and the peak while building it
+  filters   time for each query: list comprehension over the dicts (how results
+            are filtered today) vs. RecordTable.select(), alone and with the
+            matching rows turned back into dicts; both must return the same rows
+
+Usage: python bench_records.py [--rows 50000] [--codes 2500] [--repeat 5]
+"""
+from __future__ import annotations
+import argparse
+import gc
+import pathlib
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+from record_table import RecordTable
+
+DEPARTMENTS = ("UCS", "UEC", "UEE", "UME", "UCE", "UCH", "UBT", "UMA", "UPH", "UHU", "PCS", "PEC")
+EXAMS = ("MST", "EST", "AUX")
+SEMESTERS = ("ODD", "EVEN", "SUMMER")
+
+
+def make_rows(n: int, codes: int, seed: int = 1):
+    """n fresh record dicts (new string objects per row, as parsing a results page produces)."""
+    rnd = random.Random(seed)
+    courses = [(f"{DEPARTMENTS[i % len(DEPARTMENTS)]}{100 + i // len(DEPARTMENTS):03d}",
+                f"Course {i} {rnd.choice(('Data', 'Signal', 'Thermal', 'Applied', 'Digital'))} Systems")
+               for i in range(codes)]
+    for i in range(n):
+        code, name = courses[rnd.randrange(codes)]
+        year = str(rnd.randint(2012, 2024))
+        sem, exam = rnd.choice(SEMESTERS), rnd.choice(EXAMS)
+        yield {"course_code": "".join(code), "course_name": "".join(name), "year": "".join(year),
+               "semester": "".join(sem), "exam_type": "".join(exam),
+               "download_href": f"https://cl.thapar.edu/qp/{code}_{year}_{sem}_{exam}_{i}.pdf"}
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current, peak
+
+
+def best(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times) * 1000
+
+
+def year_of(rec) -> int:
+    return int(rec["year"][:4])
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=50000)
+    ap.add_argument("--codes", type=int, default=2500)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    dicts, d_cur, d_peak = measure(lambda: list(make_rows(args.rows, args.codes)))
+    table, t_cur, t_peak = measure(lambda: RecordTable(make_rows(args.rows, args.codes)))
+    # Same row order as the table, so results can be compared directly
+    dicts.sort(key=lambda r: r["course_code"])
+    print(f"{args.rows} rows, {len(table.codes)} course codes")
+    print(f"{'':12} {'retained':>10} {'build peak':>11} {'per row':>8}")
+    for label, cur, peak in (("dicts", d_cur, d_peak), ("RecordTable", t_cur, t_peak)):
+        print(f"{label:12} {cur / 2**20:>8.1f}MB {peak / 2**20:>9.1f}MB {cur / args.rows:>7.0f}B")
+    print(f"{'':12} {d_cur / t_cur:>9.1f}x smaller\n")
+
+    code = table.codes[len(table.codes) // 2]
+    queries = [
+        ("exam=MST", dict(exam_type="MST"),
+         lambda r: r["exam_type"] == "MST"),
+        ("code", dict(code=code),
+         lambda r: r["course_code"] == code),
+        ("prefix=UCS, EST", dict(code_prefix="UCS", exam_type="EST"),
+         lambda r: r["course_code"].startswith("UCS") and r["exam_type"] == "EST"),
+        ("2019-2022, ODD", dict(years=(2019, 2022), semester="ODD"),
+         lambda r: 2019 <= year_of(r) <= 2022 and r["semester"] == "ODD"),
+        ("prefix=U, MST/EST, >=2020", dict(code_prefix="U", exam_type=("MST", "EST"), years=(2020, None)),
+         lambda r: r["course_code"].startswith("U") and r["exam_type"] in ("MST", "EST") and year_of(r) >= 2020),
+    ]
+    print(f"{'query':28} {'matches':>8} {'dicts':>9} {'select':>9} {'+records':>9} {'speedup':>8}")
+    for label, filters, pred in queries:
+        expected = [r for r in dicts if pred(r)]
+        assert table.records(table.select(**filters)) == expected, label
+        t_dicts = best(lambda: [r for r in dicts if pred(r)], args.repeat)
+        t_select = best(lambda: table.select(**filters), args.repeat)
+        t_records = best(lambda: table.records(table.select(**filters)), args.repeat)
+        print(f"{label:28} {len(expected):>8} {t_dicts:>7.2f}ms {t_select:>7.2f}ms {t_records:>7.2f}ms "
+              f"{t_dicts / t_select:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: scaling of sharded scraping (shard.py) from 1 to N worker processes.
+
+Runs against the local replica (see replica.py) with the HTTP engine and all
+caches off, so every run searches and downloads everything:
+  batch   shard.run_batch() over --courses courses of --rows papers each
+  crawl   shard.crawl() over --courses prefixes into a scratch catalog
+The first row, "seq", is the in-process papers.run_batch() / catalog.crawl() for reference.
+Reports wall time, speedup over 1 worker, parallel efficiency and the
+search rate the site saw (which --rate caps across all workers).
+
+Usage: python bench_shard.py [--mode batch] [--workers 1,2,4,8] [--courses 16] [--rows 10]
+                             [--search-latency 1.0] [--rate 0]
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import os
+import pathlib
+import string
+import sys
+import tempfile
+import time
+
+HERE = pathlib.Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+
+def run(mode: str, workers: int, codes, tmp: pathlib.Path, rate: float) -> float:
+    import catalog
+    import papers
+    import shard
+    papers.DOWNLOAD_DIR = tmp / "downloads"
+    db = tmp / "catalog.sqlite3"
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == "batch" and workers == 0:
+            papers.run_batch(codes, engine="http", use_cache=False)
+        elif mode == "batch":
+            shard.run_batch(codes, engine="http", use_cache=False, workers=workers, rate=rate)
+        elif workers == 0:
+            catalog.crawl(lambda p: papers.search_live(True, p, "http")[0], codes, db, min_interval=1 / rate if rate else 0)
+        else:
+            shard.crawl(codes, db, workers=workers, engine="http", rate=rate)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--mode", default="batch", choices=("batch", "crawl"))
+    ap.add_argument("--workers", default="1,2,4,8")
+    ap.add_argument("--courses", type=int, default=16)
+    ap.add_argument("--rows", type=int, default=10, help="papers per course")
+    ap.add_argument("--search-latency", type=float, default=1.0, help="seconds the replica takes per search")
+    ap.add_argument("--latency", type=float, default=0.05)
+    ap.add_argument("--bandwidth", type=float, default=2e6)
+    ap.add_argument("--rate", type=float, default=0.0, help="global search rate cap (0 = none)")
+    args = ap.parse_args()
+
+    from replica import Replica
+    replica = Replica(args.rows, 3, 20, args.latency, args.bandwidth, search_latency=args.search_latency).start()
+    # Children inherit the environment; caches off so each run does the full work
+    os.environ.update(TIET_ROOT_URL=replica.url, TIET_RESULT_CACHE="0", TIET_PDF_CACHE="0",
+                      TIET_MERGED_CACHE="0", TIET_DOWNLOAD_RATE="100")
+    if args.mode == "batch":
+        codes = [f"UBM{100 + i}" for i in range(args.courses)]
+    else:
+        codes = [a + b for a in string.ascii_uppercase for b in string.ascii_uppercase][:args.courses]
+
+    print(f"{args.mode}: {args.courses} {'courses' if args.mode == 'batch' else 'prefixes'}, "
+          f"search {args.search_latency}s, rate cap {args.rate or 'none'}")
+    print(f"{'workers':>8} {'seconds':>8} {'speedup':>8} {'effic.':>7} {'searches/s':>11}")
+    base = None
+    try:
+        for w in [0] + [int(x) for x in args.workers.split(",")]:
+            before = replica.stats["searches"]
+            with tempfile.TemporaryDirectory() as tmp:
+                seconds = run(args.mode, w, codes, pathlib.Path(tmp), args.rate)
+            searches = replica.stats["searches"] - before
+            if w == 1:
+                base = seconds
+            label = "seq" if w == 0 else str(w)
+            speedup = f"{base / seconds:>7.2f}x" if base and w else f"{'':>8}"
+            effic = f"{base / seconds / w * 100:>6.0f}%" if base and w else f"{'':>7}"
+            print(f"{label:>8} {seconds:>7.2f}s {speedup} {effic} {searches / seconds:>11.2f}")
+    finally:
+        replica.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark: fixed sleeps + sequential loading-indicator waits vs. the combined readiness wait.
+
+Serves a synthetic search form in headless Chrome. Submitting it shows a
+"Please wait" indicator and renders the results (or a no-results message)
+after --delay seconds, the way the live site does. Each search is timed per
+phase (fill+submit, wait, extract) for
+  legacy   the old fill_and_submit() sleeps (~2.2 s) and four 5 s indicator waits run one after another
+  smart    tpd.fill_and_submit() + tpd.wait_for_results() (one polled condition, settles on a stable DOM)
+
+Usage: python bench_waits.py [--delay 0.3,1.0] [--repeat 3]
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+import tiet_papers_downloader as tpd
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+
+def search_page(delay: float) -> str:
+    return f"""<html><body>
+<form onsubmit="go(); return false;">
+  <label>Course Code</label> <input type="text" name="course_code">
+  <input type="submit" value="Submit">
+</form>
+<div id="out"></div>
+<script>
+function go() {{
+  const q = document.querySelector('input').value;
+  const out = document.getElementById('out');
+  out.innerHTML = '<div class="loading">Please wait...</div>';
+  setTimeout(() => {{
+    if (q === 'NONE') {{ out.innerHTML = '<p>No records found</p>'; return; }}
+    let rows = '';
+    for (let i = 0; i < 40; i++)
+      rows += `<tr><td>${{q}}</td><td>Course</td><td>${{2010 + i % 10}}</td><td>ODD</td><td>MST</td>` +
+              `<td><a href="/p/${{i}}.pdf">Download</a></td></tr>`;
+    out.innerHTML = '<p>These results matches your search criteria</p><table>' +
+      '<tr><th>Course Code</th><th>Course Name</th><th>Year</th><th>Semester</th><th>Exam Type</th><th></th></tr>' +
+      rows + '</table>';
+  }}, {int(delay * 1000)});
+}}
+</script></body></html>"""
+
+
+def legacy_fill_and_submit(input_el, text: str):
+    input_el.click()
+    time.sleep(0.5)
+    input_el.send_keys(Keys.CONTROL, "a")
+    input_el.send_keys(Keys.DELETE)
+    time.sleep(0.2)
+    input_el.send_keys(text)
+    time.sleep(0.5)
+    input_el.send_keys(Keys.ENTER)
+    time.sleep(1)
+
+
+def legacy_wait(driver, query_text: str, timeout=20) -> bool:
+    banner = (By.XPATH, "//*[contains(., 'These results matches your search criteria')]")
+    table_row = (By.XPATH, "//table//tr[td]")
+    code_row = (By.XPATH, f"//table//tr[td and normalize-space(td[1])='{query_text}']")
+    for indicator in ["//div[contains(@class, 'loading')]", "//div[contains(@id, 'loading')]",
+                      "//*[contains(text(), 'Loading')]", "//*[contains(text(), 'Please wait')]"]:
+        try:
+            WebDriverWait(driver, 5).until_not(EC.presence_of_element_located((By.XPATH, indicator)))
+        except Exception:
+            pass
+    try:
+        WebDriverWait(driver, timeout).until(
+            lambda d: d.find_elements(*banner) or d.find_elements(*code_row) or len(d.find_elements(*table_row)) > 1)
+        return True
+    except Exception:
+        return False
+
+
+STRATEGIES = {
+    "legacy": (legacy_fill_and_submit, legacy_wait),
+    "smart": (tpd.fill_and_submit, lambda d, q: tpd.wait_for_results(d, q, timeout=20)),
+}
+
+
+def timed_search(driver, page_uri: str, query: str, fill, wait) -> dict:
+    driver.get(page_uri)
+    inp = tpd.find_course_code_input(driver)
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        fill(inp, query)
+        t1 = time.perf_counter()
+        ok = wait(driver, query)
+        t2 = time.perf_counter()
+        records = tpd.collect_records(driver) if ok else None
+        t3 = time.perf_counter()
+    return {"submit": t1 - t0, "wait": t2 - t1, "extract": t3 - t2, "total": t3 - t0,
+            "rows": len(records) if records is not None else -1}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--delay", default="0.3,1.0", help="seconds the fake server takes to answer")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    driver = tpd.make_driver(pathlib.Path(tempfile.gettempdir()), headless=True)
+    try:
+        print(f"{'delay':>6} {'query':>6} {'strategy':>8} {'submit':>8} {'wait':>8} {'extract':>8} {'total':>8} rows")
+        with tempfile.TemporaryDirectory() as tmp:
+            for delay in [float(x) for x in args.delay.split(",")]:
+                page = pathlib.Path(tmp) / f"search_{delay}.html"
+                page.write_text(search_page(delay), encoding="utf-8")
+                for query in ("UCS503", "NONE"):
+                    for name, (fill, wait) in STRATEGIES.items():
+                        runs = [timed_search(driver, page.as_uri(), query, fill, wait) for _ in range(args.repeat)]
+                        best = min(runs, key=lambda r: r["total"])
+                        print(f"{delay:>6} {query:>6} {name:>8} " + " ".join(
+                            f"{best[k]:>7.2f}s" for k in ("submit", "wait", "extract", "total")) + f" {best['rows']}")
+    finally:
+        driver.quit()
+
+
+if __name__ == "__main__":
+    main()
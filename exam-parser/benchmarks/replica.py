@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Local replica of the Old Question Papers site for repeatable benchmarks.
+
+Serves
+  /                 home page with the "Old Question Papers" link
+  /oldpapers/       the search form (GET) and its results page (POST)
+  /papers/<code>-<n>.pdf   synthetic PDFs of a configurable page count and size
+
+Every response is delayed by `latency` seconds (searches by a further
+`search_latency`, the site's query time) and bodies are sent no faster than
+`bandwidth` bytes/second per connection. Pages recorded from the live site
+can replace the built-in ones: put home.html, search.html and results.html in a
+directory and pass it as `pages_dir`. results.html must contain a {rows}
+placeholder for the table rows.
+
+Usage: python replica.py [--port 8800] [--rows 50] [--pages 5] [--latency 0.05] [--bandwidth 2000000]
+                         [--search-latency 1.0]
+"""
+from __future__ import annotations
+import argparse
+import io
+import pathlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs
+
+HOME_HTML = """<html><head><title>Thapar</title></head><body>
+<h1>Central Library</h1>
+<ul><li><a href="/oldpapers/">Old Question Papers</a></li><li><a href="/ejournals/">E-Journals</a></li></ul>
+</body></html>"""
+
+SEARCH_HTML = """<html><body>
+<form method="post" action="/oldpapers/">
+  <input type="hidden" name="__VIEWSTATE" value="dDwtMTI3OTMzNDM4NDs7Pg==">
+  <label>Course Code</label> <input type="text" name="ccode" id="ccode">
+  <input type="submit" name="btnCode" value="Submit">
+  <label>Course Name</label> <input type="text" name="cname" id="cname">
+  <input type="submit" name="btnName" value="Submit">
+</form>
+{results}
+</body></html>"""
+
+RESULTS_HTML = """<p>These results matches your search criteria</p>
+<table>
+<tr><th>Course Code</th><th>Course Name</th><th>Year</th><th>Semester</th><th>Exam Type</th><th>Paper</th></tr>
+{rows}
+</table>"""
+
+NO_RESULTS_HTML = "<p>No records found</p>"
+PDF_MARKER = b"ID00000000"
+
+
+def synthetic_pdf(pages: int, page_kb: int) -> bytes:
+    """A PDF whose uncompressed content contains PDF_MARKER, so copies can be made unique in place."""
+    from PyPDF2 import PdfWriter
+    from PyPDF2.generic import DecodedStreamObject, NameObject
+    writer = PdfWriter()
+    body = b"% " + PDF_MARKER + b"\n"
+    filler = body + (b"0 0 m 100 100 l S\n" * (page_kb * 1024 // 18 + 1))[: max(0, page_kb * 1024 - len(body))]
+    for _ in range(pages):
+        writer.add_blank_page(595, 842)
+        # add_blank_page() returns a copy; edit the page the writer will actually output
+        page = writer.pages[-1]
+        content = DecodedStreamObject()
+        content.set_data(filler)
+        page[NameObject("/Contents")] = writer._add_object(content)
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+class Replica:
+    def __init__(self, rows: int = 50, pages: int = 5, page_kb: int = 20, latency: float = 0.0,
+                 bandwidth: float = 0.0, port: int = 0, pages_dir: Optional[pathlib.Path] = None,
+                 search_latency: float = 0.0):
+        self.rows = rows
+        self.latency = latency
+        self.search_latency = search_latency
+        self.bandwidth = bandwidth
+        self.templates = {"home": HOME_HTML, "search": SEARCH_HTML, "results": RESULTS_HTML}
+        if pages_dir is not None:
+            for name in self.templates:
+                path = pathlib.Path(pages_dir) / f"{name}.html"
+                if path.exists():
+                    self.templates[name] = path.read_text(encoding="utf-8")
+        self.pdf = synthetic_pdf(pages, page_kb)
+        self.stats: Dict[str, int] = {"connections": 0, "requests": 0, "searches": 0, "pdfs": 0, "bytes": 0}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def result_rows(self, code: str) -> str:
+        exams = ("MST", "EST", "AUX")
+        return "\n".join(
+            f"<tr><td>{code}</td><td>Benchmark Course</td><td>{2024 - i // 6}</td>"
+            f"<td>{'ODD' if i % 2 else 'EVEN'}</td><td>{exams[(i // 2) % 3]}</td>"
+            f"<td><a href=\"/papers/{code}-{i}.pdf\">Download</a></td></tr>"
+            for i in range(self.rows))
+
+    def paper(self, n: int) -> bytes:
+        return self.pdf.replace(PDF_MARKER, f"ID{n:08d}".encode())
+
+    def _handler(self):
+        replica = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                # One handler per TCP connection: counts how well clients reuse keep-alive connections
+                super().setup()
+                with replica._lock:
+                    replica.stats["connections"] += 1
+
+            def send_body(self, body: bytes, content_type: str):
+                if replica.latency:
+                    time.sleep(replica.latency)
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                step = 16384
+                for i in range(0, len(body), step):
+                    chunk = body[i:i + step]
+                    self.wfile.write(chunk)
+                    if replica.bandwidth:
+                        time.sleep(len(chunk) / replica.bandwidth)
+                with replica._lock:
+                    replica.stats["requests"] += 1
+                    replica.stats["bytes"] += len(body)
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/":
+                    self.send_body(replica.templates["home"].encode(), "text/html")
+                elif path == "/oldpapers/":
+                    self.send_body(replica.templates["search"].replace("{results}", "").encode(), "text/html")
+                elif path.startswith("/papers/") and path.endswith(".pdf"):
+                    try:
+                        n = int(path[len("/papers/"):-4].rsplit("-", 1)[-1])
+                    except ValueError:
+                        n = -1
+                    if not 0 <= n < replica.rows:
+                        self.send_error(404)
+                        return
+                    with replica._lock:
+                        replica.stats["pdfs"] += 1
+                    self.send_body(replica.paper(n), "application/pdf")
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                form = parse_qs(self.rfile.read(length).decode())
+                code = (form.get("ccode") or [""])[0].strip() or (form.get("cname") or [""])[0].strip()
+                with replica._lock:
+                    replica.stats["searches"] += 1
+                if replica.search_latency:
+                    time.sleep(replica.search_latency)
+                if code and replica.rows:
+                    results = replica.templates["results"].replace("{rows}", replica.result_rows(code))
+                else:
+                    results = NO_RESULTS_HTML
+                self.send_body(replica.templates["search"].replace("{results}", results).encode(), "text/html")
+
+        return Handler
+
+    def start(self) -> "Replica":
+        threading.Thread(target=self.server.serve_forever, name="replica", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--port", type=int, default=8800)
+    ap.add_argument("--rows", type=int, default=50)
+    ap.add_argument("--pages", type=int, default=5, help="pages per PDF")
+    ap.add_argument("--page-kb", type=int, default=20)
+    ap.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    ap.add_argument("--bandwidth", type=float, default=0.0, help="bytes/second per connection (0 = unlimited)")
+    ap.add_argument("--search-latency", type=float, default=0.0, help="extra seconds a search takes")
+    ap.add_argument("--pages-dir", type=pathlib.Path, help="recorded home/search/results HTML to serve instead")
+    args = ap.parse_args()
+    replica = Replica(args.rows, args.pages, args.page_kb, args.latency, args.bandwidth, args.port, args.pages_dir,
+                      args.search_latency)
+    print(f"Replica serving {args.rows} rows at {replica.url} (TIET_ROOT_URL={replica.url})")
+    try:
+        replica.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Offline copy of the whole Old Question Papers catalog.
+
+crawl() walks the catalog by searching course-code prefixes ("A", "B", ...,
+splitting a prefix into "AA", "AB", ... whenever it returns a very large
+result set) and stores every row in SQLite. Progress is recorded per prefix
+so an interrupted crawl resumes where it stopped. A re-crawl skips prefixes
+checked within `recrawl_after` seconds and only writes rows that are new or
+changed.
+
+CatalogIndex loads the store into memory and answers exact-code,
+code-prefix and fuzzy course-name lookups without touching the network,
+optionally narrowed by exam type, semester and year range.
+"""
+from __future__ import annotations
+import bisect
+import difflib
+import hashlib
+import json
+import os
+import pathlib
+import re
+import sqlite3
+import string
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pdf_cache import CACHE_DIR
+from record_table import RecordTable
+
+CATALOG_DB = pathlib.Path(os.environ.get("TIET_CATALOG_DB", CACHE_DIR / "catalog.sqlite3"))
+CRAWL_SEEDS = list(string.ascii_uppercase)
+CRAWL_SPLIT_AT = 400            # prefixes returning this many rows are split one character further
+CRAWL_MIN_INTERVAL = 2.0        # seconds between searches against the live site
+CRAWL_RECRAWL_AFTER = 30 * 24 * 3600
+CRAWL_ALPHABET = string.ascii_uppercase + string.digits
+
+FIELDS = ("course_code", "course_name", "year", "semester", "exam_type", "download_href")
+
+
+def connect(path: pathlib.Path = CATALOG_DB) -> sqlite3.Connection:
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(str(path), check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("CREATE TABLE IF NOT EXISTS papers (course_code TEXT, course_name TEXT, year TEXT, "
+               "semester TEXT, exam_type TEXT, download_href TEXT PRIMARY KEY, first_seen REAL, last_seen REAL)")
+    db.execute("CREATE INDEX IF NOT EXISTS papers_code ON papers(course_code)")
+    db.execute("CREATE TABLE IF NOT EXISTS crawl_prefixes (prefix TEXT PRIMARY KEY, status TEXT, "
+               "row_count INTEGER, digest TEXT, checked_at REAL)")
+    db.commit()
+    return db
+
+
+def _digest(records: List[Dict[str, str]]) -> str:
+    rows = sorted(json.dumps([r.get(k, "") for k in FIELDS]) for r in records)
+    return hashlib.sha256("\n".join(rows).encode()).hexdigest()
+
+
+def _upsert(db: sqlite3.Connection, records: Iterable[Dict[str, str]], now: float) -> int:
+    """Insert new rows, update changed ones, bump last_seen on the rest. Returns rows added or changed."""
+    changed = 0
+    for r in records:
+        href = r.get("download_href") or f"nohref:{r['course_code']}:{r['year']}:{r['semester']}:{r['exam_type']}"
+        row = db.execute("SELECT course_code, course_name, year, semester, exam_type FROM papers "
+                         "WHERE download_href=?", (href,)).fetchone()
+        values = tuple(r.get(k, "") for k in FIELDS[:5])
+        if row is None:
+            db.execute("INSERT INTO papers VALUES (?, ?, ?, ?, ?, ?, ?, ?)", values + (href, now, now))
+            changed += 1
+        elif tuple(row) != values:
+            db.execute("UPDATE papers SET course_code=?, course_name=?, year=?, semester=?, exam_type=?, "
+                       "last_seen=? WHERE download_href=?", values + (now, href))
+            changed += 1
+        else:
+            db.execute("UPDATE papers SET last_seen=? WHERE download_href=?", (now, href))
+    return changed
+
+
+def crawl(search: Callable[[str], Optional[List[Dict[str, str]]]], seeds: Iterable[str] = CRAWL_SEEDS,
+          db_path: pathlib.Path = CATALOG_DB, min_interval: float = CRAWL_MIN_INTERVAL,
+          recrawl_after: float = CRAWL_RECRAWL_AFTER, split_at: int = CRAWL_SPLIT_AT) -> Dict[str, int]:
+    """
+    Crawl the catalog through `search(code_prefix) -> records` (None means the search failed).
+    Safe to interrupt and re-run: finished prefixes are skipped until `recrawl_after` has passed.
+    shard.crawl() runs the same walk with searches spread over several processes.
+    """
+    db = connect(db_path)
+    stats = new_crawl_stats()
+    pending = list(seeds)
+    last = 0.0
+    try:
+        while pending:
+            prefix = pending.pop(0)
+            row, children = crawl_check(db, prefix, recrawl_after, stats)
+            if children is not None:
+                pending[0:0] = children
+                continue
+
+            wait = min_interval - (time.monotonic() - last)
+            if wait > 0:
+                time.sleep(wait)
+            last = time.monotonic()
+            print(f"Crawling prefix '{prefix}'...")
+            pending[0:0] = crawl_store(db, prefix, row, search(prefix), split_at, stats)
+    finally:
+        db.close()
+    print(f"Crawl finished: {stats}")
+    return stats
+
+
+def new_crawl_stats() -> Dict[str, int]:
+    return {"searched": 0, "skipped": 0, "unchanged": 0, "rows_changed": 0, "failed": 0}
+
+
+def crawl_check(db: sqlite3.Connection, prefix: str, recrawl_after: float, stats: Dict[str, int]):
+    """
+    Returns (stored crawl row, children). children is None when the prefix has to be searched;
+    otherwise it was crawled recently and children are the prefixes to walk instead (empty unless it was split).
+    """
+    row = db.execute("SELECT status, checked_at, digest FROM crawl_prefixes WHERE prefix=?", (prefix,)).fetchone()
+    if row and row[0] in {"done", "split"} and time.time() - row[1] < recrawl_after:
+        stats["skipped"] += 1
+        return row, [prefix + c for c in CRAWL_ALPHABET] if row[0] == "split" else []
+    return row, None
+
+
+def crawl_store(db: sqlite3.Connection, prefix: str, row, records: Optional[List[Dict[str, str]]],
+                split_at: int, stats: Dict[str, int]) -> List[str]:
+    """Store one prefix's search result (None = failed). Returns the prefixes to walk next."""
+    stats["searched"] += 1
+    now = time.time()
+    if records is None:
+        stats["failed"] += 1
+        db.execute("INSERT OR REPLACE INTO crawl_prefixes VALUES (?, 'failed', 0, '', ?)", (prefix, now))
+        db.commit()
+        return []
+
+    status, children = "done", []
+    if len(records) >= split_at and len(prefix) < 6:
+        # Likely truncated by the site: walk the next character instead
+        status = "split"
+        children = [prefix + c for c in CRAWL_ALPHABET]
+    digest = _digest(records)
+    if row and row[2] == digest:
+        stats["unchanged"] += 1
+        db.execute("UPDATE papers SET last_seen=? WHERE course_code LIKE ?", (now, prefix + "%"))
+    else:
+        stats["rows_changed"] += _upsert(db, records, now)
+    db.execute("INSERT OR REPLACE INTO crawl_prefixes VALUES (?, ?, ?, ?, ?)",
+               (prefix, status, len(records), digest, now))
+    db.commit()
+    return children
+
+
+def reset_crawl(db_path: pathlib.Path = CATALOG_DB):
+    """Forget crawl progress so the next crawl re-checks every prefix (stored papers are kept)."""
+    db = connect(db_path)
+    db.execute("DELETE FROM crawl_prefixes")
+    db.commit()
+    db.close()
+
+
+def _tokens(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+class CatalogIndex:
+    """
+    In-memory index over the catalog store for code, prefix and fuzzy name lookups.
+    Rows live in a RecordTable (column arrays, see record_table.py), so results can also be
+    narrowed by exam type, semester and year range without building a dict per row.
+    """
+
+    def __init__(self, db_path: pathlib.Path = CATALOG_DB):
+        self.db_path = pathlib.Path(db_path)
+        self._lock = threading.Lock()
+        self._mtime = None
+        self.table = RecordTable([])
+        self.names: Dict[str, str] = {}
+        self.name_tokens: Dict[str, set] = {}
+        self.vocabulary: List[str] = []
+        self.reload()
+
+    def _stamp(self):
+        try:
+            return max(p.stat().st_mtime for p in (self.db_path, self.db_path.with_name(self.db_path.name + "-wal"))
+                       if p.exists())
+        except ValueError:
+            return None
+
+    def _rows(self) -> Iterator[Dict[str, str]]:
+        db = connect(self.db_path)
+        try:
+            for row in db.execute("SELECT course_code, course_name, year, semester, exam_type, download_href "
+                                  "FROM papers ORDER BY course_code, year DESC, semester, exam_type"):
+                rec = dict(zip(FIELDS, row))
+                if rec["download_href"].startswith("nohref:"):
+                    rec["download_href"] = ""
+                yield rec
+        finally:
+            db.close()
+
+    def reload(self, force: bool = True):
+        """(Re)build the index from disk; with force=False only if the store changed since the last load."""
+        stamp = self._stamp()
+        if not force and stamp == self._mtime:
+            return
+        table = RecordTable(self._rows() if stamp is not None else [])
+        names = {code: table.name[table.code_range(code)[0]] for code in table.codes}
+        name_tokens: Dict[str, set] = {}
+        for code, name in names.items():
+            for tok in _tokens(name):
+                name_tokens.setdefault(tok, set()).add(code)
+        with self._lock:
+            self.table = table
+            self.names = names
+            self.name_tokens = name_tokens
+            self.vocabulary = sorted(name_tokens)
+            self._mtime = stamp
+
+    def __len__(self):
+        return len(self.table)
+
+    @property
+    def codes(self) -> List[str]:
+        return self.table.codes
+
+    def by_exact_code(self, code: str, limit: Optional[int] = None, **filters) -> List[Dict[str, str]]:
+        table = self.table
+        return table.records(table.select(code=code.upper(), limit=limit, **filters))
+
+    def by_prefix(self, prefix: str, limit: int = 500, **filters) -> List[Dict[str, str]]:
+        table = self.table
+        return table.records(table.select(code_prefix=prefix.upper(), limit=limit, **filters))
+
+    def name_codes(self, text: str) -> List[str]:
+        """
+        Codes of courses whose name contains every word of `text`; each word may also match a
+        vocabulary word by prefix or by a close spelling (so "structres" finds "Structures").
+        """
+        words = _tokens(text)
+        if not words:
+            return []
+        matched: Optional[set] = None
+        for w in words:
+            codes = set()
+            i = bisect.bisect_left(self.vocabulary, w)
+            while i < len(self.vocabulary) and self.vocabulary[i].startswith(w):
+                codes |= self.name_tokens[self.vocabulary[i]]
+                i += 1
+            if not codes:
+                for close in difflib.get_close_matches(w, self.vocabulary, n=3, cutoff=0.8):
+                    codes |= self.name_tokens[close]
+            matched = codes if matched is None else matched & codes
+            if not matched:
+                return []
+        return sorted(matched)
+
+    def by_name(self, text: str, limit: int = 500, **filters) -> List[Dict[str, str]]:
+        codes = self.name_codes(text)
+        if not codes:
+            return []
+        table = self.table
+        return table.records(table.select(codes=codes, limit=limit, **filters))
+
+    def search(self, query: str, by: str = "code", limit: int = 500, exam_type: Optional[str] = None,
+               semester: Optional[str] = None, years: Optional[Tuple[Optional[int], Optional[int]]] = None
+               ) -> List[Dict[str, str]]:
+        """Lookup by code, prefix or name, keeping only rows of the given exam type, semester and year range."""
+        filters = dict(exam_type=exam_type, semester=semester, years=years)
+        if by == "name":
+            return self.by_name(query, limit, **filters)
+        if by == "prefix":
+            return self.by_prefix(query, limit, **filters)
+        return self.by_exact_code(query, limit, **filters)
@@ -0,0 +1,260 @@
+"""
+Parallel PDF download stage.
+
+Files are fetched by a bounded thread pool sharing one requests.Session whose
+connection pool is sized to the worker count. Requests are paced per host by
+a token bucket, transient failures are retried with exponential backoff, and
+every file ends up in a DownloadReport instead of being silently dropped.
+Each file is written to a `.part` file that is resumed on retry and only
+renamed into place once it checks out as a complete PDF (see resumable.py);
+files already complete on disk are not fetched again.
+"""
+from __future__ import annotations
+import contextvars
+import os
+import random
+import threading
+import time
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, List, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from tqdm import tqdm
+
+import metrics
+from pdf_cache import PdfCache
+from resumable import IncompleteDownload, fetch_part, finalize, is_complete_pdf, part_lock, part_path
+
+DOWNLOAD_WORKERS = int(os.environ.get("TIET_DOWNLOAD_WORKERS", "6"))           # files fetched at once
+DOWNLOAD_RATE_PER_HOST = float(os.environ.get("TIET_DOWNLOAD_RATE", "4.0"))  # new requests per second per host
+DOWNLOAD_RETRIES = 3          # extra attempts for transient failures
+RETRY_BACKOFF = 0.5           # seconds, doubled each attempt
+TRANSIENT_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+def download_pdf(session: requests.Session, url: str, dest: pathlib.Path, progress: bool = True,
+                 on_chunk: Optional[Callable[[int, int], None]] = None) -> int:
+    """
+    Stream url to dest via dest.part, resuming a part left by an earlier attempt, and rename it into
+    place once it is a complete PDF. Calls on_chunk(bytes_so_far, total) as data arrives.
+    Returns bytes transferred.
+    """
+    part = part_path(dest)
+    with part_lock(part), tqdm(unit="B", unit_scale=True, desc=dest.name, leave=False,
+                               disable=not progress) as pbar:
+        def chunk(done: int, total: int):
+            if total and pbar.total != total:
+                pbar.reset(total)
+            pbar.n = done
+            pbar.refresh()
+            if on_chunk: on_chunk(done, total)
+        _, transferred = fetch_part(session, url, part, timeout=60, on_chunk=chunk)
+        # dest may be a hard link into the PDF cache; replacing the name leaves the cached blob alone
+        finalize(part, dest)
+    return transferred
+
+
+class RateLimiter:
+    """Token bucket per host: at most `rate` request starts per second, bursts up to `burst`."""
+
+    def __init__(self, rate: float = DOWNLOAD_RATE_PER_HOST, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._buckets: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host: str):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, last = self._buckets.get(host, [self.burst, now])
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+                if tokens >= 1:
+                    self._buckets[host] = [tokens - 1, now]
+                    return
+                self._buckets[host] = [tokens, now]
+                wait = (1 - tokens) / self.rate
+            time.sleep(wait)
+
+
+def tune_session(session: requests.Session, workers: int = DOWNLOAD_WORKERS) -> requests.Session:
+    """
+    Size the session's connection pool so parallel workers reuse keep-alive connections. A session that
+    already has a large enough pool keeps it (and its open connections), so calling this per batch is cheap.
+    """
+    size = max(workers, 10)
+    if all(getattr(session.get_adapter(prefix), "_pool_maxsize", 0) >= size for prefix in ("https://", "http://")):
+        return session
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=size, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+@dataclass
+class DownloadJob:
+    url: str
+    dest: pathlib.Path
+    record: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class DownloadResult:
+    job: DownloadJob
+    ok: bool
+    bytes: int = 0
+    seconds: float = 0.0
+    attempts: int = 0
+    error: str = ""
+    cached: bool = False
+    skipped: bool = False  # already complete on disk
+
+
+@dataclass
+class DownloadReport:
+    results: List[DownloadResult] = field(default_factory=list)
+    total: int = 0
+    seconds: float = 0.0
+
+    @property
+    def done(self) -> int:
+        return sum(1 for r in self.results if r.ok)
+
+    @property
+    def failed(self) -> List[DownloadResult]:
+        return [r for r in self.results if not r.ok]
+
+    @property
+    def cache_hits(self) -> int:
+        return sum(1 for r in self.results if r.cached)
+
+    @property
+    def skipped(self) -> int:
+        return sum(1 for r in self.results if r.skipped)
+
+    @property
+    def bytes(self) -> int:
+        return sum(r.bytes for r in self.results)
+
+    @property
+    def throughput(self) -> float:
+        """Aggregate bytes per second over the wall-clock time of the stage."""
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> dict:
+        return {"done": self.done, "total": self.total, "cache_hits": self.cache_hits, "skipped": self.skipped,
+                "bytes": self.bytes,
+                "seconds": round(self.seconds, 3), "throughput": round(self.throughput, 1),
+                "failed": [{"file": r.job.dest.name, "url": r.job.url, "error": r.error} for r in self.failed]}
+
+    def summary(self) -> str:
+        return (f"Downloaded {self.done}/{self.total} file(s) ({self.cache_hits} from cache, "
+                f"{self.skipped} already on disk), "
+                f"{self.bytes / 1e6:.2f} MB in {self.seconds:.2f}s ({self.throughput / 1e6:.2f} MB/s)")
+
+
+def _is_transient(exc: Exception) -> bool:
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code in TRANSIENT_STATUS
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout,
+                            requests.exceptions.ChunkedEncodingError, IncompleteDownload))
+
+
+def _progress_emitter(job: DownloadJob, on_event, interval: float = 0.25):
+    """Per-chunk callback that reports a file's progress as download_progress events, at most every `interval`s."""
+    if on_event is None:
+        return None
+    last = [0.0]
+
+    def on_chunk(done: int, total: int):
+        now = time.monotonic()
+        if now - last[0] >= interval or (total and done >= total):
+            last[0] = now
+            on_event("download_progress", {"file": job.dest.name, "bytes": done, "total": total})
+    return on_chunk
+
+
+def _fetch(session, job: DownloadJob, limiter: RateLimiter, retries: int, progress: bool,
+           cache: Optional[PdfCache], on_event=None, on_result=None, skip_existing: bool = True) -> DownloadResult:
+    res = _fetch_with_retries(session, job, limiter, retries, progress, cache, on_event, skip_existing)
+    outcome = "failed" if not res.ok else "skipped" if res.skipped else "cached" if res.cached else "ok"
+    metrics.record("download", res.seconds, file=job.dest.name, result=outcome)
+    metrics.inc("tiet_downloads_total", result=outcome)
+    if res.bytes:
+        metrics.inc("tiet_download_bytes_total", res.bytes)
+    if on_result is not None:
+        try:
+            on_result(res)
+        except Exception as e:
+            # A failing callback (e.g. a merge step) must not abort the other downloads
+            print(f"Handling {job.dest.name} failed: {e}")
+    if on_event is not None:
+        on_event("download_done", {"file": res.job.dest.name, "ok": res.ok, "bytes": res.bytes,
+                                   "cached": res.cached, "skipped": res.skipped, "error": res.error})
+    return res
+
+
+def _fetch_with_retries(session, job: DownloadJob, limiter: RateLimiter, retries: int, progress: bool,
+                        cache: Optional[PdfCache], on_event, skip_existing: bool = True) -> DownloadResult:
+    host = urlparse(job.url).netloc
+    t0 = time.perf_counter()
+    # Papers don't change once posted, so a complete file from an earlier run is kept as-is
+    if skip_existing and job.dest.exists() and is_complete_pdf(job.dest):
+        return DownloadResult(job, True, 0, time.perf_counter() - t0, 0, skipped=True)
+    if cache is not None and cache.serve_fresh(job.url, job.dest):
+        return DownloadResult(job, True, 0, time.perf_counter() - t0, 0, cached=True)
+    on_chunk = _progress_emitter(job, on_event)
+    attempt = 0
+    while True:
+        attempt += 1
+        limiter.acquire(host)
+        try:
+            if cache is not None:
+                n, hit = cache.fetch(session, job.url, job.dest, on_chunk=on_chunk)
+                return DownloadResult(job, True, n, time.perf_counter() - t0, attempt, cached=hit)
+            n = download_pdf(session, job.url, job.dest, progress=progress, on_chunk=on_chunk)
+            return DownloadResult(job, True, n, time.perf_counter() - t0, attempt)
+        except Exception as e:
+            # dest is only ever replaced by a complete file, so there is nothing to clean up here;
+            # a partial transfer stays in its .part file for the next attempt or run to resume
+            if attempt > retries or not _is_transient(e):
+                return DownloadResult(job, False, 0, time.perf_counter() - t0, attempt, str(e))
+            delay = RETRY_BACKOFF * (2 ** (attempt - 1))
+            time.sleep(delay + random.uniform(0, delay / 2))
+
+
+def download_many(session: requests.Session, jobs: List[DownloadJob], workers: int = DOWNLOAD_WORKERS,
+                  rate_per_host: Optional[float] = None,
+                  retries: int = DOWNLOAD_RETRIES, cache: Optional[PdfCache] = None,
+                  on_event: Optional[Callable[[str, dict], None]] = None,
+                  on_result: Optional[Callable[[DownloadResult], None]] = None,
+                  skip_existing: bool = True) -> DownloadReport:
+    """
+    Fetch jobs concurrently, through `cache` if given. Results keep the order of `jobs`.
+    With skip_existing, destinations that already hold a complete PDF are left alone.
+    on_event(name, data) receives download_progress and download_done events from the worker threads;
+    on_result(result) is called as soon as each file has landed (or failed for good).
+    """
+    report = DownloadReport(total=len(jobs))
+    if not jobs:
+        return report
+    tune_session(session, workers)
+    # Resolved per call so sharded workers can lower their share of the rate (see shard.py)
+    limiter = RateLimiter(DOWNLOAD_RATE_PER_HOST if rate_per_host is None else rate_per_host)
+    # Per-file progress bars only make sense when files arrive one at a time
+    progress = workers == 1
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(jobs))),
+                            thread_name_prefix="download") as pool:
+        # Each task runs in a copy of the caller's context so its spans land in the caller's trace
+        futures = [pool.submit(contextvars.copy_context().run, _fetch, session, job, limiter, retries, progress,
+                               cache, on_event, on_result, skip_existing) for job in jobs]
+        report.results = [f.result() for f in futures]
+    report.seconds = time.perf_counter() - t0
+    return report
@@ -0,0 +1,231 @@
+"""
+Streaming export of search results as one download for a remote client.
+
+    exp = export.export_zip(records, session, "UCS503")
+    return StreamingResponse(exp.chunks, media_type=exp.media_type)
+
+export_zip() starts the downloads in the background and writes each paper
+into a ZIP as soon as it lands, so the first bytes go out after the first
+file rather than after the last one. The archive is written to a
+non-seekable sink (entries use data descriptors, no compression - PDFs are
+already compressed) that is drained after every block, so buffered memory
+stays around one EXPORT_CHUNK no matter how large the archive gets.
+export_merged() sends the merged PDF of a course, which can only start once
+the merge is done. Files are downloaded into a scratch directory that is
+removed once the export finishes or the client goes away.
+"""
+from __future__ import annotations
+import contextvars
+import io
+import os
+import pathlib
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Iterator, List, Optional
+
+import requests
+
+import metrics
+import papers
+from downloads import DownloadResult, download_many
+from pdf_cache import CACHE_DIR, default_cache
+
+EXPORT_CHUNK = 64 * 1024
+EXPORT_DIR = pathlib.Path(os.environ.get("TIET_EXPORT_DIR", CACHE_DIR / "exports"))
+STALE_AFTER = 6 * 3600  # scratch dirs of exports that never finished (e.g. never started streaming)
+
+
+@dataclass
+class Export:
+    filename: str
+    media_type: str
+    chunks: Iterator[bytes]
+
+
+class _Sink(io.RawIOBase):
+    """Write-only, non-seekable buffer that hands out what was written since the last drain()."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+
+class _Scratch:
+    """Scratch directory shared by `users` (download thread, response stream); removed when all are done."""
+
+    def __init__(self, users: int = 2):
+        EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+        for old in EXPORT_DIR.glob("export-*"):
+            try:
+                if time.time() - old.stat().st_mtime > STALE_AFTER:
+                    shutil.rmtree(old, ignore_errors=True)
+            except OSError:
+                pass
+        self.path = pathlib.Path(tempfile.mkdtemp(prefix="export-", dir=EXPORT_DIR))
+        self._users = users
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            self._users -= 1
+            last = self._users == 0
+        if last:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+
+def _stem(name: str) -> str:
+    return papers.normalize_filename(name) or "papers"
+
+
+def _copy_into(zf: zipfile.ZipFile, sink: _Sink, path: pathlib.Path, arcname: str) -> Iterator[bytes]:
+    """Stream path into the archive. Raises OSError before writing anything if the file can't be opened."""
+    f = open(path, "rb")
+    info = zipfile.ZipInfo(arcname, date_time=time.localtime(os.fstat(f.fileno()).st_mtime)[:6])
+    info.compress_type = zipfile.ZIP_STORED
+    with f, zf.open(info, "w") as entry:
+        for block in iter(lambda: f.read(EXPORT_CHUNK), b""):
+            entry.write(block)
+            yield sink.drain()
+
+
+def _zip_stream(root: pathlib.Path, landed: "queue.Queue[Optional[DownloadResult]]",
+                scratch: _Scratch) -> Iterator[bytes]:
+    sink = _Sink()
+    sent = 0
+    failed: List[DownloadResult] = []
+    written = set()
+    t0 = time.perf_counter()
+    try:
+        with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as zf:
+            while True:
+                res = landed.get()
+                if res is None:
+                    break
+                if not res.ok:
+                    failed.append(res)
+                    continue
+                arcname = res.job.dest.relative_to(root).as_posix()
+                if arcname in written:
+                    continue
+                try:
+                    for chunk in _copy_into(zf, sink, res.job.dest, arcname):
+                        if chunk:
+                            sent += len(chunk)
+                            yield chunk
+                except OSError as e:
+                    # Listed in FAILED.txt rather than cutting the archive short
+                    failed.append(replace(res, ok=False, error=f"{type(e).__name__}: {e}"))
+                    continue
+                written.add(arcname)
+                # The client has it now; free the scratch space as we go
+                res.job.dest.unlink(missing_ok=True)
+            if failed:
+                zf.writestr("FAILED.txt", "".join(f"{r.job.dest.name}\t{r.job.url}\t{r.error}\n" for r in failed))
+        tail = sink.drain()
+        sent += len(tail)
+        yield tail
+    finally:
+        metrics.record("export", time.perf_counter() - t0, format="zip")
+        metrics.inc("tiet_export_bytes_total", sent, format="zip")
+        scratch.release()
+
+
+def _start_thread(download: Callable[[], None]):
+    threading.Thread(target=contextvars.copy_context().run, args=(download,), name="export-download",
+                     daemon=True).start()
+
+
+def export_zip(records: List[papers.Record], session: requests.Session, name: str,
+               on_event=None, start: Callable[[Callable[[], None]], object] = _start_thread) -> Export:
+    """
+    Download records in the background and stream them as <name>.zip, one entry per paper as it lands.
+    start(download) runs the downloads (a thread of their own by default); whatever it raises, e.g. when
+    a job queue refuses them, is raised from here. If the client goes away, downloads already queued
+    still finish (and warm the PDF cache).
+    """
+    scratch = _Scratch()
+    jobs = [job for group in papers.plan_downloads(records, scratch.path).values() for job in group]
+    landed: "queue.Queue[Optional[DownloadResult]]" = queue.Queue()
+
+    def download():
+        try:
+            download_many(session, jobs, cache=default_cache(), on_event=on_event, on_result=landed.put)
+        finally:
+            landed.put(None)
+            scratch.release()
+
+    try:
+        start(download)
+    except BaseException:
+        shutil.rmtree(scratch.path, ignore_errors=True)
+        raise
+    metrics.inc("tiet_exports_total", format="zip")
+    return Export(f"{_stem(name)}.zip", "application/zip", _zip_stream(scratch.path, landed, scratch))
+
+
+def _file_stream(paths: Dict[str, pathlib.Path], root: pathlib.Path, scratch: _Scratch) -> Iterator[bytes]:
+    """A single file as-is, or several files as a ZIP."""
+    sent = 0
+    t0 = time.perf_counter()
+    try:
+        if len(paths) == 1:
+            path = next(iter(paths.values()))
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(EXPORT_CHUNK), b""):
+                    sent += len(block)
+                    yield block
+            return
+        sink = _Sink()
+        with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as zf:
+            for path in paths.values():
+                for chunk in _copy_into(zf, sink, path, path.relative_to(root).as_posix()):
+                    if chunk:
+                        sent += len(chunk)
+                        yield chunk
+        tail = sink.drain()
+        sent += len(tail)
+        yield tail
+    finally:
+        metrics.record("export", time.perf_counter() - t0, format="pdf")
+        metrics.inc("tiet_export_bytes_total", sent, format="pdf")
+        scratch.release()
+
+
+def export_merged(records: List[papers.Record], session: requests.Session, name: str,
+                  on_event=None) -> Optional[Export]:
+    """
+    Download and merge records, then stream the merged PDF (a ZIP of merged PDFs when the records
+    span several courses). Blocks until the merge is done; None if nothing could be downloaded.
+    """
+    scratch = _Scratch(users=1)
+    try:
+        papers.download_records(session, list(records), True, on_event, root=scratch.path)
+        merged = {key: papers.merged_path(key, scratch.path) for key in papers.plan_downloads(records, scratch.path)}
+        merged = {key: path for key, path in merged.items() if path.exists()}
+    except BaseException:
+        scratch.release()
+        raise
+    if not merged:
+        scratch.release()
+        return None
+    metrics.inc("tiet_exports_total", format="pdf")
+    if len(merged) == 1:
+        return Export(next(iter(merged.values())).name, "application/pdf", _file_stream(merged, scratch.path, scratch))
+    return Export(f"{_stem(name)}_merged.zip", "application/zip", _file_stream(merged, scratch.path, scratch))
@@ -0,0 +1,321 @@
+"""
+Browserless search backend for the Old Question Papers form.
+
+Instead of driving Chrome, this fetches the search page once, works out the
+form's action, method and fields, then submits course-code / course-name
+queries directly with a requests.Session and parses the results table from
+the returned HTML. Records have the same shape as row_to_record() output.
+"""
+from __future__ import annotations
+import os
+import re
+import threading
+from html.parser import HTMLParser
+from typing import List, Dict, Optional
+from urllib.parse import urljoin
+
+import requests
+import urllib3
+
+ROOT_URL = os.environ.get("TIET_ROOT_URL", "https://cl.thapar.edu")  # override to point at a mirror/replica
+OLD_PAPERS_PARTIAL_LINK = "Old Question Papers"
+RESULTS_BANNER = "These results matches your search criteria"
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/124.0 Safari/537.36")
+
+
+class HttpSearchError(RuntimeError):
+    """The direct HTTP path could not complete a search; callers should fall back to Selenium."""
+
+
+def _clean(t: str) -> str:
+    return re.sub(r"\s+", " ", t or "").strip()
+
+
+class _Form:
+    def __init__(self, action: str, method: str):
+        self.action = action
+        self.method = method
+        # dicts with tag/type/name/value/id/placeholder/label, in document order
+        self.controls: List[Dict[str, str]] = []
+
+
+class _PageParser(HTMLParser):
+    """Single pass over a page collecting links, forms and tables."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links: List[tuple] = []
+        self.forms: List[_Form] = []
+        self.tables: List[List[List[Dict]]] = []
+        self.text_parts: List[str] = []
+        self._form: Optional[_Form] = None
+        self._label: Optional[List[str]] = None
+        self._pending_label = ""
+        self._link: Optional[List] = None
+        self._table_stack: List[List] = []
+        self._row: Optional[List[Dict]] = None
+        self._cell: Optional[Dict] = None
+        self._select: Optional[Dict[str, str]] = None
+        self._button: Optional[Dict[str, str]] = None
+
+    def handle_starttag(self, tag, attrs):
+        a = {k: (v or "") for k, v in attrs}
+        if tag == "a":
+            self._link = [a.get("href", ""), []]
+        elif tag == "form":
+            self._form = _Form(a.get("action", ""), (a.get("method") or "get").lower())
+            self.forms.append(self._form)
+        elif tag == "label":
+            self._label = []
+        elif tag == "input" and self._form is not None:
+            ctl = {"tag": "input", "type": (a.get("type") or "text").lower(), "name": a.get("name", ""),
+                   "value": a.get("value", ""), "id": a.get("id", ""),
+                   "placeholder": a.get("placeholder", ""), "label": ""}
+            if ctl["type"] in {"checkbox", "radio"} and "checked" not in a:
+                ctl["name"] = ""  # unchecked boxes are not submitted
+            if ctl["type"] == "text" and self._pending_label:
+                ctl["label"] = self._pending_label
+                self._pending_label = ""
+            self._form.controls.append(ctl)
+        elif tag == "button" and self._form is not None:
+            self._button = {"tag": "button", "type": (a.get("type") or "submit").lower(),
+                            "name": a.get("name", ""), "value": a.get("value", ""), "id": a.get("id", ""),
+                            "placeholder": "", "label": "", "text": ""}
+            self._form.controls.append(self._button)
+        elif tag == "select" and self._form is not None:
+            self._select = {"tag": "select", "type": "select", "name": a.get("name", ""), "value": "",
+                            "id": a.get("id", ""), "placeholder": "", "label": "", "first": None}
+            self._form.controls.append(self._select)
+        elif tag == "option" and self._select is not None:
+            val = a.get("value", "")
+            if self._select["first"] is None:
+                self._select["first"] = val
+            if "selected" in a:
+                self._select["value"] = val
+        elif tag == "table":
+            self._table_stack.append([])
+            self.tables.append(self._table_stack[-1])
+        elif tag == "tr" and self._table_stack:
+            self._row = []
+            # mirror XPath './/tr': a row belongs to every enclosing table
+            for t in self._table_stack:
+                t.append(self._row)
+        elif tag in {"td", "th"} and self._row is not None:
+            self._cell = {"tag": tag, "text": [], "links": []}
+            self._row.append(self._cell)
+        elif tag == "br":
+            self.handle_data(" ")
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self._link is not None:
+            href, parts = self._link
+            text = _clean("".join(parts))
+            self.links.append((href, text))
+            if self._cell is not None:
+                self._cell["links"].append((href, text))
+            self._link = None
+        elif tag == "form":
+            self._form = None
+        elif tag == "label" and self._label is not None:
+            self._pending_label = _clean("".join(self._label)).lower()
+            self._label = None
+        elif tag == "button":
+            if self._button is not None:
+                self._button["text"] = _clean(self._button["text"])
+            self._button = None
+        elif tag == "select" and self._select is not None:
+            if not self._select["value"]:
+                self._select["value"] = self._select["first"] or ""
+            self._select = None
+        elif tag in {"td", "th"}:
+            if self._cell is not None:
+                self._cell["text"] = _clean("".join(self._cell["text"]))
+            self._cell = None
+        elif tag == "tr":
+            self._row = None
+        elif tag == "table" and self._table_stack:
+            self._table_stack.pop()
+
+    def handle_data(self, data):
+        self.text_parts.append(data)
+        if self._link is not None:
+            self._link[1].append(data)
+        if self._label is not None:
+            self._label.append(data)
+        if self._button is not None:
+            self._button["text"] += data
+        if self._cell is not None:
+            self._cell["text"].append(data)
+
+
+def _parse(html: str) -> _PageParser:
+    p = _PageParser()
+    p.feed(html)
+    p.close()
+    return p
+
+
+def records_from_tables(tables, base_url: str) -> List[Dict[str, str]]:
+    """Same selection rules as collect_results_rows() + row_to_record(), on parsed tables."""
+    for tbl in tables:
+        if len(tbl) < 2:
+            continue
+        out = []
+        for row in tbl[1:]:  # skip first row (header)
+            tds = [c for c in row if c["tag"] == "td"]
+            if len(tds) < 5:
+                continue
+            if tds[0]["text"].lower() in {"course code", "course_code"}:
+                continue
+            rec = {
+                "course_code": tds[0]["text"],
+                "course_name": tds[1]["text"],
+                "year": tds[2]["text"],
+                "semester": tds[3]["text"],
+                "exam_type": tds[4]["text"],
+                "download_href": "",
+            }
+            for c in row:
+                for href, text in c["links"]:
+                    if text.lower() == "download" and not rec["download_href"]:
+                        rec["download_href"] = urljoin(base_url, href) if href else ""
+            out.append(rec)
+        if out:
+            return out
+    return []
+
+
+def parse_results_html(html: str, base_url: str = ROOT_URL) -> List[Dict[str, str]]:
+    """Extract result records from a results page's HTML."""
+    return records_from_tables(_parse(html).tables, base_url)
+
+
+def _field_matches(ctl: Dict[str, str], word: str) -> bool:
+    if ctl["label"] and f"course {word}" in ctl["label"]:
+        return True
+    return any(word in ctl[k].lower() for k in ("placeholder", "name", "id"))
+
+
+class HttpSearchEngine:
+    def __init__(self, root_url: str = ROOT_URL, session: Optional[requests.Session] = None,
+                 timeout: float = 20, verify: bool = False):
+        self.root_url = root_url
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        self.session.verify = verify
+        if not verify:
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        self.search_url: Optional[str] = None
+        self._form: Optional[_Form] = None
+        self._lock = threading.Lock()
+
+    def discover(self):
+        """Find the Old Question Papers page and its search form. Cached until the next failure."""
+        r = self.session.get(self.root_url, timeout=self.timeout)
+        r.raise_for_status()
+        page = _parse(r.text)
+        href = next((h for h, t in page.links if OLD_PAPERS_PARTIAL_LINK.lower() in t.lower() and h), None)
+        if href is None:
+            raise HttpSearchError("Old Question Papers link not found")
+        search_url = urljoin(r.url, href)
+        r = self.session.get(search_url, timeout=self.timeout)
+        r.raise_for_status()
+        for form in _parse(r.text).forms:
+            texts = [c for c in form.controls if c["tag"] == "input" and c["type"] == "text"]
+            if any(_field_matches(c, "code") or _field_matches(c, "name") for c in texts):
+                self.search_url = r.url
+                self._form = form
+                return
+        raise HttpSearchError("search form not found on Old Question Papers page")
+
+    def warm(self) -> requests.Session:
+        """
+        The session, after it has visited the site once (discover()) so it carries the cookies a browser
+        would have, for downloading links found without a live search (e.g. from the result cache).
+        """
+        with self._lock:
+            if self._form is None:
+                try:
+                    self.discover()
+                except (HttpSearchError, requests.RequestException) as e:
+                    # Downloads are still attempted; they fail on their own if the site insists on cookies
+                    print(f"Could not open the search page for cookies: {e}")
+        return self.session
+
+    def _payload(self, form: _Form, by_code: bool, query: str):
+        word = "code" if by_code else "name"
+        target = next((c for c in form.controls
+                       if c["tag"] == "input" and c["type"] == "text" and c["name"] and _field_matches(c, word)), None)
+        if target is None:
+            raise HttpSearchError(f"course {word} field not found in search form")
+        data = []
+        submit = None
+        seen_target = False
+        for c in form.controls:
+            if c is target:
+                data.append((c["name"], query))
+                seen_target = True
+                continue
+            if c["type"] == "submit":
+                # Only the button that would be clicked is submitted: the first one after our field
+                if submit is None and seen_target:
+                    submit = c
+                continue
+            if c["type"] in {"button", "reset", "image", "file"} or not c["name"]:
+                continue
+            data.append((c["name"], c["value"]))
+        if submit is None:
+            submit = next((c for c in form.controls if c["type"] == "submit"), None)
+        if submit is not None and submit["name"]:
+            data.append((submit["name"], submit["value"]))
+        return data
+
+    def _submit(self, by_code: bool, query: str) -> List[Dict[str, str]]:
+        form = self._form
+        data = self._payload(form, by_code, query)
+        action = urljoin(self.search_url, form.action or self.search_url)
+        headers = {"Referer": self.search_url}
+        if form.method == "post":
+            r = self.session.post(action, data=data, headers=headers, timeout=self.timeout)
+        else:
+            r = self.session.get(action, params=data, headers=headers, timeout=self.timeout)
+        r.raise_for_status()
+        page = _parse(r.text)
+        records = records_from_tables(page.tables, r.url)
+        if records:
+            return records
+        text = " ".join(page.text_parts).lower()
+        if RESULTS_BANNER.lower() in text or "no results" in text or "no data" in text or "no record" in text:
+            return []
+        # Probably a scripted page we can't follow without a browser
+        raise HttpSearchError("results page not recognised")
+
+    def search(self, by_code: bool, query: str) -> List[Dict[str, str]]:
+        """Submit one query and return its records. Raises HttpSearchError if the direct path fails."""
+        try:
+            with self._lock:
+                if self._form is None:
+                    self.discover()
+            try:
+                return self._submit(by_code, query)
+            except (HttpSearchError, requests.RequestException):
+                # Hidden fields (view state, tokens) may have expired: rediscover once
+                with self._lock:
+                    self.discover()
+                return self._submit(by_code, query)
+        except requests.RequestException as e:
+            raise HttpSearchError(str(e)) from e
+
+
+_default_engine: Optional[HttpSearchEngine] = None
+_default_lock = threading.Lock()
+
+def default_engine() -> HttpSearchEngine:
+    """Process-wide engine so the form is discovered only once."""
+    global _default_engine
+    with _default_lock:
+        if _default_engine is None:
+            _default_engine = HttpSearchEngine()
+        return _default_engine
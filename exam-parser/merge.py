@@ -0,0 +1,291 @@
+"""
+Merge stage that overlaps with downloading.
+
+Each course group is merged in canonical year / semester / exam order. By
+default PDFs are appended to an in-process merger the moment they land (later
+papers wait only for earlier ones, never for the whole download), so only the
+final write remains once the last file is in. With TIET_MERGE_PROCESSES > 0
+and several groups, each group is instead handed to a worker process as soon
+as its last file lands: groups merge in parallel while other downloads
+continue, and each merge's memory is released when its worker exits.
+
+Memory is only capped in process mode. The in-process merger keeps every
+parsed source of a group until the final write (PyPDF2 has no streaming
+writer), so its peak grows with the group's total size and that memory
+stays in the calling process. Process mode holds at most
+TIET_MERGE_PROCESSES groups at once, each in a worker that gives its
+memory back when it exits; a batch with a single group still merges
+in-process.
+
+With a MergedCache, a group whose ordered source hashes were merged before is
+served from the cache, and a group that extends a cached merge (a new
+semester's paper) only has the new papers appended to the cached file. The
+in-process merger holds back (unread) any sources a cached merge may cover,
+so a cache hit costs no parsing at all.
+"""
+from __future__ import annotations
+import multiprocessing
+import os
+import pathlib
+import re
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import metrics
+from merged_cache import MergedCache
+from pdf_cache import link_or_copy, sha256_file
+
+# Worker processes cost ~0.5 s to spawn, so they only pay off for large multi-course merges (see benchmarks/bench_merge.py)
+MERGE_PROCESSES = int(os.environ.get("TIET_MERGE_PROCESSES", "0"))
+EXAM_ORDER = {"MST": 0, "EST": 1, "AUX": 2}
+
+
+def canonical_key(rec: Dict[str, str]):
+    """Oldest year first, then semester, then MST < EST < AUX."""
+    year = re.findall(r"\d{4}", rec.get("year", ""))
+    sem = rec.get("semester", "").strip().upper()
+    sem_num = re.findall(r"\d+", sem)
+    return (int(year[0]) if year else 0, int(sem_num[0]) if sem_num else 0, sem,
+            EXAM_ORDER.get(rec.get("exam_type", "").strip().upper(), len(EXAM_ORDER)), rec.get("exam_type", ""))
+
+
+def merge_pdfs(paths: List[str], dest: str) -> int:
+    """Merge paths into dest (written atomically). Runs in worker processes, so it must stay top-level."""
+    from PyPDF2 import PdfMerger
+    merger = PdfMerger()
+    try:
+        for p in paths:
+            merger.append(p, import_outline=False)
+        pages = len(merger.pages)
+        tmp = dest + ".part"
+        merger.write(tmp)
+    finally:
+        merger.close()
+    os.replace(tmp, dest)
+    return pages
+
+
+def page_count(path: pathlib.Path) -> int:
+    """Pages in a PDF, 0 if it can't be read."""
+    from PyPDF2 import PdfReader
+    try:
+        return len(PdfReader(str(path)).pages)
+    except Exception:
+        return 0
+
+
+class IncrementalMerger:
+    """
+    Appends one group's PDFs in canonical order as they land; out-of-order arrivals wait as paths only.
+    Every appended source stays parsed in memory until write(); nothing bounds that (see module docstring).
+    A source PyPDF2 cannot read fails the group: nothing more is appended and write() raises its error.
+
+    With a MergedCache (and `sha`, path -> source hash), sources that a cached merge may still cover are
+    held back unread. Once no cached merge starts with them, the longest cached prefix (if any) is appended
+    in their place and appending carries on from there; if the group completes while still `holding`,
+    the caller serves it from the cache instead and nothing was parsed for nothing.
+    """
+
+    def __init__(self, ordered: List[pathlib.Path], cache: Optional[MergedCache] = None,
+                 sha: Optional[Dict[pathlib.Path, str]] = None):
+        from PyPDF2 import PdfMerger
+        self.order = list(ordered)
+        self.landed: Dict[pathlib.Path, bool] = {}
+        self.appended: List[pathlib.Path] = []
+        self.cache = cache
+        self._sha = sha
+        self.held: List[pathlib.Path] = []
+        self.holding = cache is not None
+        self.reused = 0  # sources covered by the cached merge appended as the base
+        self._next = 0
+        self.error: Optional[Exception] = None
+        self._merger = PdfMerger()
+        self._lock = threading.Lock()
+
+    @property
+    def complete(self) -> bool:
+        return len(self.landed) == len(self.order)
+
+    def land(self, path: pathlib.Path, ok: bool):
+        with self._lock:
+            self.landed[path] = ok
+            while self._next < len(self.order) and self.order[self._next] in self.landed:
+                p = self.order[self._next]
+                if self.landed[p] and self.error is None:
+                    try:
+                        self._add(p)
+                    except Exception as e:
+                        # Runs on a download thread: keep the error for write() instead of raising here
+                        self.error = e
+                self._next += 1
+
+    def _add(self, p: pathlib.Path):
+        if not self.holding:
+            self._merger.append(str(p), import_outline=False)
+            self.appended.append(p)
+            return
+        hashes = [self._sha[q] for q in self.held + [p]]
+        if self.cache.covers(hashes):
+            self.held.append(p)
+            return
+        self.holding = False
+        todo, self.held = self.held + [p], []
+        base = self.cache.longest_prefix(hashes)
+        if base is not None:
+            self._merger.append(str(base[0]), import_outline=False)
+            self.reused = base[1]
+            todo = todo[base[1]:]
+        for q in todo:
+            self._merger.append(str(q), import_outline=False)
+            self.appended.append(q)
+
+    def write(self, dest: pathlib.Path) -> int:
+        with self._lock:
+            try:
+                if self.error is not None:
+                    raise self.error
+                pages = len(self._merger.pages)
+                tmp = dest.with_name(dest.name + ".part")
+                self._merger.write(str(tmp))
+            finally:
+                self._merger.close()
+            os.replace(tmp, dest)
+            return pages
+
+    def close(self):
+        self._merger.close()
+
+
+class MergePipeline:
+    """
+    Feed it download results (from any thread) with `landed()`; it merges each course group
+    into `dests[course_key]` once all of the group's files are in, then deletes the sources.
+    """
+
+    def __init__(self, groups: Dict[str, List], dests: Dict[str, pathlib.Path], processes: int = MERGE_PROCESSES,
+                 on_event: Optional[Callable[[str, dict], None]] = None, cache: Optional[MergedCache] = None):
+        # groups: course_key -> DownloadJobs; each job has .dest and .record
+        self.dests = dests
+        self.on_event = on_event
+        self.cache = cache
+        self._trace = metrics.current_trace()  # merges finish on executor threads, outside the caller's context
+        self._sha: Dict[pathlib.Path, str] = {}
+        self._owner: Dict[pathlib.Path, str] = {}
+        self._pending: Dict[str, set] = {}
+        self._ok: Dict[str, List] = {}
+        self._order: Dict[str, List[pathlib.Path]] = {}
+        self._incremental: Dict[str, IncrementalMerger] = {}
+        self._finished: List[threading.Event] = []
+        self._lock = threading.Lock()
+        self.merged: Dict[str, pathlib.Path] = {}
+        for key, jobs in groups.items():
+            ordered = [j.dest for j in sorted(jobs, key=lambda j: canonical_key(j.record))]
+            self._order[key] = ordered
+            self._pending[key] = set(ordered)
+            self._ok[key] = []
+            for p in ordered:
+                self._owner[p] = key
+        self.use_processes = processes > 0 and len(groups) > 1
+        if self.use_processes:
+            self._executor = ProcessPoolExecutor(max_workers=min(processes, len(groups)),
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="merge")
+            self._incremental = {key: IncrementalMerger(order, cache, self._sha) for key, order in self._order.items()}
+
+    def landed(self, path: pathlib.Path, ok: bool):
+        key = self._owner.get(path)
+        if key is None:
+            return
+        if ok and self.cache is not None:
+            self._sha[path] = sha256_file(path)
+        if not self.use_processes:
+            self._incremental[key].land(path, ok)
+        with self._lock:
+            self._pending[key].discard(path)
+            if ok:
+                self._ok[key].append(path)
+            if self._pending[key]:
+                return
+            ok_paths = [p for p in self._order[key] if p in set(self._ok[key])]
+        if len(ok_paths) < 2:
+            if not self.use_processes:
+                self._incremental[key].close()
+            if ok_paths:
+                # A one-paper course still gets its merged file: the paper itself
+                dest = self.dests[key]
+                link_or_copy(ok_paths[0], dest)
+                metrics.inc("tiet_merges_total", source="single")
+                self._done(key, dest, ok_paths, page_count(dest))
+            return
+        dest = self.dests[key]
+        hashes = [self._sha[p] for p in ok_paths] if self.cache is not None else []
+        reused = 0
+        merger = None if self.use_processes else self._incremental[key]
+        if merger is not None and not merger.holding:
+            # Everything was appended as it landed, onto a cached prefix if one matched
+            reused = merger.reused
+            fut = self._executor.submit(merger.write, dest)
+        else:
+            if merger is not None:
+                merger.close()
+            if self.cache is not None:
+                hit = self.cache.get(hashes)
+                if hit is not None:
+                    link_or_copy(hit[0], dest)
+                    metrics.inc("tiet_merges_total", source="cache")
+                    self._done(key, dest, ok_paths, hit[1], reused=len(ok_paths))
+                    return
+                base = self.cache.longest_prefix(hashes)
+                if base is not None:
+                    # Append only the papers the cached merge doesn't have yet
+                    reused = base[1]
+                    fut = self._executor.submit(merge_pdfs, [str(base[0])] + [str(p) for p in ok_paths[reused:]],
+                                                str(dest))
+            if not reused:
+                fut = self._executor.submit(merge_pdfs, [str(p) for p in ok_paths], str(dest))
+        finished = threading.Event()
+        with self._lock:
+            self._finished.append(finished)
+        started = time.perf_counter()
+        fut.add_done_callback(lambda f: self._merged(f, key, dest, ok_paths, hashes, reused, finished, started))
+
+    def _merged(self, fut: Future, key: str, dest: pathlib.Path, paths: List[pathlib.Path], hashes: List[str],
+                reused: int, finished: threading.Event, started: float):
+        try:
+            metrics.record("merge", time.perf_counter() - started, started, trace=self._trace, file=dest.name)
+            if fut.exception() is not None:
+                print(f"Merging {key} failed: {fut.exception()}")
+                metrics.inc("tiet_merges_total", source="failed")
+                return
+            metrics.inc("tiet_merges_total", source="append" if reused else "merge")
+            if self.cache is not None:
+                try:
+                    self.cache.put(hashes, dest, fut.result())
+                except OSError as e:
+                    print(f"Could not cache merged {dest.name}: {e}")
+            self._done(key, dest, paths, fut.result(), reused)
+        finally:
+            finished.set()
+
+    def _done(self, key: str, dest: pathlib.Path, paths: List[pathlib.Path], pages: int, reused: int = 0):
+        self.merged[key] = dest
+        if self.on_event is not None:
+            self.on_event("merge_done", {"file": dest.name, "sources": len(paths), "pages": pages,
+                                         "reused": reused})
+        for pdf in paths:
+            try:
+                pdf.unlink()
+            except Exception:
+                pass
+
+    def wait(self) -> Dict[str, pathlib.Path]:
+        """Block until every started merge has finished (sources removed). Returns course_key -> merged file."""
+        with self._lock:
+            finished = list(self._finished)
+        for ev in finished:
+            ev.wait()
+        self._executor.shutdown(wait=True)
+        return self.merged
@@ -0,0 +1,140 @@
+"""
+Cache of merged PDFs, keyed by the ordered list of source PDF hashes.
+
+A request whose sources (in merge order) match a stored artifact exactly is
+served by linking that artifact into place. When a course gains a paper
+(a new semester), the longest stored artifact whose sources are a prefix of
+the new list is used as the base, and only the new papers are appended to it
+instead of re-merging every source. Artifacts live under `CACHE_DIR/merged`
+and are evicted least-recently-used beyond their own byte budget.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from pdf_cache import CACHE_DIR, link_or_copy
+
+MERGED_CACHE_MAX_BYTES = int(os.environ.get("TIET_MERGED_CACHE_MAX_BYTES", 1024 ** 3))
+MERGED_CACHE_ENABLED = os.environ.get("TIET_MERGED_CACHE", "1") != "0"
+
+
+def artifact_key(sources: List[str]) -> str:
+    return hashlib.sha256("\n".join(sources).encode()).hexdigest()
+
+
+class MergedCache:
+    def __init__(self, root: pathlib.Path = CACHE_DIR, max_bytes: int = MERGED_CACHE_MAX_BYTES):
+        self.root = pathlib.Path(root) / "merged"
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.root / "merged_index.sqlite3"), check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # first_source narrows prefix lookups to artifacts that could possibly match
+        self._db.execute("CREATE TABLE IF NOT EXISTS artifacts (key TEXT PRIMARY KEY, first_source TEXT, "
+                         "sources TEXT, pages INTEGER, size INTEGER, last_access REAL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS artifacts_first ON artifacts(first_source)")
+        self.stats = {"hits": 0, "appends": 0, "misses": 0, "evictions": 0}
+
+    def path(self, key: str) -> pathlib.Path:
+        return self.root / f"{key}.pdf"
+
+    def _touch(self, key: str):
+        with self._lock:
+            self._db.execute("UPDATE artifacts SET last_access=? WHERE key=?", (time.time(), key))
+
+    def get(self, sources: List[str]) -> Optional[Tuple[pathlib.Path, int]]:
+        """(artifact, pages) merged from exactly `sources` in this order, or None."""
+        key = artifact_key(sources)
+        with self._lock:
+            row = self._db.execute("SELECT pages FROM artifacts WHERE key=?", (key,)).fetchone()
+        if row is None or not self.path(key).exists():
+            return None
+        self._touch(key)
+        with self._lock:
+            self.stats["hits"] += 1
+        return self.path(key), row[0]
+
+    def covers(self, sources: List[str]) -> bool:
+        """Whether a stored artifact starts with `sources` (so its merge could stand in for them). Not counted."""
+        if not sources:
+            return False
+        with self._lock:
+            rows = self._db.execute("SELECT key, sources FROM artifacts WHERE first_source=?",
+                                    (sources[0],)).fetchall()
+        return any(json.loads(stored)[:len(sources)] == sources and self.path(key).exists() for key, stored in rows)
+
+    def longest_prefix(self, sources: List[str]) -> Optional[Tuple[pathlib.Path, int]]:
+        """(artifact, number of sources it covers) for the longest stored proper prefix of `sources`."""
+        if not sources:
+            return None
+        with self._lock:
+            rows = self._db.execute("SELECT key, sources FROM artifacts WHERE first_source=?",
+                                    (sources[0],)).fetchall()
+        best = None
+        for key, stored in rows:
+            stored = json.loads(stored)
+            n = len(stored)
+            if n < len(sources) and sources[:n] == stored and (best is None or n > best[1]):
+                if self.path(key).exists():
+                    best = (key, n)
+        if best is None:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        self._touch(best[0])
+        with self._lock:
+            self.stats["appends"] += 1
+        return self.path(best[0]), best[1]
+
+    def put(self, sources: List[str], merged: pathlib.Path, pages: int):
+        """Store a copy (hard link where possible) of `merged`, built from `sources` in order."""
+        key = artifact_key(sources)
+        link_or_copy(merged, self.path(key))
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?, ?)",
+                             (key, sources[0], json.dumps(sources), pages, merged.stat().st_size, time.time()))
+        self._evict(keep=key)
+
+    def _evict(self, keep: Optional[str] = None):
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            victims = []
+            for key, size in self._db.execute("SELECT key, size FROM artifacts ORDER BY last_access"):
+                if total <= self.max_bytes:
+                    break
+                if key == keep:
+                    continue
+                victims.append(key)
+                total -= size
+            for key in victims:
+                self._db.execute("DELETE FROM artifacts WHERE key=?", (key,))
+                self.stats["evictions"] += 1
+        for key in victims:
+            try:
+                self.path(key).unlink()
+            except OSError:
+                pass
+
+
+_default_cache: Optional[MergedCache] = None
+_default_lock = threading.Lock()
+
+def default_merged_cache() -> Optional[MergedCache]:
+    """Process-wide merged-artifact cache, or None when disabled with TIET_MERGED_CACHE=0."""
+    global _default_cache
+    if not MERGED_CACHE_ENABLED:
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = MergedCache()
+        return _default_cache
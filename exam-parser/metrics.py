@@ -0,0 +1,210 @@
+"""
+Timing spans and counters for the scrape pipeline, rendered in the Prometheus text format.
+
+    with metrics.span("results_wait"):
+        ...
+    metrics.inc("tiet_rows_found_total", len(records))
+
+Every span is observed in the `tiet_phase_seconds{phase=...}` histogram. While
+a trace is active (see trace()), spans and counter increments made in the same
+context are also collected, and written as JSON to TIET_TRACE_DIR (when set) when
+the trace ends. Work handed to other threads keeps the trace if it is submitted
+through contextvars.copy_context().run.
+"""
+from __future__ import annotations
+import contextvars
+import json
+import os
+import pathlib
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+TRACE_DIR = os.environ.get("TIET_TRACE_DIR", "")
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+HELP = {
+    "tiet_phase_seconds": "Time spent per pipeline phase",
+    "tiet_download_bytes_total": "Bytes downloaded over the network",
+    "tiet_downloads_total": "Files downloaded, by result",
+    "tiet_rows_found_total": "Result rows returned by searches",
+    "tiet_result_cache_total": "Search-result cache lookups, by result",
+    "tiet_result_refreshes_total": "Background refreshes of stale search results, by outcome (ok, failed, dropped)",
+    "tiet_searches_total": "Live searches, by engine and outcome",
+    "tiet_merges_total": "Merged PDFs written, by source",
+    "tiet_exports_total": "Streaming exports started, by format",
+    "tiet_export_bytes_total": "Bytes sent to clients by streaming exports",
+    "tiet_shard_tasks_total": "Tasks finished by shard workers, by kind and outcome",
+    "tiet_shard_queue": "Tasks waiting for a shard worker",
+    "tiet_admission_queue": "Backend jobs waiting for admission, by priority",
+    "tiet_admission_running": "Backend jobs admitted and running, by priority",
+    "tiet_admission_wait_seconds": "Time backend jobs waited in the admission queue, by priority",
+    "tiet_admission_rejected_total": "Requests turned away with 429, by reason",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, Labels], float] = {}
+_gauges: Dict[Tuple[str, Labels], float] = {}
+# (name, labels) -> [bucket counts..., +Inf count, sum]
+_histograms: Dict[Tuple[str, Labels], List[float]] = {}
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Trace:
+    """Spans and counter increments of one run, in the order they finished."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.spans: List[dict] = []
+        self.counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, phase: str, start: float, seconds: float, labels: Labels):
+        with self._lock:
+            self.spans.append({"phase": phase, "start": round(start - self._t0, 4), "seconds": round(seconds, 4),
+                               "thread": threading.current_thread().name, **dict(labels)})
+
+    def add_count(self, name: str, value: float):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def totals(self) -> Dict[str, float]:
+        """Seconds per phase, summed over every span of that phase."""
+        out: Dict[str, float] = {}
+        with self._lock:
+            for s in self.spans:
+                out[s["phase"]] = round(out.get(s["phase"], 0) + s["seconds"], 4)
+        return out
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+        return {"name": self.name, "started": self.started, "seconds": round(time.perf_counter() - self._t0, 4),
+                "phases": self.totals(), "counters": counters, "spans": spans}
+
+
+_current: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("tiet_trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def trace(name: str, trace_dir: str = TRACE_DIR) -> Iterator[Trace]:
+    """Collect everything recorded in this context into a Trace; write it to trace_dir (if set) at the end."""
+    tr = Trace(name)
+    token = _current.set(tr)
+    try:
+        yield tr
+    finally:
+        _current.reset(token)
+        if trace_dir:
+            try:
+                path = pathlib.Path(trace_dir)
+                path.mkdir(parents=True, exist_ok=True)
+                slug = re.sub(r"[^\w.-]+", "_", name).strip("_")[:60] or "run"
+                stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(tr.started))
+                fname = f"{stamp}.{int(tr.started * 1000) % 1000:03d}_{slug}.json"
+                (path / fname).write_text(json.dumps(tr.to_dict(), indent=1))
+            except OSError as e:
+                print(f"Could not write trace: {e}")
+
+
+def observe(name: str, value: float, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [0.0] * (len(BUCKETS) + 2)
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                h[i] += 1
+        h[len(BUCKETS)] += 1
+        h[len(BUCKETS) + 1] += value
+
+
+def record(phase: str, seconds: float, start: Optional[float] = None, trace: Optional[Trace] = None, **labels):
+    """Record a phase that was timed elsewhere (e.g. in a callback running outside the trace's context)."""
+    observe("tiet_phase_seconds", seconds, phase=phase)
+    tr = trace or _current.get()
+    if tr is not None:
+        tr.add_span(phase, start if start is not None else time.perf_counter() - seconds, seconds, _labels(labels))
+
+
+@contextmanager
+def span(phase: str, **labels):
+    """Time the block as one `phase` span, even if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, time.perf_counter() - start, start, **labels)
+
+
+def inc(name: str, value: float = 1, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+    tr = _current.get()
+    if tr is not None:
+        suffix = ",".join(f"{k}={v}" for k, v in key[1])
+        tr.add_count(f"{name}{{{suffix}}}" if suffix else name, value)
+
+
+def set_gauge(name: str, value: float, **labels):
+    with _lock:
+        _gauges[(name, _labels(labels))] = value
+
+
+def _num(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _fmt(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    items = labels + extra
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        histograms = {k: list(v) for k, v in _histograms.items()}
+    lines: List[str] = []
+    seen = set()
+
+    def header(name: str, kind: str):
+        if name not in seen:
+            seen.add(name)
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(counters.items()):
+        header(name, "counter")
+        lines.append(f"{name}{_fmt(labels)} {_num(value)}")
+    for (name, labels), value in sorted(gauges.items()):
+        header(name, "gauge")
+        lines.append(f"{name}{_fmt(labels)} {_num(value)}")
+    for (name, labels), h in sorted(histograms.items()):
+        header(name, "histogram")
+        for bound, count in zip(BUCKETS, h):
+            lines.append(f"{name}_bucket{_fmt(labels, (('le', f'{bound:g}'),))} {_num(count)}")
+        lines.append(f"{name}_bucket{_fmt(labels, (('le', '+Inf'),))} {_num(h[len(BUCKETS)])}")
+        lines.append(f"{name}_sum{_fmt(labels)} {h[len(BUCKETS) + 1]:.6f}")
+        lines.append(f"{name}_count{_fmt(labels)} {_num(h[len(BUCKETS)])}")
+    return "\n".join(lines) + "\n"
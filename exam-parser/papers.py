@@ -0,0 +1,437 @@
+"""
+Importable API for searching and downloading TIET old question papers.
+
+    import papers
+    records = papers.search("UCS503", by="code", exam_filter="MST")
+    report = papers.download(records, merge=True)
+    batch = papers.run_batch(["UCS503", ("Data Structures", "name")])
+
+This module does not import Selenium, webdriver_manager or PyPDF2 at load
+time. Searches answered from the result cache or by the HTTP engine never
+load Selenium at all. It is imported only when a search falls back to a
+browser, and PyPDF2 only when a merge is requested.
+"""
+from __future__ import annotations
+import os
+import re
+import pathlib
+import contextvars
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple, TypedDict, Union
+
+import requests
+
+from http_search import ROOT_URL, HttpSearchError, default_engine
+from downloads import DownloadJob, DownloadReport, download_many
+from pdf_cache import default_cache
+from result_cache import default_result_cache
+from merge import MergePipeline
+from merged_cache import default_merged_cache
+import metrics
+
+# Download to user's Downloads folder
+DOWNLOAD_DIR = pathlib.Path(os.environ.get("TIET_DOWNLOAD_DIR", pathlib.Path.home() / "Downloads" / "ThaparPapers"))
+# "selenium" drives Chrome; "http" submits the form directly and falls back to Selenium on failure
+SEARCH_ENGINE = os.environ.get("TIET_SEARCH_ENGINE", "selenium")
+
+EventCallback = Callable[[str, dict], None]
+
+
+class Record(TypedDict):
+    course_code: str
+    course_name: str
+    year: str
+    semester: str
+    exam_type: str
+    download_href: str
+
+
+class SearchResults(list):
+    """A list of records that remembers the session able to download them (cookies from the search)."""
+
+    def __init__(self, records=(), session: Optional[requests.Session] = None):
+        super().__init__(records)
+        self.session = session
+
+
+class SearchTimeout(RuntimeError):
+    """The results page never loaded."""
+
+
+@dataclass
+class QueryResult:
+    """Outcome of run(): the matched records, the download report, the one-line status message and seconds per phase."""
+    message: str
+    records: List[Record] = field(default_factory=list)
+    report: Optional[DownloadReport] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return self.message.startswith("SUCCESS")
+
+    def to_dict(self) -> dict:
+        return {"output": self.message, "records": list(self.records),
+                "report": self.report.to_dict() if self.report else None, "timings": self.timings}
+
+
+@dataclass
+class CourseReport:
+    """One query of a batch: its outcome plus how long searching and downloading took."""
+    query: str
+    by: str
+    message: str = ""
+    found: int = 0
+    report: Optional[DownloadReport] = None
+    search_seconds: float = 0.0
+    download_seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {"query": self.query, "by": self.by, "output": self.message, "found": self.found,
+                "report": self.report.to_dict() if self.report else None,
+                "search_seconds": round(self.search_seconds, 3),
+                "download_seconds": round(self.download_seconds, 3)}
+
+
+@dataclass
+class BatchResult:
+    """Outcome of run_batch(): a report per course plus wall-clock totals for the whole batch."""
+    courses: List[CourseReport] = field(default_factory=list)
+    seconds: float = 0.0
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def files(self) -> int:
+        return sum(c.report.done for c in self.courses if c.report)
+
+    @property
+    def bytes(self) -> int:
+        return sum(c.report.bytes for c in self.courses if c.report)
+
+    @property
+    def throughput(self) -> float:
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> dict:
+        return {"output": self.summary(), "courses": [c.to_dict() for c in self.courses], "files": self.files,
+                "bytes": self.bytes, "seconds": round(self.seconds, 3), "throughput": round(self.throughput, 1),
+                "timings": self.timings}
+
+    def summary(self) -> str:
+        ok = sum(1 for c in self.courses if c.message.startswith("SUCCESS"))
+        return (f"{'SUCCESS' if ok else 'FAILED'}: {ok}/{len(self.courses)} course(s), {self.files} file(s), "
+                f"{self.bytes / 1e6:.2f} MB in {self.seconds:.2f}s ({self.throughput / 1e6:.2f} MB/s)")
+
+
+def normalize_course_code(course_code: str) -> str:
+    """
+    Normalize course code to handle different formats:
+    - Remove hyphens and spaces
+    - Convert to uppercase
+    - Examples: 'ucs503' -> 'UCS503', 'ucs-503' -> 'UCS503', 'UCS-530' -> 'UCS530'
+    """
+    if not course_code:
+        return ""
+    
+    # Remove hyphens, spaces, and convert to uppercase
+    normalized = course_code.replace('-', '').replace(' ', '').upper()
+    return normalized
+
+def normalize_filename(t: str) -> str:
+    t = re.sub(r"[^\w\s.-]", "", t).strip()
+    return re.sub(r"\s+", "_", t) or "file"
+
+def emit(on_event, name: str, **data):
+    """Report a progress event to an optional on_event(name, data) listener."""
+    if on_event is not None:
+        on_event(name, data)
+
+def plan_downloads(chosen: List[Dict[str, str]], root: Optional[pathlib.Path] = None) -> Dict[str, List[DownloadJob]]:
+    """Download jobs for the chosen records, grouped per course into root/<course>/ (default DOWNLOAD_DIR)."""
+    root = root or DOWNLOAD_DIR
+    groups: Dict[str, List[Dict[str, str]]] = {}
+    for rec in chosen:
+        key = f"{rec['course_code']}__{normalize_filename(rec['course_name'])}"
+        groups.setdefault(key, []).append(rec)
+
+    jobs: Dict[str, List[DownloadJob]] = {}
+    for course_key, group in groups.items():
+        cdir = root / course_key
+        cdir.mkdir(parents=True, exist_ok=True)
+        planned: Dict[pathlib.Path, str] = {}  # dest -> href
+        for rec in group:
+            href = rec["download_href"]
+            if not href: continue
+            if href.startswith("/"): href = ROOT_URL.rstrip("/") + href
+            stem = f"{rec['course_code']}_{normalize_filename(rec['course_name'])}_{rec['year']}_{rec['semester']}_{rec['exam_type']}"
+            dest, n = cdir / f"{stem}.pdf", 1
+            # The same paper listed twice is fetched once; different papers sharing a name get _2, _3, ...
+            while dest in planned and planned[dest] != href:
+                n += 1
+                dest = cdir / f"{stem}_{n}.pdf"
+            if dest in planned:
+                continue
+            planned[dest] = href
+            jobs.setdefault(course_key, []).append(DownloadJob(href, dest, rec))
+    return jobs
+
+def merged_path(course_key: str, root: Optional[pathlib.Path] = None) -> pathlib.Path:
+    return (root or DOWNLOAD_DIR) / course_key / f"{course_key}_merged.pdf"
+
+def download_records(session: requests.Session, chosen: List[Dict[str, str]], merge: bool,
+                     on_event=None, root: Optional[pathlib.Path] = None) -> DownloadReport:
+    """Download the chosen records in parallel, grouped per course, optionally merging each group."""
+    root = root or DOWNLOAD_DIR
+    jobs = plan_downloads(chosen, root)
+    pipeline = None
+    if merge:
+        # Merging starts while downloads are still in flight
+        pipeline = MergePipeline(jobs, {key: merged_path(key, root) for key in jobs},
+                                 on_event=on_event, cache=default_merged_cache())
+    report = download_many(session, [job for group in jobs.values() for job in group], cache=default_cache(),
+                           on_event=on_event,
+                           on_result=(lambda r: pipeline.landed(r.job.dest, r.ok)) if pipeline else None)
+    for res in report.failed:
+        print(f"Failed to download {res.job.dest.name} after {res.attempts} attempt(s): {res.error}")
+    print(report.summary())
+    if pipeline is not None:
+        with metrics.span("merge_wait"):
+            pipeline.wait()
+    return report
+
+def search_live(by_code: bool, query: str, engine: str = SEARCH_ENGINE, checkout=None):
+    """
+    Search the live site. Returns (records, session) where session can download the hrefs.
+    `checkout` is a context-manager factory yielding a driver on the search page (defaults to new_driver).
+    """
+    if engine == "http":
+        http = default_engine()
+        try:
+            with metrics.span("http_search"):
+                records = http.search(by_code, query)
+            metrics.inc("tiet_searches_total", engine="http", outcome="ok")
+            return records, http.session
+        except HttpSearchError as e:
+            metrics.inc("tiet_searches_total", engine="http", outcome="failed")
+            print(f"HTTP search failed, falling back to Selenium: {e}")
+    # Selenium is only imported when a search actually needs a browser
+    import tiet_papers_downloader as tpd
+    t0 = time.perf_counter()
+    with (checkout or tpd.new_driver)() as driver:
+        # Covers starting a browser (new_driver) or waiting for a pooled one
+        metrics.record("driver_checkout", time.perf_counter() - t0, t0)
+        records = tpd.search_records(driver, by_code, query)
+        metrics.inc("tiet_searches_total", engine="selenium", outcome="ok" if records is not None else "timeout")
+        return records, tpd.requests_session_from_driver(driver)
+
+def search_any(by_code: bool, query: str, engine: str = SEARCH_ENGINE, checkout=None, use_cache: bool = True,
+               on_event=None):
+    """
+    search_live() behind the result cache: fresh entries skip the site entirely,
+    stale ones are returned at once and refreshed in the background.
+    """
+    emit(on_event, "search_started", query=query, by="code" if by_code else "name")
+    cache = default_result_cache() if use_cache else None
+    if cache is not None:
+        hit = cache.get(by_code, query)
+        if hit is not None:
+            records, fresh = hit
+            metrics.inc("tiet_result_cache_total", result="hit" if fresh else "stale")
+            print(f"Result cache {'hit' if fresh else 'hit (stale)'} for: {query}")
+            if not fresh:
+                cache.refresh_async(by_code, query, lambda: search_live(by_code, query, engine, checkout)[0])
+            return records, default_engine().warm()
+        metrics.inc("tiet_result_cache_total", result="miss")
+    records, session = search_live(by_code, query, engine, checkout)
+    if cache is not None and records is not None:
+        cache.put(by_code, query, records)
+    return records, session
+
+def search(query: str, by: str = "code", exam_filter: str = "all", engine: str = SEARCH_ENGINE,
+           checkout=None, use_cache: bool = True, on_event: Optional[EventCallback] = None) -> SearchResults:
+    """
+    Find papers by course code (`by="code"`) or part of a course name (`by="name"`).
+    Raises SearchTimeout if the site never returned a results page.
+    """
+    by_code = by != "name"
+    query = normalize_course_code(query.strip()) if by_code else query.strip()
+    records, session = search_any(by_code, query, engine, checkout, use_cache, on_event)
+    if records is None:
+        raise SearchTimeout("Search results did not load within timeout period.")
+    metrics.inc("tiet_rows_found_total", len(records))
+    if exam_filter != "all":
+        records = [rec for rec in records if rec["exam_type"] == exam_filter]
+    return SearchResults(records, session)
+
+def download(records: List[Record], merge: bool = False, session: Optional[requests.Session] = None,
+             on_event: Optional[EventCallback] = None) -> DownloadReport:
+    """Download records into DOWNLOAD_DIR/<course>/, optionally merging each course into one PDF."""
+    session = session or getattr(records, "session", None) or default_engine().warm()
+    return download_records(session, list(records), merge, on_event)
+
+def run(query: str, by: str = "code", exam_filter: str = "all", merge: bool = False,
+        engine: str = SEARCH_ENGINE, checkout=None, use_cache: bool = True,
+        on_event: Optional[EventCallback] = None) -> QueryResult:
+    """
+    Search, then download every match. on_event(name, data) is told about each step:
+    search_started, rows_found, record, download_progress, download_done and merge_done.
+    The result's `timings` holds seconds per phase; set TIET_TRACE_DIR to also keep a JSON trace per run.
+    """
+    with metrics.trace(f"{by} {query}") as tr:
+        with metrics.span("run"):
+            result = _run(query, by, exam_filter, merge, engine, checkout, use_cache, on_event)
+    result.timings = tr.totals()
+    return result
+
+def _run(query: str, by: str, exam_filter: str, merge: bool, engine: str, checkout, use_cache: bool,
+         on_event) -> QueryResult:
+    try:
+        found = search(query, by, "all", engine, checkout, use_cache, on_event)
+    except SearchTimeout as e:
+        return QueryResult(str(e))
+    emit(on_event, "rows_found", count=len(found))
+    if not found:
+        return QueryResult("No results found.")
+
+    # Apply exam type filter if specified
+    records = found if exam_filter == "all" else [rec for rec in found if rec["exam_type"] == exam_filter]
+    if not records:
+        return QueryResult(f"No results found for exam type: {exam_filter}")
+
+    for rec in records:
+        emit(on_event, "record", **rec)
+    report = download(records, merge, found.session, on_event)
+    return QueryResult(f"SUCCESS: Downloaded {report.done}/{report.total} file(s) to Downloads/ThaparPapers/",
+                       records, report)
+
+def run_search(by_code: bool, query: str, merge: bool = False, exam_filter: str = "all",
+               engine: str = SEARCH_ENGINE, checkout=None, use_cache: bool = True, on_event=None) -> str:
+    """
+    Non-interactive search + download of every match.
+    Returns the one-line status message the frontend looks for ("SUCCESS: ..." / "No results found").
+    """
+    return run(query, "code" if by_code else "name", exam_filter, merge, engine, checkout, use_cache,
+               on_event).message
+
+BatchQuery = Union[str, Tuple[str, str]]
+
+def read_batch_file(path: Union[str, pathlib.Path]) -> List[Tuple[str, str]]:
+    """
+    One query per line: a course code, or "name: <course name>". Blank lines and # comments are skipped.
+    """
+    queries = []
+    for line in pathlib.Path(path).read_text().splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        if line.lower().startswith("name:"):
+            queries.append((line[5:].strip(), "name"))
+        else:
+            queries.append((line, "code"))
+    return queries
+
+def run_batch(queries: List[BatchQuery], exam_filter: str = "all", merge: bool = False,
+              engine: str = SEARCH_ENGINE, checkout=None, use_cache: bool = True,
+              on_event: Optional[EventCallback] = None) -> BatchResult:
+    """
+    Search and download many courses in one go. Queries are plain course codes or (query, "code"|"name").
+    Searches run one after another on a single browser (or the caller's `checkout`) while the previous
+    course downloads in the background over one shared HTTP session. Extra events: course_started
+    and course_done.
+    """
+    with metrics.trace(f"batch {len(queries)} courses") as tr:
+        with metrics.span("batch"):
+            result = _run_batch(queries, exam_filter, merge, engine, checkout, use_cache, on_event)
+    result.timings = tr.totals()
+    return result
+
+def _batch_session(source: requests.Session) -> requests.Session:
+    """
+    A session of the batch's own, starting from source's headers, cookies and TLS setting. source may be
+    the process-wide HTTP engine session, whose cookies other jobs rely on, so it is never written to.
+    """
+    session = requests.Session()
+    session.headers.update(source.headers)
+    session.cookies.update(source.cookies)
+    session.verify = source.verify
+    return session
+
+def _run_batch(queries: List[BatchQuery], exam_filter: str, merge: bool, engine: str, checkout,
+               use_cache: bool, on_event) -> BatchResult:
+    owned = None
+    if checkout is None:
+        def checkout():
+            # One browser for the whole batch, launched only if a search needs it
+            nonlocal owned
+            if owned is None:
+                import tiet_papers_downloader as tpd
+                owned = tpd.DriverSession()
+            return owned.checkout()
+
+    session: Optional[requests.Session] = None
+    courses: List[CourseReport] = []
+    pending: List[Tuple[CourseReport, Future]] = []
+    t0 = time.perf_counter()
+
+    def fetch(course: CourseReport, records: List[Record]):
+        start = time.perf_counter()
+        course.report = download_records(session, records, merge, on_event)
+        course.download_seconds = time.perf_counter() - start
+        course.message = (f"SUCCESS: Downloaded {course.report.done}/{course.report.total} file(s) "
+                          f"to Downloads/ThaparPapers/")
+        emit(on_event, "course_done", **course.to_dict())
+
+    # A single download worker: course N downloads while course N+1 is being searched
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="batch-download") as downloader:
+        try:
+            for item in queries:
+                query, by = (item, "code") if isinstance(item, str) else item
+                course = CourseReport(query, by)
+                courses.append(course)
+                emit(on_event, "course_started", query=query, by=by)
+                start = time.perf_counter()
+                try:
+                    found = search(query, by, "all", engine, checkout, use_cache, on_event)
+                except SearchTimeout as e:
+                    course.message = str(e)
+                    emit(on_event, "course_done", **course.to_dict())
+                    continue
+                except Exception as e:
+                    course.message = f"ERROR: {e}"
+                    emit(on_event, "course_done", **course.to_dict())
+                    continue
+                finally:
+                    course.search_seconds = time.perf_counter() - start
+                course.found = len(found)
+                records = found if exam_filter == "all" else [r for r in found if r["exam_type"] == exam_filter]
+                if not records:
+                    course.message = ("No results found." if not found
+                                      else f"No results found for exam type: {exam_filter}")
+                    emit(on_event, "course_done", **course.to_dict())
+                    continue
+                source = found.session or default_engine().warm()
+                if session is None:
+                    session = _batch_session(source)
+                else:
+                    # Keep one connection pool; just pick up any new cookies from this search
+                    session.cookies.update(source.cookies)
+                for rec in records:
+                    emit(on_event, "record", **rec)
+                pending.append((course, downloader.submit(contextvars.copy_context().run, fetch, course,
+                                                          list(records))))
+            for course, fut in pending:
+                try:
+                    fut.result()
+                except Exception as e:
+                    course.message = f"ERROR: {e}"
+        finally:
+            if owned is not None:
+                owned.close()
+    if session is not None:
+        session.close()
+
+    result = BatchResult(courses, time.perf_counter() - t0)
+    print(result.summary())
+    return result
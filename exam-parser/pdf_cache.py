@@ -0,0 +1,222 @@
+"""
+Content-addressed local cache for downloaded PDFs.
+
+Blobs are stored once per SHA-256 under `CACHE_DIR/blobs`, so identical papers
+listed under several courses share one file. A small SQLite index maps each
+download URL to its blob together with the ETag / Last-Modified validators the
+server sent; repeat requests revalidate with a conditional GET (or, for servers
+without validators, are trusted for `max_age` seconds). Least-recently-used
+blobs are evicted once the cache grows past its byte budget. Transfers go
+through a per-URL part file under `CACHE_DIR/parts`, so an interrupted
+download resumes where it stopped and only complete PDFs enter the store.
+"""
+from __future__ import annotations
+import hashlib
+import os
+import pathlib
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import requests
+
+from resumable import discard, fetch_part, finalize, part_lock
+
+CACHE_DIR = pathlib.Path(os.environ.get("TIET_CACHE_DIR", pathlib.Path.home() / ".cache" / "ThaparPapers"))
+CACHE_MAX_BYTES = int(os.environ.get("TIET_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+CACHE_MAX_AGE = 7 * 24 * 3600  # trust entries without validators this long
+PDF_CACHE_ENABLED = os.environ.get("TIET_PDF_CACHE", "1") != "0"
+
+
+def link_or_copy(src: pathlib.Path, dest: pathlib.Path):
+    """Atomically hard-link src to dest (no extra disk space), copying if links aren't possible."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + ".tmp")
+    try:
+        if tmp.exists():
+            tmp.unlink()
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dest)
+
+
+def sha256_file(path: pathlib.Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class PdfCache:
+    def __init__(self, root: pathlib.Path = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES,
+                 max_age: float = CACHE_MAX_AGE):
+        self.root = pathlib.Path(root)
+        self.blob_dir = self.root / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.part_dir = self.root / "parts"
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.root / "pdf_index.sqlite3"), check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS blobs (sha256 TEXT PRIMARY KEY, size INTEGER, "
+                         "last_access REAL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, sha256 TEXT, etag TEXT, "
+                         "last_modified TEXT, checked_at REAL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS blobs_lru ON blobs(last_access)")
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "revalidated": 0, "bytes_saved": 0,
+                                      "bytes_fetched": 0, "evictions": 0}
+
+    def blob_path(self, sha256: str) -> pathlib.Path:
+        return self.blob_dir / sha256[:2] / f"{sha256}.pdf"
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
+
+    def _lookup(self, url: str):
+        with self._lock:
+            row = self._db.execute("SELECT sha256, etag, last_modified, checked_at FROM urls WHERE url=?",
+                                   (url,)).fetchone()
+        if row and self.blob_path(row[0]).exists():
+            return row
+        return None
+
+    def _touch(self, url: str, sha256: str, checked: bool):
+        now = time.time()
+        with self._lock:
+            self._db.execute("UPDATE blobs SET last_access=? WHERE sha256=?", (now, sha256))
+            if checked:
+                self._db.execute("UPDATE urls SET checked_at=? WHERE url=?", (now, url))
+
+    def serve_fresh(self, url: str, dest: pathlib.Path) -> bool:
+        """Serve url from disk without touching the network if its entry can be trusted as-is."""
+        entry = self._lookup(url)
+        if not entry:
+            return False
+        sha256, etag, last_modified, checked_at = entry
+        if etag or last_modified or time.time() - (checked_at or 0) >= self.max_age:
+            return False
+        return self._serve(url, sha256, dest, checked=False) is not None
+
+    def fetch(self, session: requests.Session, url: str, dest: pathlib.Path, timeout: float = 60,
+              on_chunk: Optional[Callable[[int, int], None]] = None) -> Tuple[int, bool]:
+        """
+        Make `dest` hold the PDF at `url`, going to the network only when needed.
+        Returns (bytes transferred over the network, served_from_cache).
+        """
+        entry = self._lookup(url)
+        headers = {}
+        if entry:
+            sha256, etag, last_modified, checked_at = entry
+            if not etag and not last_modified and time.time() - (checked_at or 0) < self.max_age:
+                served = self._serve(url, sha256, dest, checked=False)
+                if served is not None:
+                    return served
+                entry = None  # evicted since the lookup: a plain miss
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        part = self.part_dir / f"{hashlib.sha1(url.encode()).hexdigest()}.part"
+        with part_lock(part):
+            r, size = fetch_part(session, url, part, headers, timeout, on_chunk)
+            if entry and r.status_code == 304:
+                discard(part)
+                self._count("revalidated")
+                served = self._serve(url, entry[0], dest, checked=True)
+                if served is not None:
+                    return served
+                # Evicted while we revalidated: fetch the body after all
+                r, size = fetch_part(session, url, part, None, timeout, on_chunk)
+            # dest comes from the part, so an eviction racing with the store below can't take it away
+            link_or_copy(part, dest)
+            sha256 = self._store_part(part)
+            etag = r.headers.get("ETag", "")
+            last_modified = r.headers.get("Last-Modified", "")
+
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO urls VALUES (?, ?, ?, ?, ?)",
+                             (url, sha256, etag, last_modified, time.time()))
+            self.stats["misses"] += 1
+            self.stats["bytes_fetched"] += size
+        self._evict(keep=sha256)
+        return size, False
+
+    def _serve(self, url: str, sha256: str, dest: pathlib.Path, checked: bool) -> Optional[Tuple[int, bool]]:
+        """Link the blob to dest; None if it was evicted since the lookup (the caller treats that as a miss)."""
+        self._touch(url, sha256, checked)
+        try:
+            size = self.blob_path(sha256).stat().st_size
+            self._materialize(sha256, dest)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self.stats["hits"] += 1
+            self.stats["bytes_saved"] += size
+        return 0, True
+
+    def _store_part(self, part: pathlib.Path) -> str:
+        """Move a complete part file into the blob store. Identical content is kept once."""
+        sha256 = sha256_file(part)
+        size = part.stat().st_size
+        path = self.blob_path(sha256)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists():
+            discard(part)
+        else:
+            finalize(part, path)
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?)", (sha256, size, time.time()))
+        return sha256
+
+    def _materialize(self, sha256: str, dest: pathlib.Path):
+        link_or_copy(self.blob_path(sha256), dest)
+
+    def _evict(self, keep: Optional[str] = None):
+        """Drop least-recently-used blobs until the store fits in max_bytes."""
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            victims = []
+            for sha256, size in self._db.execute("SELECT sha256, size FROM blobs ORDER BY last_access"):
+                if total <= self.max_bytes:
+                    break
+                if sha256 == keep:
+                    continue
+                victims.append(sha256)
+                total -= size
+            for sha256 in victims:
+                self._db.execute("DELETE FROM blobs WHERE sha256=?", (sha256,))
+                self._db.execute("DELETE FROM urls WHERE sha256=?", (sha256,))
+                self.stats["evictions"] += 1
+        for sha256 in victims:
+            try:
+                self.blob_path(sha256).unlink()
+            except OSError:
+                pass
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_default_cache: Optional[PdfCache] = None
+_default_lock = threading.Lock()
+
+def default_cache() -> Optional[PdfCache]:
+    """Process-wide cache, or None when disabled with TIET_PDF_CACHE=0."""
+    global _default_cache
+    if not PDF_CACHE_ENABLED:
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = PdfCache()
+        return _default_cache
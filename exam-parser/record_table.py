@@ -0,0 +1,190 @@
+"""
+Compact column store for large record sets (e.g. the whole crawled catalog).
+
+A list of record dicts costs a dict plus six strings per row. RecordTable
+keeps one array per field instead: low-cardinality fields (course name, year,
+semester, exam type, the directory part of the download link) are
+dictionary-encoded into one small integer per row, and rows are sorted by
+course code, so a code or code prefix is a contiguous row range found by
+bisection. Filters on the encoded fields are evaluated for a whole row range
+at once: `bytes.translate` maps every row's value id to 1/0 in C, masks are
+ANDed as big integers, and `itertools.compress` picks the matching rows.
+
+    table = RecordTable(records)
+    rows = table.select(code_prefix="UCS", exam_type="MST", years=(2019, 2023))
+    recs = table.records(rows)
+"""
+from __future__ import annotations
+import bisect
+import itertools
+import re
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+Values = Union[str, Iterable[str], None]
+
+
+class Column:
+    """Dictionary-encoded column: distinct values plus one id per row (a byte while there are <= 256 values)."""
+    __slots__ = ("values", "ids", "_lookup")
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.ids: Union[bytearray, array] = bytearray()
+        self._lookup: Dict[str, int] = {}
+
+    def append(self, value: str):
+        i = self._lookup.get(value)
+        if i is None:
+            i = self._lookup[value] = len(self.values)
+            self.values.append(sys.intern(value))
+            if i == 256 and isinstance(self.ids, bytearray):
+                self.ids = array("I", iter(self.ids))
+        self.ids.append(i)
+
+    def __getitem__(self, row: int) -> str:
+        return self.values[self.ids[row]]
+
+    def ids_of(self, wanted: Iterable[str]) -> set:
+        return {self._lookup[v] for v in wanted if v in self._lookup}
+
+    def mask(self, ids: set, lo: int, hi: int) -> bytes:
+        """One byte per row in [lo, hi): 1 where the row's id is in `ids`."""
+        if isinstance(self.ids, bytearray):
+            table = bytes(1 if i in ids else 0 for i in range(256))
+            return self.ids[lo:hi].translate(table)
+        return bytes(1 if i in ids else 0 for i in self.ids[lo:hi])
+
+    def nbytes(self) -> int:
+        ids = len(self.ids) * (1 if isinstance(self.ids, bytearray) else self.ids.itemsize)
+        return ids + sum(sys.getsizeof(v) for v in self.values)
+
+
+def _wanted(values: Values) -> Optional[List[str]]:
+    if values is None:
+        return None
+    return [values] if isinstance(values, str) else list(values)
+
+
+def _year_number(year: str) -> int:
+    """First four-digit year in the field ("2022-23" -> 2022), 0 if none."""
+    m = re.search(r"\d{4}", year)
+    return int(m.group()) if m else 0
+
+
+class RecordTable:
+    """Read-only column store of records, sorted by course code (stable, so per-code order is kept)."""
+    __slots__ = ("codes", "code_starts", "name", "year", "semester", "exam_type", "href_dir", "href_file",
+                 "_years")
+
+    def __init__(self, records: Iterable[Dict[str, str]]):
+        recs = sorted(records, key=lambda r: r["course_code"])
+        self.codes: List[str] = []
+        # Rows of codes[i] are code_starts[i]:code_starts[i + 1]
+        self.code_starts = array("I")
+        self.name, self.year, self.semester, self.exam_type, self.href_dir = (Column() for _ in range(5))
+        self.href_file: List[str] = []
+        for row, r in enumerate(recs):
+            code = r["course_code"]
+            if not self.codes or self.codes[-1] != code:
+                self.codes.append(sys.intern(code))
+                self.code_starts.append(row)
+            self.name.append(r.get("course_name", ""))
+            self.year.append(r.get("year", ""))
+            self.semester.append(r.get("semester", ""))
+            self.exam_type.append(r.get("exam_type", ""))
+            href = r.get("download_href", "")
+            cut = href.rfind("/") + 1
+            self.href_dir.append(href[:cut])
+            self.href_file.append(href[cut:])
+        self.code_starts.append(len(recs))
+        self._years = [_year_number(y) for y in self.year.values]
+
+    def __len__(self) -> int:
+        return len(self.href_file)
+
+    def record(self, row: int) -> Dict[str, str]:
+        i = bisect.bisect_right(self.code_starts, row) - 1
+        return {"course_code": self.codes[i], "course_name": self.name[row], "year": self.year[row],
+                "semester": self.semester[row], "exam_type": self.exam_type[row],
+                "download_href": self.href_dir[row] + self.href_file[row]}
+
+    def records(self, rows: Iterable[int]) -> List[Dict[str, str]]:
+        out: List[Dict[str, str]] = []
+        starts, name, year, semester, exam_type = self.code_starts, self.name, self.year, self.semester, self.exam_type
+        href_dir, href_file = self.href_dir, self.href_file
+        i, end = 0, 0
+        for row in rows:
+            if not starts[i] <= row < end:
+                # Rows usually come in table order, so the code only changes at range boundaries
+                i = bisect.bisect_right(starts, row) - 1
+                end = starts[i + 1]
+            out.append({"course_code": self.codes[i], "course_name": name.values[name.ids[row]],
+                        "year": year.values[year.ids[row]], "semester": semester.values[semester.ids[row]],
+                        "exam_type": exam_type.values[exam_type.ids[row]],
+                        "download_href": href_dir.values[href_dir.ids[row]] + href_file[row]})
+        return out
+
+    def code_range(self, code: str) -> Tuple[int, int]:
+        i = bisect.bisect_left(self.codes, code)
+        if i < len(self.codes) and self.codes[i] == code:
+            return self.code_starts[i], self.code_starts[i + 1]
+        return 0, 0
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        if not prefix:
+            return 0, len(self)
+        i = bisect.bisect_left(self.codes, prefix)
+        # First code past every code starting with prefix
+        j = bisect.bisect_left(self.codes, prefix[:-1] + chr(ord(prefix[-1]) + 1), i)
+        return self.code_starts[i], self.code_starts[j]
+
+    def select(self, code: Optional[str] = None, code_prefix: Optional[str] = None,
+               codes: Optional[Sequence[str]] = None, exam_type: Values = None, semester: Values = None,
+               years: Optional[Tuple[Optional[int], Optional[int]]] = None, limit: Optional[int] = None) -> List[int]:
+        """
+        Row numbers matching every given filter, in table order. code / code_prefix / codes pick the rows
+        to look at (codes: several exact codes, in the order given); exam_type and semester take one value
+        or several; years is an inclusive (first, last) range, either end may be None.
+        """
+        if code is not None:
+            ranges = [self.code_range(code)]
+        elif codes is not None:
+            ranges = [self.code_range(c) for c in codes]
+        else:
+            ranges = [self.prefix_range(code_prefix or "")]
+
+        filters = []
+        for column, wanted in ((self.exam_type, _wanted(exam_type)), (self.semester, _wanted(semester))):
+            if wanted is not None:
+                filters.append((column, column.ids_of(wanted)))
+        if years is not None:
+            first, last = years
+            filters.append((self.year, {i for i, y in enumerate(self._years)
+                                        if (first is None or y >= first) and (last is None or y <= last)}))
+
+        out: List[int] = []
+        for lo, hi in ranges:
+            if hi <= lo:
+                continue
+            if not filters:
+                out.extend(range(lo, hi))
+            else:
+                mask = None
+                for column, ids in filters:
+                    m = int.from_bytes(column.mask(ids, lo, hi), "little")
+                    mask = m if mask is None else mask & m
+                    if not mask:
+                        break
+                if mask:
+                    out.extend(itertools.compress(range(lo, hi), mask.to_bytes(hi - lo, "little")))
+            if limit is not None and len(out) >= limit:
+                return out[:limit]
+        return out
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the table (arrays, dictionaries and strings)."""
+        return (sum(sys.getsizeof(c) for c in self.codes) + len(self.code_starts) * self.code_starts.itemsize
+                + sum(col.nbytes() for col in (self.name, self.year, self.semester, self.exam_type, self.href_dir))
+                + sys.getsizeof(self.href_file) + sum(sys.getsizeof(f) for f in self.href_file))
@@ -0,0 +1,148 @@
+"""
+Persistent cache of search results.
+
+The catalog behind a course code or name only changes once a semester, so
+the records a search returns are kept in SQLite with a per-entry TTL. Fresh
+entries are served directly. Entries past their TTL but still within the
+stale window are served immediately while a background thread refreshes
+them (stale-while-revalidate). Anything older is treated as a miss.
+
+Entries are keyed on the query alone. The exam-type filter is applied after
+the lookup, so one entry serves every filter.
+"""
+from __future__ import annotations
+import json
+import os
+import pathlib
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import metrics
+from pdf_cache import CACHE_DIR
+
+RESULT_TTL = float(os.environ.get("TIET_RESULT_TTL", 7 * 24 * 3600))
+RESULT_STALE_TTL = 90 * 24 * 3600  # serve (and refresh) stale entries up to this age
+EMPTY_RESULT_TTL = 3600            # "no results" may be a hiccup; don't trust it long
+RESULT_CACHE_ENABLED = os.environ.get("TIET_RESULT_CACHE", "1") != "0"
+
+
+def cache_key(by_code: bool, query: str) -> Tuple[str, str]:
+    return ("code" if by_code else "name", re.sub(r"\s+", " ", query).strip().lower())
+
+
+def _thread_runner(key: Tuple[str, str], task: Callable[[], None]):
+    threading.Thread(target=task, name="result-refresh", daemon=True).start()
+
+
+class ResultCache:
+    def __init__(self, path: pathlib.Path = CACHE_DIR / "results.sqlite3", ttl: float = RESULT_TTL,
+                 stale_ttl: float = RESULT_STALE_TTL):
+        path = pathlib.Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS results (kind TEXT, query TEXT, records TEXT, "
+                         "fetched_at REAL, expires_at REAL, PRIMARY KEY (kind, query))")
+        self.stats: Dict[str, int] = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0,
+                                      "refreshes_failed": 0, "refreshes_dropped": 0}
+        # runner(key, task) starts a refresh; replace it to run refreshes through a job queue
+        self.runner: Callable[[Tuple[str, str], Callable[[], None]], None] = _thread_runner
+
+    def get(self, by_code: bool, query: str) -> Optional[Tuple[List[Dict[str, str]], bool]]:
+        """Return (records, fresh) or None on a miss."""
+        kind, q = cache_key(by_code, query)
+        with self._lock:
+            row = self._db.execute("SELECT records, fetched_at, expires_at FROM results WHERE kind=? AND query=?",
+                                   (kind, q)).fetchone()
+        now = time.time()
+        if row is None or now - row[1] > self.stale_ttl:
+            self._count("misses")
+            return None
+        fresh = now < row[2]
+        self._count("hits" if fresh else "stale_hits")
+        return json.loads(row[0]), fresh
+
+    def has(self, by_code: bool, query: str) -> bool:
+        """Whether get() would answer without a live search (fresh or stale entry); not counted in stats."""
+        kind, q = cache_key(by_code, query)
+        with self._lock:
+            row = self._db.execute("SELECT fetched_at FROM results WHERE kind=? AND query=?", (kind, q)).fetchone()
+        return row is not None and time.time() - row[0] <= self.stale_ttl
+
+    def put(self, by_code: bool, query: str, records: List[Dict[str, str]], ttl: Optional[float] = None):
+        kind, q = cache_key(by_code, query)
+        if ttl is None:
+            ttl = self.ttl if records else EMPTY_RESULT_TTL
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                             (kind, q, json.dumps(records), now, now + ttl))
+
+    def invalidate(self, by_code: Optional[bool] = None, query: Optional[str] = None) -> int:
+        """Drop one entry, every entry of one kind, or (no arguments) everything. Returns rows removed."""
+        with self._lock:
+            if by_code is None:
+                cur = self._db.execute("DELETE FROM results")
+            elif query is None:
+                cur = self._db.execute("DELETE FROM results WHERE kind=?", (cache_key(by_code, "")[0],))
+            else:
+                cur = self._db.execute("DELETE FROM results WHERE kind=? AND query=?", cache_key(by_code, query))
+            return cur.rowcount
+
+    def refresh_async(self, by_code: bool, query: str, fetch: Callable[[], Optional[List[Dict[str, str]]]]):
+        """Re-run `fetch` in the background and store its result. At most one refresh per key at a time."""
+        key = cache_key(by_code, query)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                records = fetch()
+                if records is not None:
+                    self.put(by_code, query, records)
+                    self._count("refreshes")
+                    metrics.inc("tiet_result_refreshes_total", outcome="ok")
+            except Exception as e:
+                print(f"Background refresh of '{query}' failed: {e}")
+                self._count("refreshes_failed")
+                metrics.inc("tiet_result_refreshes_total", outcome="failed")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        try:
+            self.runner(key, run)
+        except Exception as e:
+            # e.g. QueueFull from a job-queue runner under load; the stale entry is served until a later hit
+            print(f"Background refresh of '{query}' not started: {e}")
+            self._count("refreshes_dropped")
+            metrics.inc("tiet_result_refreshes_total", outcome="dropped")
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+
+_default_cache: Optional[ResultCache] = None
+_default_lock = threading.Lock()
+
+def default_result_cache() -> Optional[ResultCache]:
+    """Process-wide result cache, or None when disabled with TIET_RESULT_CACHE=0."""
+    global _default_cache
+    if not RESULT_CACHE_ENABLED:
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResultCache()
+        return _default_cache
@@ -0,0 +1,178 @@
+"""
+Resumable, integrity-checked transfers into `.part` files.
+
+A download is streamed into `<name>.part` and only renamed into place once it
+is complete. If the transfer breaks off, the part file is kept and the next
+attempt (or the next run) asks for the rest with a `Range` request; an
+`If-Range` validator saved next to the part makes the server send the whole
+file again if it changed in between. A finished part must match the expected
+length and look like a PDF (`%PDF-` header, `%%EOF` in the trailer) before it
+is accepted.
+"""
+from __future__ import annotations
+import hashlib
+import os
+import pathlib
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: parts are only guarded within one process
+    fcntl = None
+
+import requests
+
+PDF_HEADER = b"%PDF-"
+PDF_EOF = b"%%EOF"
+TRAILER_WINDOW = 2048  # readers tolerate junk after %%EOF; look this far back for it
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+# Lock files live outside the download folder so they don't clutter it
+LOCK_DIR = pathlib.Path(tempfile.gettempdir()) / "tiet-part-locks"
+
+
+class IncompleteDownload(IOError):
+    """The body ended early. The part file is kept so a retry can resume it."""
+
+
+class CorruptDownload(ValueError):
+    """The server sent something that is not a PDF (e.g. an HTML error page). Retrying won't help."""
+
+
+def part_path(dest: pathlib.Path) -> pathlib.Path:
+    return dest.with_name(dest.name + ".part")
+
+
+def check_pdf(path: pathlib.Path, expected_size: Optional[int] = None):
+    """Raise IncompleteDownload/CorruptDownload unless path is a complete PDF of the expected size."""
+    size = path.stat().st_size
+    if expected_size is not None and size < expected_size:
+        raise IncompleteDownload(f"{path.name}: got {size} of {expected_size} bytes")
+    if expected_size is not None and size > expected_size:
+        raise CorruptDownload(f"{path.name}: got {size} bytes, expected {expected_size}")
+    with open(path, "rb") as f:
+        if f.read(len(PDF_HEADER)) != PDF_HEADER:
+            raise CorruptDownload(f"{path.name}: not a PDF")
+        f.seek(max(0, size - TRAILER_WINDOW))
+        if PDF_EOF not in f.read():
+            raise IncompleteDownload(f"{path.name}: PDF trailer missing")
+
+
+def is_complete_pdf(path: pathlib.Path) -> bool:
+    try:
+        check_pdf(path)
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def discard(part: pathlib.Path):
+    for path in (part, _validator_path(part)):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def _validator_path(part: pathlib.Path) -> pathlib.Path:
+    return part.with_name(part.name + ".validator")
+
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+@contextmanager
+def part_lock(part: pathlib.Path) -> Iterator[None]:
+    """
+    Hold around fetch_part() and finalizing, so two jobs for one file don't interleave:
+    threads of this process, and (where fcntl exists) other processes such as shard workers.
+    """
+    with _locks_guard:
+        lock = _locks.setdefault(str(part), threading.Lock())
+    with lock:
+        if fcntl is None:
+            yield
+            return
+        LOCK_DIR.mkdir(parents=True, exist_ok=True)
+        name = hashlib.sha1(str(pathlib.Path(part).resolve()).encode()).hexdigest()
+        with open(LOCK_DIR / f"{name}.lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def fetch_part(session: requests.Session, url: str, part: pathlib.Path, headers: Optional[Dict[str, str]] = None,
+               timeout: float = 60, on_chunk: Optional[Callable[[int, int], None]] = None
+               ) -> Tuple[requests.Response, int]:
+    """
+    Bring `part` up to the complete, validated body of `url`, resuming whatever is already there.
+    Returns (response, bytes transferred now). A 304 answer to conditional `headers` is returned
+    without touching the part. on_chunk(bytes_so_far, total) counts bytes already on disk.
+    Call it with part_lock(part) held.
+    """
+    part.parent.mkdir(parents=True, exist_ok=True)
+    offset = part.stat().st_size if part.exists() else 0
+    validator = _validator_path(part)
+    request_headers = dict(headers or {})
+    if offset:
+        request_headers["Range"] = f"bytes={offset}-"
+        if validator.exists():
+            request_headers["If-Range"] = validator.read_text()
+
+    transferred = 0
+    with session.get(url, stream=True, timeout=timeout, headers=request_headers) as r:
+        if r.status_code == 304:
+            return r, 0
+        if r.status_code == 416 and offset:
+            # Nothing left to send: either the part is already whole or the file shrank
+            try:
+                check_pdf(part)
+            except (OSError, ValueError):
+                discard(part)
+                raise IncompleteDownload(f"{part.name}: server refused to resume")
+            return r, 0
+        r.raise_for_status()
+
+        expected = None
+        m = _CONTENT_RANGE.match(r.headers.get("Content-Range", ""))
+        if r.status_code == 206 and m and int(m.group(1)) == offset:
+            mode = "ab"
+            if m.group(3) != "*":
+                expected = int(m.group(3))
+        else:
+            # Full body: the server ignored the range, or the file changed (If-Range)
+            mode, offset = "wb", 0
+            v = r.headers.get("ETag", "")
+            v = v if v and not v.startswith("W/") else r.headers.get("Last-Modified", "")
+            if v:
+                validator.write_text(v)
+            else:
+                validator.unlink(missing_ok=True)
+        if expected is None and r.headers.get("Content-Length") and "Content-Encoding" not in r.headers:
+            expected = offset + int(r.headers["Content-Length"])
+
+        with open(part, mode) as f:
+            for chunk in r.iter_content(65536):
+                if chunk:
+                    f.write(chunk)
+                    transferred += len(chunk)
+                    if on_chunk: on_chunk(offset + transferred, expected or 0)
+        try:
+            check_pdf(part, expected)
+        except CorruptDownload:
+            discard(part)
+            raise
+    return r, transferred
+
+
+def finalize(part: pathlib.Path, dest: pathlib.Path):
+    """Atomically move a validated part into place."""
+    os.replace(part, dest)
+    _validator_path(part).unlink(missing_ok=True)
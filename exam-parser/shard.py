@@ -0,0 +1,311 @@
+"""
+Sharded scraping: one coordinator, N worker processes.
+
+    records = shard.search_many(["UCS503", "UCS301", ("Data Structures", "name")], workers=4)
+    batch = shard.run_batch(queries, merge=True, workers=4)
+    stats = shard.crawl(workers=4)
+
+Each worker is a spawned process with its own HTTP session (and its own
+browser, started only if a search falls back to Selenium), so a host uses
+as many cores and browsers as it has workers. The coordinator keeps the
+work queue and hands each worker at most `max_inflight` tasks at a time (one
+running, one waiting), so a slow worker never sits on a backlog while others
+are idle. Every task start passes one token bucket shared by all workers,
+which keeps the site seeing at most `rate` searches per second however many
+workers run, and each worker's per-host download rate is its 1/N share of
+TIET_DOWNLOAD_RATE. Results are reassembled in submission order, so the
+output does not depend on which worker finished first.
+"""
+from __future__ import annotations
+import collections
+import multiprocessing
+import os
+import pathlib
+import queue
+import time
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import catalog
+import downloads
+import metrics
+import papers
+from papers import BatchQuery, BatchResult, CourseReport, Record, SEARCH_ENGINE, emit
+
+SHARD_WORKERS = int(os.environ.get("TIET_SHARD_WORKERS", str(min(4, os.cpu_count() or 1))))
+SHARD_RATE = float(os.environ.get("TIET_SHARD_RATE", "2.0"))  # task starts per second, all workers together
+SHARD_MAX_INFLIGHT = 2
+
+
+class GlobalRateLimiter:
+    """Spaces task starts 1/rate seconds apart across every process sharing it."""
+
+    def __init__(self, rate: float, ctx=None):
+        self.rate = rate
+        self._next = (ctx or multiprocessing).Value("d", 0.0)
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        with self._next.get_lock():
+            now = time.time()
+            start = max(now, self._next.value)
+            self._next.value = start + 1 / self.rate
+        if start > now:
+            time.sleep(start - now)
+
+
+# ---------- tasks (run inside the workers) ----------
+
+def _task_search(args, engine: str, checkout) -> Optional[List[Record]]:
+    query, by, use_cache = args
+    try:
+        return list(papers.search(query, by, "all", engine, checkout, use_cache))
+    except papers.SearchTimeout:
+        return None
+
+
+def _task_prefix(args, engine: str, checkout) -> Optional[List[Record]]:
+    (prefix,) = args
+    return papers.search_live(True, prefix, engine, checkout=checkout)[0]
+
+
+def _task_course(args, engine: str, checkout) -> CourseReport:
+    query, by, exam_filter, merge, use_cache = args
+    course = CourseReport(query, by)
+    start = time.perf_counter()
+    try:
+        found = papers.search(query, by, "all", engine, checkout, use_cache)
+    except papers.SearchTimeout as e:
+        course.message = str(e)
+        return course
+    finally:
+        course.search_seconds = time.perf_counter() - start
+    course.found = len(found)
+    records = found if exam_filter == "all" else [r for r in found if r["exam_type"] == exam_filter]
+    if not records:
+        course.message = "No results found." if not found else f"No results found for exam type: {exam_filter}"
+        return course
+    start = time.perf_counter()
+    course.report = papers.download(records, merge, found.session)
+    course.download_seconds = time.perf_counter() - start
+    course.message = f"SUCCESS: Downloaded {course.report.done}/{course.report.total} file(s) to Downloads/ThaparPapers/"
+    return course
+
+
+TASKS: Dict[str, Callable] = {"search": _task_search, "prefix": _task_prefix, "course": _task_course}
+
+
+def _worker(index: int, engine: str, inbox, outbox, limiter: GlobalRateLimiter, download_rate: float,
+            download_dir: pathlib.Path):
+    """Worker process main loop: run tasks from inbox until it yields None."""
+    downloads.DOWNLOAD_RATE_PER_HOST = download_rate
+    papers.DOWNLOAD_DIR = download_dir
+    owned = None
+
+    def checkout():
+        # One browser per worker, launched only if a search needs it
+        nonlocal owned
+        if owned is None:
+            import tiet_papers_downloader as tpd
+            owned = tpd.DriverSession()
+        return owned.checkout()
+
+    try:
+        while True:
+            task = inbox.get()
+            if task is None:
+                break
+            tid, kind, args = task
+            limiter.acquire()
+            try:
+                outbox.put((index, tid, True, TASKS[kind](args, engine, checkout)))
+            except Exception as e:
+                outbox.put((index, tid, False, f"{type(e).__name__}: {e}"))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if owned is not None:
+            owned.close()
+
+
+# ---------- coordinator ----------
+
+class ShardPool:
+    """
+    Worker processes fed by the coordinator. submit() queues a task; completed() yields
+    (task id, kind, args, ok, result) as tasks finish, and tasks may be submitted while iterating.
+    """
+
+    def __init__(self, workers: int = SHARD_WORKERS, engine: str = SEARCH_ENGINE, rate: float = SHARD_RATE,
+                 max_inflight: int = SHARD_MAX_INFLIGHT):
+        ctx = multiprocessing.get_context("spawn")
+        self.workers = max(1, workers)
+        self.max_inflight = max(1, max_inflight)
+        self.limiter = GlobalRateLimiter(rate, ctx)
+        self._outbox = ctx.Queue()
+        self._inboxes = [ctx.Queue() for _ in range(self.workers)]
+        self._procs = [ctx.Process(target=_worker, name=f"shard-{i}", daemon=True,
+                                   args=(i, engine, self._inboxes[i], self._outbox, self.limiter,
+                                         downloads.DOWNLOAD_RATE_PER_HOST / self.workers, papers.DOWNLOAD_DIR))
+                       for i in range(self.workers)]
+        self._inflight: List[Dict[int, Tuple[str, tuple]]] = [{} for _ in range(self.workers)]
+        self._alive = [True] * self.workers
+        self._pending: Deque[Tuple[int, str, tuple]] = collections.deque()
+        self._lost: Deque[Tuple[int, str, tuple, bool, object]] = collections.deque()
+        self._next_id = 0
+        for p in self._procs:
+            p.start()
+
+    def __enter__(self) -> "ShardPool":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, kind: str, args: tuple) -> int:
+        tid = self._next_id
+        self._next_id += 1
+        self._pending.append((tid, kind, args))
+        return tid
+
+    def _dispatch(self):
+        while self._pending:
+            live = [i for i in range(self.workers) if self._alive[i]]
+            if not live:
+                raise RuntimeError("All shard workers exited")
+            i = min(live, key=lambda w: len(self._inflight[w]))
+            if len(self._inflight[i]) >= self.max_inflight:
+                break
+            tid, kind, args = self._pending.popleft()
+            self._inflight[i][tid] = (kind, args)
+            self._inboxes[i].put((tid, kind, args))
+        metrics.set_gauge("tiet_shard_queue", len(self._pending))
+
+    def _reap(self):
+        """Fail the tasks of workers that died (crash, OOM kill) so completed() doesn't wait forever."""
+        for i, p in enumerate(self._procs):
+            if self._alive[i] and not p.is_alive():
+                self._alive[i] = False
+                print(f"Shard worker {i} exited with code {p.exitcode}")
+                for tid, (kind, args) in self._inflight[i].items():
+                    self._lost.append((tid, kind, args, False, f"worker exited with code {p.exitcode}"))
+                self._inflight[i].clear()
+
+    def completed(self) -> Iterator[Tuple[int, str, tuple, bool, object]]:
+        while True:
+            self._dispatch()
+            if self._lost:
+                yield self._lost.popleft()
+                continue
+            if not self._pending and not any(self._inflight):
+                return
+            try:
+                index, tid, ok, result = self._outbox.get(timeout=1.0)
+            except queue.Empty:
+                self._reap()
+                continue
+            kind, args = self._inflight[index].pop(tid)
+            metrics.inc("tiet_shard_tasks_total", kind=kind, outcome="ok" if ok else "failed")
+            yield tid, kind, args, ok, result
+
+    def close(self, timeout: float = 10):
+        for i, inbox in enumerate(self._inboxes):
+            if self._alive[i]:
+                inbox.put(None)
+        deadline = time.monotonic() + timeout
+        for p in self._procs:
+            p.join(max(0.0, deadline - time.monotonic()))
+            if p.is_alive():
+                p.terminate()
+
+
+def _query(item: BatchQuery) -> Tuple[str, str]:
+    query, by = (item, "code") if isinstance(item, str) else item
+    query = query.strip()
+    return (papers.normalize_course_code(query) if by != "name" else query), by
+
+
+def search_many(queries: Iterable[BatchQuery], workers: int = SHARD_WORKERS, engine: str = SEARCH_ENGINE,
+                rate: float = SHARD_RATE, use_cache: bool = True) -> List[Record]:
+    """
+    Search every query across worker processes. Returns one record list: query order, then the site's
+    row order within a query, with rows already seen under an earlier query dropped.
+    """
+    queries = [_query(q) for q in queries]
+    results: Dict[int, Optional[List[Record]]] = {}
+    with ShardPool(min(workers, max(1, len(queries))), engine, rate) as pool:
+        ids = [pool.submit("search", (query, by, use_cache)) for query, by in queries]
+        for tid, _, args, ok, result in pool.completed():
+            if not ok or result is None:
+                print(f"Search for '{args[0]}' failed: {result if not ok else 'timed out'}")
+            results[tid] = result if ok else None
+    merged: List[Record] = []
+    seen = set()
+    for tid in ids:
+        for rec in results.get(tid) or []:
+            key = rec["download_href"] or (rec["course_code"], rec["year"], rec["semester"], rec["exam_type"])
+            if key not in seen:
+                seen.add(key)
+                merged.append(rec)
+    return merged
+
+
+def run_batch(queries: List[BatchQuery], exam_filter: str = "all", merge: bool = False,
+              engine: str = SEARCH_ENGINE, use_cache: bool = True, on_event=None,
+              workers: int = SHARD_WORKERS, rate: float = SHARD_RATE) -> BatchResult:
+    """papers.run_batch() with each course searched and downloaded by one of `workers` processes."""
+    with metrics.trace(f"sharded batch {len(queries)} courses x{workers}") as tr:
+        with metrics.span("batch"):
+            t0 = time.perf_counter()
+            courses: Dict[int, CourseReport] = {}
+            with ShardPool(min(workers, max(1, len(queries))), engine, rate) as pool:
+                ids = []
+                for item in queries:
+                    query, by = _query(item)
+                    emit(on_event, "course_started", query=query, by=by)
+                    ids.append(pool.submit("course", (query, by, exam_filter, merge, use_cache)))
+                for tid, _, args, ok, result in pool.completed():
+                    course = result if ok else CourseReport(args[0], args[1], f"ERROR: {result}")
+                    courses[tid] = course
+                    emit(on_event, "course_done", **course.to_dict())
+            result = BatchResult([courses[tid] for tid in ids], time.perf_counter() - t0)
+    result.timings = tr.totals()
+    print(result.summary())
+    return result
+
+
+def crawl(seeds: Iterable[str] = catalog.CRAWL_SEEDS, db_path: pathlib.Path = catalog.CATALOG_DB,
+          workers: int = SHARD_WORKERS, engine: str = SEARCH_ENGINE,
+          rate: float = 1 / catalog.CRAWL_MIN_INTERVAL, recrawl_after: float = catalog.CRAWL_RECRAWL_AFTER,
+          split_at: int = catalog.CRAWL_SPLIT_AT) -> Dict[str, int]:
+    """
+    catalog.crawl() with prefix searches spread over worker processes. The coordinator alone writes the
+    store. The default rate matches the sequential crawl's spacing, so the gain comes from overlapping
+    slow searches; raise `rate` only if the site can take it.
+    """
+    db = catalog.connect(db_path)
+    stats = catalog.new_crawl_stats()
+    searching: Dict[int, Tuple[str, object]] = {}
+    try:
+        with ShardPool(workers, engine, rate) as pool:
+            def visit(prefixes: List[str]):
+                todo = list(prefixes)
+                while todo:
+                    prefix = todo.pop(0)
+                    row, children = catalog.crawl_check(db, prefix, recrawl_after, stats)
+                    if children is None:
+                        searching[pool.submit("prefix", (prefix,))] = (prefix, row)
+                    else:
+                        todo[0:0] = children
+
+            visit(list(seeds))
+            for tid, _, _, ok, result in pool.completed():
+                prefix, row = searching.pop(tid)
+                if not ok:
+                    print(f"Search for prefix '{prefix}' failed: {result}")
+                print(f"Crawled prefix '{prefix}' ({len(result) if ok and result is not None else 'failed'})")
+                visit(catalog.crawl_store(db, prefix, row, result if ok else None, split_at, stats))
+    finally:
+        db.close()
+    print(f"Crawl finished: {stats}")
+    return stats
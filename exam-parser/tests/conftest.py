@@ -0,0 +1,88 @@
+import os
+import pathlib
+import re
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HERE = pathlib.Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE.parent / "benchmarks"))
+
+# Modules read these at import time: keep caches and downloads out of the user's home
+_scratch = pathlib.Path(tempfile.mkdtemp(prefix="tiet-tests-"))
+os.environ.setdefault("TIET_CACHE_DIR", str(_scratch / "cache"))
+os.environ.setdefault("TIET_DOWNLOAD_DIR", str(_scratch / "downloads"))
+
+import pytest
+
+from replica import Replica, synthetic_pdf
+
+
+@pytest.fixture
+def replica():
+    r = Replica(rows=3, pages=1, page_kb=1).start()
+    yield r
+    r.stop()
+
+
+class RangeServer:
+    """
+    Serves one file; can honour or ignore Range, cut a body short, and answer If-None-Match
+    with 304. Set etag to "" to send no validator.
+    """
+
+    def __init__(self, body: bytes, etag: str = '"v1"'):
+        self.body = body
+        self.etag = etag
+        self.content_type = "application/pdf"
+        self.honour_range = True
+        self.cut_after = None  # bytes of the body to send before dropping the connection
+        self.requests = []     # headers of every request
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests.append(dict(self.headers))
+                if server.etag and self.headers.get("If-None-Match") == server.etag:
+                    self.send_response(304)
+                    self.send_header("ETag", server.etag)
+                    self.end_headers()
+                    return
+                body, start = server.body, 0
+                m = re.match(r"bytes=(\d+)-$", self.headers.get("Range", ""))
+                if_range = self.headers.get("If-Range")
+                if m and server.honour_range and (if_range is None or if_range == server.etag):
+                    start = int(m.group(1))
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Type", server.content_type)
+                self.send_header("Content-Length", str(len(body) - start))
+                if server.etag:
+                    self.send_header("ETag", server.etag)
+                self.end_headers()
+                rest = body[start:]
+                if server.cut_after is not None:
+                    rest = rest[:server.cut_after]
+                self.wfile.write(rest)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/paper.pdf"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def range_server():
+    s = RangeServer(synthetic_pdf(3, 4))
+    yield s
+    s.stop()
@@ -0,0 +1,77 @@
+import threading
+
+import requests
+
+import papers
+from papers import SearchResults
+
+
+def records(replica, code):
+    return [{"course_code": code, "course_name": "Benchmark Course", "year": str(2024 - i), "semester": "ODD",
+             "exam_type": "EST", "download_href": f"{replica.url}/papers/{code}-{i}.pdf"}
+            for i in range(replica.rows)]
+
+
+def session_with(cookie):
+    s = requests.Session()
+    s.cookies.set("ASP.NET_SessionId", cookie)
+    return s
+
+
+def test_one_failing_search_does_not_stop_the_batch(replica, monkeypatch):
+    def search(query, *args):
+        if query == "UMA101":
+            raise RuntimeError("site down")
+        return SearchResults(records(replica, query), session_with("s"))
+    monkeypatch.setattr(papers, "search", search)
+
+    result = papers.run_batch(["UCS503", "UMA101", "UEC203"])
+    assert [c.query for c in result.courses] == ["UCS503", "UMA101", "UEC203"]
+    ok, bad, last = result.courses
+    assert bad.message == "ERROR: site down" and bad.report is None
+    assert ok.report.done == last.report.done == replica.rows
+
+
+def test_next_search_runs_while_the_previous_course_downloads(replica, monkeypatch):
+    downloading = threading.Event()
+    release = threading.Event()
+    download_records = papers.download_records
+
+    def slow_download(session, chosen, *args):
+        downloading.set()
+        release.wait(5)
+        return download_records(session, chosen, *args)
+    monkeypatch.setattr(papers, "download_records", slow_download)
+
+    overlapped = []
+
+    def search(query, *args):
+        if query == "UEC203":
+            overlapped.append(downloading.wait(5))  # UCS503 is still downloading
+            release.set()
+        return SearchResults(records(replica, query), session_with("s"))
+    monkeypatch.setattr(papers, "search", search)
+
+    result = papers.run_batch(["UCS503", "UEC203"])
+    assert overlapped == [True]
+    assert [c.report.done for c in result.courses] == [replica.rows, replica.rows]
+
+
+def test_batch_does_not_write_to_the_search_sessions(replica, monkeypatch):
+    shared = session_with("shared")  # e.g. the process-wide HTTP engine session
+    later = session_with("later")
+    used = []
+    download_records = papers.download_records
+
+    def spy(session, *args):
+        used.append(session)
+        return download_records(session, *args)
+    monkeypatch.setattr(papers, "download_records", spy)
+    monkeypatch.setattr(papers, "search", lambda query, *args: SearchResults(
+        records(replica, query), shared if query == "UCS503" else later))
+
+    papers.run_batch(["UCS503", "UEC203"])
+    assert shared.cookies.get_dict() == {"ASP.NET_SessionId": "shared"}
+    assert later.cookies.get_dict() == {"ASP.NET_SessionId": "later"}
+    assert used[0] is used[1] and used[0] is not shared
+    assert used[0].cookies.get_dict() == {"ASP.NET_SessionId": "later"}
@@ -0,0 +1,101 @@
+import pytest
+
+import catalog
+from catalog import CatalogIndex, crawl
+
+PAPERS = [
+    ("AB101", "Applied Biology", "2021", "ODD", "MST"),
+    ("AB101", "Applied Biology", "2022", "EVEN", "EST"),
+    ("AC200", "Accounting", "2020", "ODD", "EST"),
+    ("AE300", "Aero Engineering", "2023", "ODD", "MST"),
+    ("BT100", "Biotechnology", "2022", "ODD", "AUX"),
+    ("CS503", "Software Engineering", "2023", "ODD", "EST"),
+]
+
+
+def site(papers=PAPERS):
+    """search(prefix) over a fixed catalog, recording the prefixes asked for."""
+    asked = []
+
+    def search(prefix):
+        asked.append(prefix)
+        return [dict(zip(catalog.FIELDS, p + (f"https://example.org/{p[0]}-{p[2]}-{p[4]}.pdf",)))
+                for p in papers if p[0].startswith(prefix)]
+    return search, asked
+
+
+class Interrupted(Exception):
+    pass
+
+
+def interrupt_after(search, n):
+    calls = []
+
+    def wrapped(prefix):
+        if len(calls) == n:
+            raise Interrupted(prefix)
+        calls.append(prefix)
+        return search(prefix)
+    return wrapped
+
+
+def run(search, db, **kw):
+    kw.setdefault("split_at", 3)
+    return crawl(search, seeds=["A", "B", "C"], db_path=db, min_interval=0, **kw)
+
+
+def test_interrupted_crawl_resumes_where_it_stopped(tmp_path):
+    db = tmp_path / "catalog.sqlite3"
+    search, asked = site()
+    # "A" has 4 rows >= split_at, so it is split into "AA".."A9"; stop partway through those
+    with pytest.raises(Interrupted):
+        run(interrupt_after(search, 5), db)
+    done_before = list(asked)
+    assert done_before == ["A", "AA", "AB", "AC", "AD"]
+
+    stats = run(search, db)
+    resumed = asked[len(done_before):]
+    assert resumed[0] == "AE" and not set(resumed) & set(done_before)
+    assert resumed[-2:] == ["B", "C"]
+    assert stats["skipped"] == len(done_before)  # "A" (split) and the four children already done
+    assert len(CatalogIndex(db)) == len(PAPERS)
+
+
+def test_finished_crawl_is_skipped_until_recrawl_after(tmp_path):
+    db = tmp_path / "catalog.sqlite3"
+    search, asked = site()
+    run(search, db)
+    first = len(asked)
+    stats = run(search, db)
+    assert len(asked) == first and stats["searched"] == 0
+
+    stats = run(search, db, recrawl_after=0)
+    assert stats["searched"] == first and stats["unchanged"] == first and stats["rows_changed"] == 0
+
+
+def test_failed_prefix_is_retried(tmp_path):
+    db = tmp_path / "catalog.sqlite3"
+    search, asked = site()
+    stats = run(lambda p: None if p == "B" else search(p), db, split_at=100)
+    assert stats["failed"] == 1
+    stats = run(search, db, split_at=100)
+    assert asked[-1] == "B" and stats["searched"] == 1
+    assert [r["course_code"] for r in CatalogIndex(db).search("BT100")] == ["BT100"]
+
+
+def test_changed_rows_are_updated(tmp_path):
+    db = tmp_path / "catalog.sqlite3"
+    run(site()[0], db, split_at=100)
+    renamed = [p if p[0] != "CS503" else ("CS503", "Software Engg", *p[2:]) for p in PAPERS]
+    stats = run(site(renamed)[0], db, split_at=100, recrawl_after=0)
+    assert stats["rows_changed"] == 1
+    assert CatalogIndex(db).search("CS503")[0]["course_name"] == "Software Engg"
+
+
+def test_index_filters_crawled_rows(tmp_path):
+    db = tmp_path / "catalog.sqlite3"
+    run(site()[0], db, split_at=100)
+    index = CatalogIndex(db)
+    assert [r["year"] for r in index.search("AB101", exam_type="EST")] == ["2022"]
+    assert [r["course_code"] for r in index.search("A", by="prefix", years=(2021, None))] == ["AB101", "AB101", "AE300"]
+    assert [r["course_code"] for r in index.search("biolgy", by="name")] == ["AB101", "AB101"]
@@ -0,0 +1,14 @@
+import requests
+
+from downloads import DownloadJob, download_many
+
+
+def test_failing_on_result_does_not_abort_the_batch(replica, tmp_path):
+    jobs = [DownloadJob(f"{replica.url}/papers/UCS503-{i}.pdf", tmp_path / f"{i}.pdf") for i in range(3)]
+
+    def on_result(res):
+        raise RuntimeError("merge step exploded")
+
+    report = download_many(requests.Session(), jobs, rate_per_host=0, on_result=on_result)
+    assert report.done == 3
+    assert all(job.dest.exists() for job in jobs)
@@ -0,0 +1,59 @@
+import io
+import queue
+import zipfile
+
+import requests
+
+import export
+import papers
+from downloads import DownloadJob, DownloadResult
+from http_search import HttpSearchEngine
+
+
+def search(replica):
+    return HttpSearchEngine(replica.url).search(True, "UCS503")
+
+
+def entries(exp):
+    with zipfile.ZipFile(io.BytesIO(b"".join(exp.chunks))) as zf:
+        assert zf.testzip() is None
+        return {name: zf.read(name) for name in zf.namelist()}
+
+
+def test_zip_lists_a_duplicated_paper_once(replica, monkeypatch):
+    # One worker: the copy is fetched only after the first one landed (and may already be streamed)
+    download_many = export.download_many
+    monkeypatch.setattr(export, "download_many", lambda *a, **kw: download_many(*a, workers=1, **kw))
+    records = search(replica)
+    exp = export.export_zip(records + [dict(records[0])], requests.Session(), "UCS503")
+    body = b"".join(exp.chunks)
+    with zipfile.ZipFile(io.BytesIO(body)) as zf:
+        assert len(zf.namelist()) == 3
+    files = entries(export.Export(exp.filename, exp.media_type, iter([body])))
+    assert "FAILED.txt" not in files
+    assert all(data.startswith(b"%PDF-") for data in files.values())
+
+
+def test_different_papers_with_the_same_name_are_both_kept(tmp_path):
+    first = {"course_code": "UCS503", "course_name": "Software Engineering", "year": "2023", "semester": "ODD",
+             "exam_type": "EST", "download_href": "https://example.org/a.pdf"}
+    second = dict(first, download_href="https://example.org/b.pdf")
+    jobs = papers.plan_downloads([first, second, dict(first)], tmp_path)["UCS503__Software_Engineering"]
+    assert [(j.url, j.dest.name) for j in jobs] == [
+        ("https://example.org/a.pdf", "UCS503_Software_Engineering_2023_ODD_EST.pdf"),
+        ("https://example.org/b.pdf", "UCS503_Software_Engineering_2023_ODD_EST_2.pdf")]
+
+
+def test_missing_file_goes_to_failed_list(tmp_path):
+    scratch = export._Scratch(users=1)
+    present = scratch.path / "a.pdf"
+    present.write_bytes(b"%PDF-1.4 a")
+    gone = scratch.path / "b.pdf"
+    landed = queue.Queue()
+    for dest in (gone, present):
+        landed.put(DownloadResult(DownloadJob(f"http://example.invalid/{dest.name}", dest, {}), True))
+    landed.put(None)
+    exp = export.Export("x.zip", "application/zip", export._zip_stream(scratch.path, landed, scratch))
+    files = entries(exp)
+    assert files["a.pdf"] == b"%PDF-1.4 a"
+    assert files["FAILED.txt"].decode().startswith("b.pdf\thttp://example.invalid/b.pdf\tFileNotFoundError")
@@ -0,0 +1,92 @@
+import pytest
+
+from http_search import HttpSearchEngine, HttpSearchError, parse_results_html
+
+SCRIPTED_RESULTS = "<div id='app'></div><script>loadResults()</script>"
+
+
+def test_discover_finds_search_form(replica):
+    engine = HttpSearchEngine(replica.url)
+    engine.discover()
+    assert engine.search_url == replica.url + "/oldpapers/"
+    assert engine._form.method == "post"
+
+
+def test_payload_submits_only_the_button_after_the_field(replica):
+    engine = HttpSearchEngine(replica.url)
+    engine.discover()
+    viewstate = ("__VIEWSTATE", "dDwtMTI3OTMzNDM4NDs7Pg==")
+    assert engine._payload(engine._form, True, "UCS503") == [
+        viewstate, ("ccode", "UCS503"), ("cname", ""), ("btnCode", "Submit")]
+    assert engine._payload(engine._form, False, "Data Structures") == [
+        viewstate, ("ccode", ""), ("cname", "Data Structures"), ("btnName", "Submit")]
+
+
+def test_search_returns_records_with_absolute_links(replica):
+    records = HttpSearchEngine(replica.url).search(True, "UCS503")
+    assert len(records) == 3
+    assert records[0]["course_code"] == "UCS503"
+    assert records[0]["exam_type"] == "MST"
+    assert records[0]["download_href"] == replica.url + "/papers/UCS503-0.pdf"
+
+
+def test_records_from_tables_skips_headers_and_short_rows():
+    html = """<table><tr><td>layout</td></tr><tr><td>
+      <table>
+        <tr><th>Code</th><th>Name</th><th>Year</th><th>Sem</th><th>Type</th></tr>
+        <tr><td>Course Code</td><td>x</td><td>x</td><td>x</td><td>x</td></tr>
+        <tr><td>UCS503</td><td>Software<br>Engineering</td><td>2023</td><td>ODD</td><td>EST</td>
+            <td><a href="files/a.pdf">View</a> <a href="files/b.pdf">Download</a></td></tr>
+        <tr><td>only</td><td>four</td><td>cells</td><td>here</td></tr>
+      </table>
+    </td></tr></table>"""
+    assert parse_results_html(html, "https://example.org/papers/") == [{
+        "course_code": "UCS503", "course_name": "Software Engineering", "year": "2023", "semester": "ODD",
+        "exam_type": "EST", "download_href": "https://example.org/papers/files/b.pdf"}]
+
+
+def test_no_results_is_an_empty_list(replica):
+    replica.rows = 0
+    assert HttpSearchEngine(replica.url).search(True, "XYZ999") == []
+
+
+def test_unrecognised_results_page_raises(replica):
+    replica.templates["results"] = SCRIPTED_RESULTS
+    with pytest.raises(HttpSearchError, match="not recognised"):
+        HttpSearchEngine(replica.url).search(True, "UCS503")
+    # Rediscovered and retried once before giving up
+    assert replica.stats["searches"] == 2
+
+
+def test_missing_papers_link_raises(replica):
+    replica.templates["home"] = "<html><body><a href='/x'>Elsewhere</a></body></html>"
+    with pytest.raises(HttpSearchError, match="link not found"):
+        HttpSearchEngine(replica.url).search(True, "UCS503")
+
+
+def test_search_live_falls_back_to_selenium(replica, monkeypatch):
+    import contextlib
+    import papers
+    import tiet_papers_downloader as tpd
+
+    replica.templates["results"] = SCRIPTED_RESULTS
+    monkeypatch.setattr(papers, "default_engine", lambda: HttpSearchEngine(replica.url))
+    driver = object()
+    fallback = [{"course_code": "UCS503"}]
+    monkeypatch.setattr(tpd, "search_records", lambda d, by_code, query: fallback if d is driver else None)
+    monkeypatch.setattr(tpd, "requests_session_from_driver", lambda d: "driver-session")
+
+    records, session = papers.search_live(True, "UCS503", "http", checkout=lambda: contextlib.nullcontext(driver))
+    assert (records, session) == (fallback, "driver-session")
+
+
+def test_no_results_does_not_fall_back(replica, monkeypatch):
+    import papers
+    replica.rows = 0
+    monkeypatch.setattr(papers, "default_engine", lambda: HttpSearchEngine(replica.url))
+
+    def no_browser():
+        raise AssertionError("Selenium fallback used for an empty result")
+
+    records, _ = papers.search_live(True, "XYZ999", "http", checkout=no_browser)
+    assert records == []
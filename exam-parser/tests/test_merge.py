@@ -0,0 +1,117 @@
+import pathlib
+
+from downloads import DownloadJob
+from merge import MergePipeline
+from replica import synthetic_pdf
+
+BAD_PDF = b"%PDF-1.4\nthis is not a readable document\n%%EOF\n"
+
+
+def make_group(tmp_path: pathlib.Path, contents):
+    jobs = []
+    for i, data in enumerate(contents):
+        dest = tmp_path / f"paper{i}.pdf"
+        dest.write_bytes(data)
+        jobs.append(DownloadJob(f"http://example.invalid/{i}.pdf", dest,
+                                {"year": str(2020 + i), "semester": "ODD", "exam_type": "MST"}))
+    return jobs
+
+
+def test_incremental_merge_writes_all_sources(tmp_path):
+    jobs = make_group(tmp_path, [synthetic_pdf(1, 1), synthetic_pdf(2, 1)])
+    dest = tmp_path / "merged.pdf"
+    events = []
+    pipeline = MergePipeline({"K": jobs}, {"K": dest}, processes=0, on_event=lambda n, d: events.append((n, d)))
+    for job in reversed(jobs):
+        pipeline.landed(job.dest, True)
+    assert pipeline.wait() == {"K": dest}
+    assert events == [("merge_done", {"file": "merged.pdf", "sources": 2, "pages": 3, "reused": 0})]
+    assert not any(job.dest.exists() for job in jobs)
+
+
+def test_unreadable_source_fails_only_its_group(tmp_path, capsys):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    broken = make_group(tmp_path / "a", [synthetic_pdf(1, 1), BAD_PDF, synthetic_pdf(1, 1)])
+    fine = make_group(tmp_path / "b", [synthetic_pdf(1, 1), synthetic_pdf(1, 1)])
+    dests = {"A": tmp_path / "A.pdf", "B": tmp_path / "B.pdf"}
+    pipeline = MergePipeline({"A": broken, "B": fine}, dests, processes=0)
+    for job in broken + fine:
+        pipeline.landed(job.dest, True)  # must not raise on the download thread
+    assert pipeline.wait() == {"B": dests["B"]}
+    assert not dests["A"].exists()
+    assert all(job.dest.exists() for job in broken)  # sources of a failed merge are kept
+    assert "Merging A failed" in capsys.readouterr().out
+
+
+def run_pipeline(tmp_path, name, contents, cache):
+    (tmp_path / name).mkdir()
+    jobs = make_group(tmp_path / name, contents)
+    dest = tmp_path / name / "merged.pdf"
+    events = []
+    pipeline = MergePipeline({"K": jobs}, {"K": dest}, processes=0, cache=cache,
+                             on_event=lambda n, d: events.append(d))
+    for job in jobs:
+        pipeline.landed(job.dest, True)
+    pipeline.wait()
+    return dest, events
+
+
+def count_appends(monkeypatch):
+    from PyPDF2 import PdfMerger
+    calls = []
+    original = PdfMerger.append
+
+    def append(self, fileobj, *args, **kwargs):
+        calls.append(pathlib.Path(fileobj).name)
+        return original(self, fileobj, *args, **kwargs)
+    monkeypatch.setattr(PdfMerger, "append", append)
+    return calls
+
+
+def test_cached_merge_is_not_reparsed(tmp_path, monkeypatch):
+    from merged_cache import MergedCache
+    cache = MergedCache(tmp_path / "cache")
+    papers = [synthetic_pdf(1, 1), synthetic_pdf(2, 1)]
+    run_pipeline(tmp_path, "first", papers, cache)
+
+    calls = count_appends(monkeypatch)
+    dest, events = run_pipeline(tmp_path, "again", papers, cache)
+    assert calls == []
+    assert events == [{"file": "merged.pdf", "sources": 2, "pages": 3, "reused": 2}]
+    assert dest.exists()
+
+
+def test_cached_prefix_appends_only_new_sources(tmp_path, monkeypatch):
+    from merged_cache import MergedCache
+    cache = MergedCache(tmp_path / "cache")
+    papers = [synthetic_pdf(1, 1), synthetic_pdf(2, 1)]
+    run_pipeline(tmp_path, "first", papers, cache)
+
+    calls = count_appends(monkeypatch)
+    dest, events = run_pipeline(tmp_path, "grown", papers + [synthetic_pdf(3, 1)], cache)
+    assert len(calls) == 2 and calls[1] == "paper2.pdf"  # the cached merge, then the new paper
+    assert events == [{"file": "merged.pdf", "sources": 3, "pages": 6, "reused": 2}]
+
+
+def test_single_paper_course_gets_its_merged_file(tmp_path):
+    jobs = make_group(tmp_path, [synthetic_pdf(2, 1), BAD_PDF])
+    dest = tmp_path / "merged.pdf"
+    events = []
+    pipeline = MergePipeline({"K": jobs}, {"K": dest}, processes=0, on_event=lambda n, d: events.append(d))
+    pipeline.landed(jobs[0].dest, True)
+    pipeline.landed(jobs[1].dest, False)  # the other download failed
+    assert pipeline.wait() == {"K": dest}
+    assert dest.read_bytes() == synthetic_pdf(2, 1)
+    assert events == [{"file": "merged.pdf", "sources": 1, "pages": 2, "reused": 0}]
+
+
+def test_export_of_a_single_paper_course_is_that_pdf(replica):
+    import requests
+    import export
+    from http_search import HttpSearchEngine
+    replica.rows = 1
+    records = HttpSearchEngine(replica.url).search(True, "UCS503")
+    exp = export.export_merged(records, requests.Session(), "UCS503")
+    assert exp is not None and exp.media_type == "application/pdf"
+    assert b"".join(exp.chunks).startswith(b"%PDF-")
@@ -0,0 +1,95 @@
+import requests
+
+from pdf_cache import PdfCache
+from replica import synthetic_pdf
+
+
+def paper_url(replica, n):
+    return f"{replica.url}/papers/UCS503-{n}.pdf"
+
+
+def test_etag_entry_is_revalidated_with_a_conditional_get(range_server, tmp_path):
+    cache = PdfCache(tmp_path / "cache")
+    session = requests.Session()
+    assert cache.fetch(session, range_server.url, tmp_path / "a.pdf") == (len(range_server.body), False)
+    assert cache.fetch(session, range_server.url, tmp_path / "b.pdf") == (0, True)
+    assert range_server.requests[-1]["If-None-Match"] == '"v1"'
+    assert (tmp_path / "b.pdf").read_bytes() == range_server.body
+    assert cache.stats["revalidated"] == 1 and cache.stats["hits"] == 1
+
+
+def test_changed_file_replaces_the_cached_copy(range_server, tmp_path):
+    cache = PdfCache(tmp_path / "cache")
+    session = requests.Session()
+    cache.fetch(session, range_server.url, tmp_path / "a.pdf")
+    range_server.body, range_server.etag = synthetic_pdf(2, 4), '"v2"'
+    n, hit = cache.fetch(session, range_server.url, tmp_path / "b.pdf")
+    assert (n, hit) == (len(range_server.body), False)
+    assert (tmp_path / "b.pdf").read_bytes() == range_server.body
+    assert cache.stats["misses"] == 2
+
+
+def test_entry_without_validators_is_trusted_for_max_age(range_server, tmp_path):
+    range_server.etag = ""
+    session = requests.Session()
+    cache = PdfCache(tmp_path / "cache")
+    cache.fetch(session, range_server.url, tmp_path / "a.pdf")
+    assert cache.serve_fresh(range_server.url, tmp_path / "b.pdf")
+    assert len(range_server.requests) == 1
+
+    expired = PdfCache(tmp_path / "cache", max_age=0)
+    assert not expired.serve_fresh(range_server.url, tmp_path / "c.pdf")
+    assert expired.fetch(session, range_server.url, tmp_path / "c.pdf") == (len(range_server.body), False)
+    assert "If-None-Match" not in range_server.requests[-1]
+
+
+def test_least_recently_used_blob_is_evicted(replica, tmp_path):
+    size = len(replica.paper(0))
+    cache = PdfCache(tmp_path / "cache", max_bytes=2 * size)
+    session = requests.Session()
+    cache.fetch(session, paper_url(replica, 0), tmp_path / "0.pdf")
+    cache.fetch(session, paper_url(replica, 1), tmp_path / "1.pdf")
+    assert cache.fetch(session, paper_url(replica, 0), tmp_path / "0b.pdf") == (0, True)  # 0 is now newer than 1
+    cache.fetch(session, paper_url(replica, 2), tmp_path / "2.pdf")
+
+    blobs = list(cache.blob_dir.rglob("*.pdf"))
+    assert len(blobs) == 2 and sum(b.stat().st_size for b in blobs) <= cache.max_bytes
+    assert cache.stats["evictions"] == 1
+    assert cache.serve_fresh(paper_url(replica, 0), tmp_path / "x.pdf")
+    assert not cache.serve_fresh(paper_url(replica, 1), tmp_path / "y.pdf")
+    assert (tmp_path / "1.pdf").read_bytes() == replica.paper(1)  # links handed out earlier stay intact
+
+
+def evict_once(cache, monkeypatch):
+    """Delete the blob right after the lookup, as a concurrent _evict would."""
+    touch = cache._touch
+
+    def touch_then_evict(url, sha256, checked):
+        touch(url, sha256, checked)
+        monkeypatch.setattr(cache, "_touch", touch)
+        cache.blob_path(sha256).unlink()
+    monkeypatch.setattr(cache, "_touch", touch_then_evict)
+
+
+def test_blob_evicted_after_lookup_is_a_miss(replica, tmp_path, monkeypatch):
+    cache = PdfCache(tmp_path / "cache")
+    session = requests.Session()
+    url = paper_url(replica, 0)
+    cache.fetch(session, url, tmp_path / "a.pdf")
+
+    evict_once(cache, monkeypatch)
+    assert not cache.serve_fresh(url, tmp_path / "b.pdf")
+    evict_once(cache, monkeypatch)
+    assert cache.fetch(session, url, tmp_path / "b.pdf") == (len(replica.paper(0)), False)
+    assert (tmp_path / "b.pdf").read_bytes() == replica.paper(0)
+
+
+def test_blob_evicted_during_revalidation_is_fetched_again(range_server, tmp_path, monkeypatch):
+    cache = PdfCache(tmp_path / "cache")
+    session = requests.Session()
+    cache.fetch(session, range_server.url, tmp_path / "a.pdf")
+
+    evict_once(cache, monkeypatch)
+    assert cache.fetch(session, range_server.url, tmp_path / "b.pdf") == (len(range_server.body), False)
+    assert "If-None-Match" not in range_server.requests[-1]
+    assert (tmp_path / "b.pdf").read_bytes() == range_server.body
@@ -0,0 +1,82 @@
+import json
+import shutil
+import subprocess
+import time
+
+import pytest
+
+import tiet_papers_downloader as tpd
+
+pytestmark = pytest.mark.skipif(shutil.which("node") is None, reason="needs node to run the readiness script")
+
+# Just enough DOM for READINESS_JS: the page text, table rows, loading divs and stylesheets
+HARNESS = """
+const [script, page, code] = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+const element = (text, children) => ({textContent: text, querySelectorAll: () => children || []});
+globalThis.window = {};
+globalThis.document = {
+    body: {innerText: page.text},
+    styleSheets: page.sheets.map(rules => ({cssRules: {length: rules}})),
+    querySelectorAll: selector => selector === 'table tr'
+        ? page.rows.map(cells => element(cells.join(' '), cells.map(c => element(c))))
+        : page.loading.map(div => {
+            const box = div.display === 'none' ? 0 : 1;
+            return {style: div, offsetWidth: 100 * box, offsetHeight: 20 * box, getClientRects: () => Array(box)};
+        }),
+};
+globalThis.getComputedStyle = el => el.style;
+console.log(JSON.stringify(new Function(script)(code)));
+"""
+
+LOADING_TEXT = "Loading, please wait..."
+NO_RESULTS_TEXT = "Course Code Submit Course Name Submit\nNo records found"
+
+
+class NodeDriver:
+    """Stands in for a Chrome driver on a static page; every execute_script runs in node."""
+
+    def __init__(self, page):
+        self.page = page
+        self.calls = 0
+
+    def execute_script(self, script, code):
+        self.calls += 1
+        out = subprocess.run(["node", "-e", HARNESS], input=json.dumps([script, self.page, code]),
+                             capture_output=True, text=True, check=True)
+        return json.loads(out.stdout)
+
+
+def no_results_page(sheets, loading_display):
+    # The site's #loading-please-wait div sits in the page; its stylesheet normally hides it
+    text = NO_RESULTS_TEXT if loading_display == "none" else LOADING_TEXT + "\n" + NO_RESULTS_TEXT
+    return {"text": text, "rows": [], "sheets": sheets,
+            "loading": [{"display": loading_display, "visibility": "visible"}]}
+
+
+def test_lean_mode_keeps_stylesheets():
+    assert not any(pattern.endswith(".css") for pattern in tpd.LEAN_BLOCKED_URLS)
+
+
+def test_no_results_with_hidden_loading_div():
+    driver = NodeDriver(no_results_page(sheets=[12], loading_display="none"))
+    assert driver.execute_script(tpd.READINESS_JS, "XYZ999") == ["empty", 0]
+
+
+def test_no_results_without_stylesheets_is_not_stuck_loading():
+    # Unstyled, the loading div shows and its text is in innerText; it must not count as busy
+    driver = NodeDriver(no_results_page(sheets=[], loading_display="block"))
+    assert driver.execute_script(tpd.READINESS_JS, "XYZ999") == ["empty", 0]
+    t0 = time.monotonic()
+    assert tpd.wait_for_results(driver, "XYZ999", timeout=10)
+    assert time.monotonic() - t0 < 5
+
+
+def test_visible_loading_div_on_a_styled_page_is_loading():
+    driver = NodeDriver(no_results_page(sheets=[12], loading_display="block"))
+    assert driver.execute_script(tpd.READINESS_JS, "XYZ999") == ["loading", 0]
+
+
+def test_results_table_is_found():
+    page = {"text": "These results matches your search criteria", "sheets": [12], "loading": [],
+            "rows": [["UCS503", "Software Engineering", "2023", "ODD", "EST", "Download"]]}
+    assert NodeDriver(page).execute_script(tpd.READINESS_JS, "UCS503") == ["results", 1]
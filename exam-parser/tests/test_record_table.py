@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from record_table import RecordTable
+
+EXAMS = ("MST", "EST", "AUX")
+SEMESTERS = ("ODD", "EVEN", "SUMMER")
+
+
+def make_records(n, seed=7):
+    rnd = random.Random(seed)
+    codes = [f"{dept}{num}" for dept in ("UCS", "UEC", "UMA") for num in (101, 203, 503)]
+    out = []
+    for i in range(n):
+        code = rnd.choice(codes)
+        year = rnd.choice(("2019", "2020", "2021-22", "2023", "n/a"))
+        out.append({"course_code": code, "course_name": f"Course {code} part {i % 300}", "year": year,
+                    "semester": rnd.choice(SEMESTERS), "exam_type": rnd.choice(EXAMS),
+                    "download_href": f"https://example.org/qp/{code}/{i}.pdf"})
+    return out
+
+
+def year_of(rec):
+    digits = [rec["year"][i:i + 4] for i in range(len(rec["year"]) - 3) if rec["year"][i:i + 4].isdigit()]
+    return int(digits[0]) if digits else 0
+
+
+@pytest.fixture(scope="module")
+def data():
+    records = make_records(2000)
+    # select() returns rows in table order: by code, input order within a code
+    return RecordTable(records), sorted(records, key=lambda r: r["course_code"])
+
+
+QUERIES = [
+    (dict(), lambda r: True),
+    (dict(exam_type="MST"), lambda r: r["exam_type"] == "MST"),
+    (dict(exam_type=("MST", "EST"), semester="ODD"),
+     lambda r: r["exam_type"] in ("MST", "EST") and r["semester"] == "ODD"),
+    (dict(code="UCS503", semester=("EVEN", "SUMMER")),
+     lambda r: r["course_code"] == "UCS503" and r["semester"] in ("EVEN", "SUMMER")),
+    (dict(code_prefix="UE", years=(2020, 2021)),
+     lambda r: r["course_code"].startswith("UE") and 2020 <= year_of(r) <= 2021),
+    (dict(code_prefix="U", exam_type="AUX", semester="SUMMER", years=(2021, None)),
+     lambda r: r["exam_type"] == "AUX" and r["semester"] == "SUMMER" and year_of(r) >= 2021),
+    (dict(years=(None, 2019)), lambda r: year_of(r) <= 2019),
+    (dict(exam_type="NONE"), lambda r: False),
+    (dict(code="XYZ999"), lambda r: False),
+]
+
+
+@pytest.mark.parametrize("filters,pred", QUERIES, ids=[str(q[0]) for q in QUERIES])
+def test_select_matches_a_list_comprehension(data, filters, pred):
+    table, records = data
+    assert table.records(table.select(**filters)) == [r for r in records if pred(r)]
+
+
+def test_wide_columns_switch_to_int_ids(data):
+    table, records = data
+    assert len(table.name.values) > 256 and not isinstance(table.name.ids, bytearray)
+    assert table.records(table.select(exam_type="EST")) == [r for r in records if r["exam_type"] == "EST"]
+
+
+def test_codes_keep_the_given_order_and_limit_applies(data):
+    table, records = data
+    expected = [r for r in records if r["course_code"] == "UMA101"] + \
+               [r for r in records if r["course_code"] == "UCS101"]
+    assert table.records(table.select(codes=["UMA101", "UCS101"])) == expected
+    assert table.records(table.select(codes=["UMA101", "UCS101"], limit=5)) == expected[:5]
+
+
+def test_record_matches_records(data):
+    table, records = data
+    assert [table.record(i) for i in (0, 777, len(table) - 1)] == [records[i] for i in (0, 777, len(table) - 1)]
+
+
+def test_empty_table():
+    table = RecordTable([])
+    assert len(table) == 0
+    assert table.select(code_prefix="U", exam_type="MST") == []
@@ -0,0 +1,112 @@
+import pytest
+
+import metrics
+import result_cache
+from result_cache import ResultCache
+
+RECORDS = [{"course_code": "UCS503", "course_name": "Software Engineering", "year": "2023", "semester": "ODD",
+            "exam_type": "EST", "download_href": "https://example.org/a.pdf"}]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(result_cache.time, "time", c)
+    return c
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(tmp_path / "results.sqlite3", ttl=100, stale_ttl=10_000)
+
+
+def refreshes(outcome):
+    return metrics._counters.get(("tiet_result_refreshes_total", (("outcome", outcome),)), 0)
+
+
+def test_fresh_stale_and_expired_reads(cache, clock):
+    cache.put(True, "UCS503", RECORDS)
+    assert cache.get(True, " ucs503 ") == (RECORDS, True)  # keys ignore case and spacing
+    clock.now += 101
+    assert cache.get(True, "UCS503") == (RECORDS, False)
+    assert cache.has(True, "UCS503")
+    clock.now += 10_000
+    assert cache.get(True, "UCS503") is None
+    assert not cache.has(True, "UCS503")
+    assert cache.stats["hits"] == 1 and cache.stats["stale_hits"] == 1 and cache.stats["misses"] == 1
+
+
+def test_empty_result_is_trusted_briefly(cache, clock):
+    cache.put(False, "Nothing Here", [])
+    clock.now += result_cache.EMPTY_RESULT_TTL + 1
+    assert cache.get(False, "Nothing Here") == ([], False)
+
+
+def test_concurrent_refreshes_of_one_key_coalesce(cache):
+    started = []
+    cache.runner = lambda key, task: started.append((key, task))
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        return RECORDS
+    cache.refresh_async(True, "UCS503", fetch)
+    cache.refresh_async(True, "ucs503", fetch)
+    cache.refresh_async(False, "UCS503", fetch)  # a name search is another key
+    assert [key for key, _ in started] == [("code", "ucs503"), ("name", "ucs503")]
+
+    started[0][1]()
+    assert fetches == [1]
+    assert cache.get(True, "UCS503") == (RECORDS, True)
+    cache.refresh_async(True, "UCS503", fetch)  # finished, so a new refresh may start
+    assert len(started) == 3
+
+
+def test_failed_refresh_keeps_the_entry_and_frees_the_key(cache):
+    cache.put(True, "UCS503", RECORDS)
+    before = refreshes("failed")
+    started = []
+    cache.runner = lambda key, task: started.append(task)
+
+    def fetch():
+        raise RuntimeError("site down")
+    cache.refresh_async(True, "UCS503", fetch)
+    started[0]()
+    assert cache.get(True, "UCS503") == (RECORDS, True)
+    assert cache.stats["refreshes_failed"] == 1 and refreshes("failed") == before + 1
+    cache.refresh_async(True, "UCS503", fetch)
+    assert len(started) == 2
+
+
+def test_refresh_refused_by_the_runner_is_counted(cache):
+    before = refreshes("dropped")
+
+    def busy(key, task):
+        raise RuntimeError("Server is busy, try again later")
+    cache.runner = busy
+    cache.refresh_async(True, "UCS503", lambda: RECORDS)
+    assert cache.stats["refreshes_dropped"] == 1 and refreshes("dropped") == before + 1
+    # Not left marked as refreshing: the next stale hit may try again
+    started = []
+    cache.runner = lambda key, task: started.append(task)
+    cache.refresh_async(True, "UCS503", lambda: RECORDS)
+    assert len(started) == 1
+
+
+def test_default_runner_refreshes_in_a_thread(cache):
+    import threading
+    done = threading.Event()
+
+    def fetch():
+        done.set()
+        return RECORDS
+    cache.refresh_async(True, "UCS503", fetch)
+    assert done.wait(2)
@@ -0,0 +1,98 @@
+import pytest
+import requests
+
+from downloads import download_pdf
+from replica import synthetic_pdf
+from resumable import CorruptDownload, IncompleteDownload, check_pdf, fetch_part, part_path
+
+PDF = synthetic_pdf(3, 4)
+
+
+def write(tmp_path, data: bytes):
+    path = tmp_path / "paper.pdf"
+    path.write_bytes(data)
+    return path
+
+
+def test_check_pdf_accepts_complete_pdf(tmp_path):
+    check_pdf(write(tmp_path, PDF), len(PDF))
+    # Junk after %%EOF is tolerated as long as the marker is near the end
+    check_pdf(write(tmp_path, PDF + b"\n" * 1000))
+
+
+def test_check_pdf_rejects_broken_files(tmp_path):
+    with pytest.raises(CorruptDownload, match="not a PDF"):
+        check_pdf(write(tmp_path, b"<html>Service Unavailable</html>"))
+    with pytest.raises(IncompleteDownload, match="trailer missing"):
+        check_pdf(write(tmp_path, PDF[:len(PDF) // 2]))
+    with pytest.raises(IncompleteDownload, match="got"):
+        check_pdf(write(tmp_path, PDF), len(PDF) + 10)
+    with pytest.raises(CorruptDownload, match="expected"):
+        check_pdf(write(tmp_path, PDF), len(PDF) - 10)
+    with pytest.raises(IncompleteDownload):
+        check_pdf(write(tmp_path, PDF + b" " * 4096))
+
+
+def test_fresh_download_saves_validator(range_server, tmp_path):
+    part = part_path(tmp_path / "paper.pdf")
+    r, transferred = fetch_part(requests.Session(), range_server.url, part)
+    assert r.status_code == 200 and transferred == len(PDF)
+    assert part.read_bytes() == PDF
+    assert part.with_name(part.name + ".validator").read_text() == '"v1"'
+    assert "Range" not in range_server.requests[0]
+
+
+def test_broken_transfer_is_resumed_with_range(range_server, tmp_path):
+    # Large enough that whole chunks are written before the connection drops
+    range_server.body = synthetic_pdf(40, 4)
+    part = part_path(tmp_path / "paper.pdf")
+    session = requests.Session()
+    range_server.cut_after = 100000
+    with pytest.raises((requests.RequestException, IncompleteDownload)):
+        fetch_part(session, range_server.url, part)
+    kept = part.stat().st_size
+    assert 0 < kept < len(range_server.body)  # kept for the next attempt
+
+    range_server.cut_after = None
+    r, transferred = fetch_part(session, range_server.url, part)
+    assert r.status_code == 206 and transferred == len(range_server.body) - kept
+    assert part.read_bytes() == range_server.body
+    assert range_server.requests[-1]["Range"] == f"bytes={kept}-"
+    assert range_server.requests[-1]["If-Range"] == '"v1"'
+
+
+def test_server_ignoring_range_restarts_the_part(range_server, tmp_path):
+    part = part_path(tmp_path / "paper.pdf")
+    part.write_bytes(PDF[:1000])
+    range_server.honour_range = False
+    r, transferred = fetch_part(requests.Session(), range_server.url, part)
+    assert r.status_code == 200 and transferred == len(PDF)
+    assert part.read_bytes() == PDF
+
+
+def test_changed_file_is_fetched_whole_via_if_range(range_server, tmp_path):
+    part = part_path(tmp_path / "paper.pdf")
+    part.write_bytes(PDF[:1000])
+    part.with_name(part.name + ".validator").write_text('"v1"')
+    range_server.body, range_server.etag = synthetic_pdf(2, 4), '"v2"'
+    r, _ = fetch_part(requests.Session(), range_server.url, part)
+    assert r.status_code == 200
+    assert part.read_bytes() == range_server.body
+    assert part.with_name(part.name + ".validator").read_text() == '"v2"'
+
+
+def test_error_page_is_corrupt_and_discarded(range_server, tmp_path):
+    part = part_path(tmp_path / "paper.pdf")
+    range_server.body, range_server.content_type = b"<html>Please log in</html>", "text/html"
+    with pytest.raises(CorruptDownload):
+        fetch_part(requests.Session(), range_server.url, part)
+    assert not part.exists()
+
+
+def test_download_pdf_finishes_a_leftover_part(range_server, tmp_path):
+    dest = tmp_path / "paper.pdf"
+    part_path(dest).write_bytes(PDF[:2000])
+    transferred = download_pdf(requests.Session(), range_server.url, dest, progress=False)
+    assert transferred == len(PDF) - 2000
+    assert dest.read_bytes() == PDF
+    assert not part_path(dest).exists()
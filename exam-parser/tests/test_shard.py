@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+
+import papers
+import shard
+from shard import GlobalRateLimiter, ShardPool
+
+
+@pytest.fixture
+def site(replica, monkeypatch, tmp_path):
+    """Spawned workers read TIET_ROOT_URL at import, so they search the replica."""
+    monkeypatch.setenv("TIET_ROOT_URL", replica.url)
+    monkeypatch.setattr(papers, "DOWNLOAD_DIR", tmp_path / "downloads")
+    return replica
+
+
+def test_search_many_keeps_query_order_across_workers(site):
+    queries = ["UCS503", ("uec-203", "code"), "UMA101", "UCS503"]
+    records = shard.search_many(queries, workers=2, engine="http", rate=0, use_cache=False)
+    # Query order, then row order; the repeated UCS503 adds nothing new
+    assert [(r["course_code"], r["download_href"].rsplit("/", 1)[1]) for r in records] == [
+        (code, f"{code}-{i}.pdf") for code in ("UCS503", "UEC203", "UMA101") for i in range(site.rows)]
+
+
+def test_sharded_batch_reassembles_reports_in_submission_order(site):
+    queries = ["UCS503", "UEC203", "UMA101"]
+    result = shard.run_batch(queries, merge=True, engine="http", use_cache=False, workers=2, rate=0)
+    assert [c.query for c in result.courses] == queries
+    assert all(c.message.startswith("SUCCESS") for c in result.courses)
+    assert [c.report.done for c in result.courses] == [site.rows] * 3
+    assert result.files == 3 * site.rows
+    assert result.bytes == sum(c.report.bytes for c in result.courses) > 0
+    assert result.summary().startswith("SUCCESS: 3/3 course(s), 9 file(s)")
+    for code in queries:
+        assert papers.merged_path(f"{code}__Benchmark_Course").exists()
+
+
+def test_each_worker_gets_at_most_max_inflight_tasks(site):
+    with ShardPool(workers=2, engine="http", rate=0) as pool:
+        ids = [pool.submit("search", (f"UCS{n}", "code", False)) for n in range(7)]
+        pool._dispatch()
+        assert [len(tasks) for tasks in pool._inflight] == [2, 2]
+        assert len(pool._pending) == 3
+        done = [tid for tid, _, _, ok, _ in pool.completed() if ok]
+    assert sorted(done) == ids
+
+
+def test_tasks_of_a_dead_worker_fail_instead_of_hanging(site):
+    site.search_latency = 2
+    with ShardPool(workers=2, engine="http", rate=0) as pool:
+        for n in range(4):
+            pool.submit("search", (f"UCS{n}", "code", False))
+        pool._dispatch()
+        lost = set(pool._inflight[0])
+        pool._procs[0].terminate()
+        outcomes = {tid: (ok, result) for tid, _, _, ok, result in pool.completed()}
+    assert all(not outcomes[tid][0] and "worker exited" in outcomes[tid][1] for tid in lost)
+    assert all(ok for tid, (ok, _) in outcomes.items() if tid not in lost)
+    assert len(outcomes) == 4
+
+
+def test_rate_limiter_spaces_starts_across_threads():
+    limiter = GlobalRateLimiter(20)
+    starts = []
+
+    def take():
+        limiter.acquire()
+        starts.append(time.monotonic())
+    threads = [threading.Thread(target=take) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert max(starts) - min(starts) >= 4 / 20 - 0.02
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 from __future__ import annotations
-import os, re, sys, time, pathlib, requests
-from typing import List, Dict
+import os, sys, time, pathlib, requests
+from typing import List, Dict, Optional
+from contextlib import contextmanager
 from selenium import webdriver
 import urllib3
 from selenium.webdriver.common.by import By
@@ -10,21 +11,70 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
-from tqdm import tqdm
 from selenium.webdriver.common.keys import Keys
+from selenium.common.exceptions import WebDriverException
+from http_search import parse_results_html
+from downloads import download_pdf  # noqa: F401 (re-exported for existing callers)
+from papers import (ROOT_URL, DOWNLOAD_DIR, SEARCH_ENGINE, normalize_course_code,  # noqa: F401 (re-exported)
+                    normalize_filename, download_records, search_live, run_search, run_batch, read_batch_file)
+import catalog
+import metrics
+from pdf_cache import CACHE_DIR
 
 
-ROOT_URL = "https://cl.thapar.edu"
 OLD_PAPERS_PARTIAL_LINK = "Old Question Papers"
-# Download to user's Downloads folder
-DOWNLOAD_DIR = pathlib.Path.home() / "Downloads" / "ThaparPapers"
 HEADLESS = True  # set False to watch the browser
+# Lean mode: skip images, fonts and off-site requests; return from get() at DOMContentLoaded.
+# Stylesheets still load: the site hides its loading indicator with CSS, so the readiness check needs them.
+LEAN_DRIVER = os.environ.get("TIET_LEAN_DRIVER", "1") != "0"
+# Hosts the browser may still resolve in lean mode (everything else fails DNS instantly)
+LEAN_ALLOWED_HOSTS = os.environ.get("TIET_LEAN_ALLOWED_HOSTS", "thapar.edu,*.thapar.edu").split(",")
+LEAN_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*facebook.net*",
+]
+CHROMEDRIVER_PATH_FILE = CACHE_DIR / "chromedriver_path.txt"
+_chromedriver_path = None
+
+def chromedriver_path(refresh: bool = False) -> str:
+    """
+    Resolve chromedriver once and remember it (in memory and on disk), since
+    ChromeDriverManager().install() checks for updates over the network on every call.
+    CHROMEDRIVER overrides the lookup.
+    """
+    global _chromedriver_path
+    if os.environ.get("CHROMEDRIVER"):
+        return os.environ["CHROMEDRIVER"]
+    if not refresh:
+        if _chromedriver_path and os.path.exists(_chromedriver_path):
+            return _chromedriver_path
+        try:
+            cached = CHROMEDRIVER_PATH_FILE.read_text().strip()
+            if cached and os.path.exists(cached):
+                _chromedriver_path = cached
+                return cached
+        except OSError:
+            pass
+    _chromedriver_path = ChromeDriverManager().install()
+    try:
+        CHROMEDRIVER_PATH_FILE.parent.mkdir(parents=True, exist_ok=True)
+        CHROMEDRIVER_PATH_FILE.write_text(_chromedriver_path)
+    except OSError:
+        pass
+    return _chromedriver_path
 
-def make_driver(download_dir: pathlib.Path, headless: bool = True) -> webdriver.Chrome:
+def make_driver(download_dir: pathlib.Path, headless: bool = True, lean: bool = LEAN_DRIVER) -> webdriver.Chrome:
     download_dir.mkdir(parents=True, exist_ok=True)
     opts = Options()
     if headless:
         opts.add_argument("--headless=new")
+    if lean:
+        opts.page_load_strategy = "eager"
+        rules = ["MAP * ~NOTFOUND"] + [f"EXCLUDE {h.strip()}" for h in LEAN_ALLOWED_HOSTS if h.strip()]
+        opts.add_argument("--host-resolver-rules=" + ", ".join(rules))
+        opts.add_argument("--blink-settings=imagesEnabled=false")
     
     # GPU and rendering fixes
     opts.add_argument("--disable-gpu")
@@ -52,96 +102,118 @@ def make_driver(download_dir: pathlib.Path, headless: bool = True) -> webdriver.
     opts.add_argument('--disable-features=VizDisplayCompositor')
     
     opts.add_experimental_option("excludeSwitches", ["enable-logging"])
-    opts.add_experimental_option("prefs", {
+    prefs = {
         "download.default_directory": str(download_dir),
         "download.prompt_for_download": False,
         "download.directory_upgrade": True,
         "safebrowsing.enabled": True,
-    })
-    drv = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()), options=opts)
+    }
+    if lean:
+        # --disable-images is ignored by current headless Chrome; content settings are not
+        prefs["profile.managed_default_content_settings.images"] = 2
+        prefs["profile.managed_default_content_settings.fonts"] = 2
+    opts.add_experimental_option("prefs", prefs)
+    with metrics.span("driver_start", lean=lean):
+        try:
+            drv = webdriver.Chrome(service=ChromeService(chromedriver_path()), options=opts)
+        except WebDriverException:
+            # A remembered chromedriver may no longer match an updated Chrome
+            drv = webdriver.Chrome(service=ChromeService(chromedriver_path(refresh=True)), options=opts)
     try:
         drv.execute_cdp_cmd("Page.setDownloadBehavior",
                             {"behavior": "allow", "downloadPath": str(download_dir)})
     except Exception:
         pass
+    if lean:
+        try:
+            drv.execute_cdp_cmd("Network.enable", {})
+            drv.execute_cdp_cmd("Network.setBlockedURLs", {"urls": LEAN_BLOCKED_URLS})
+        except Exception as e:
+            print(f"Could not block page assets: {e}")
     return drv
 
-def normalize_course_code(course_code: str) -> str:
-    """
-    Normalize course code to handle different formats:
-    - Remove hyphens and spaces
-    - Convert to uppercase
-    - Examples: 'ucs503' -> 'UCS503', 'ucs-503' -> 'UCS503', 'UCS-530' -> 'UCS530'
-    """
-    if not course_code:
-        return ""
-    
-    # Remove hyphens, spaces, and convert to uppercase
-    normalized = course_code.replace('-', '').replace(' ', '').upper()
-    return normalized
+# Snapshot of the page used by the readiness checks: [has results, has no-results message, data rows, first row]
+PAGE_STATE_JS = """
+const pageState = code => {
+    const text = (document.body && document.body.innerText) || '';
+    let dataRows = 0, codeRow = false, first = '';
+    for (const tr of document.querySelectorAll('table tr')) {
+        const tds = tr.querySelectorAll('td');
+        if (!tds.length) continue;
+        if (!dataRows) first = (tr.textContent || '').trim();
+        dataRows++;
+        if (code && (tds[0].textContent || '').trim() === code) codeRow = true;
+    }
+    const results = text.includes('These results matches your search criteria') || codeRow || dataRows > 1;
+    const empty = /no (results|records?|data)( found)?|not found/i.test(text);
+    return [results, empty, dataRows, first];
+};
+"""
+
+# Recorded on the document just before submitting, so a page that already had a table or message
+# (AJAX forms update in place) only counts once that content changes.
+MARK_SUBMITTED_JS = PAGE_STATE_JS + "window.__tietBefore = pageState(arguments[0]);"
+
+# One round trip per poll: [state, data rows] where state is loading / results / empty / '' (pending)
+READINESS_JS = PAGE_STATE_JS + """
+const [results, empty, dataRows, first] = pageState(arguments[0]);
+const before = window.__tietBefore;
+const changed = !before || before[2] !== dataRows || before[3] !== first;
+// Without its stylesheet a page can't hide its loading indicator, so it would look busy forever
+const styled = [...document.styleSheets].some(s => { try { return s.cssRules.length > 0; } catch (e) { return true; } });
+const visible = el => {
+    const style = getComputedStyle(el);
+    return style.display !== 'none' && style.visibility !== 'hidden'
+        && !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+};
+const loading = styled && ([...document.querySelectorAll("div[class*='loading'], div[id*='loading']")].some(visible)
+    || /(^|\\n)\\s*(loading|please wait)/i.test((document.body && document.body.innerText) || ''));
+if (results && changed) return ['results', dataRows];
+if (loading) return ['loading', dataRows];
+if (empty && (!before || !before[1])) return ['empty', dataRows];
+return ['', dataRows];
+"""
+
+def mark_submitted(driver, query_text: str = ""):
+    """Tag the current document so readiness checks can tell new content from what was there before."""
+    try:
+        driver.execute_script(MARK_SUBMITTED_JS, query_text)
+    except Exception:
+        pass
 
-def wait_for_results(driver, query_text: str, timeout=12):
+def wait_for_results(driver, query_text: str, timeout=12, settle=0.15) -> bool:
     """
-    Wait for either the results header OR at least one data row.
-    Also tries to wait for a row containing the query (for code searches).
+    Wait until the page shows results (banner, a row for the query, or a data table) or an explicit
+    no-results message, and the number of rows has stopped changing for `settle` seconds.
+    Polls with a short interval that backs off from 50 ms to 400 ms; returns False on timeout.
     """
     print(f"Waiting for results with query: '{query_text}'")
-    
-    banner = (By.XPATH, "//*[contains(., 'These results matches your search criteria')]")
-    table_row = (By.XPATH, "//table//tr[td]")
-    code_row = (By.XPATH, f"//table//tr[td and normalize-space(td[1])='{query_text}']")
-    
-    # Also wait for any loading indicators to disappear
-    loading_indicators = [
-        "//div[contains(@class, 'loading')]",
-        "//div[contains(@id, 'loading')]",
-        "//*[contains(text(), 'Loading')]",
-        "//*[contains(text(), 'Please wait')]"
-    ]
-    
-    try:
-        # First wait for loading indicators to disappear
-        for indicator in loading_indicators:
-            try:
-                WebDriverWait(driver, 5).until_not(
-                    EC.presence_of_element_located((By.XPATH, indicator))
-                )
-            except:
-                pass  # Loading indicator might not exist, that's fine
-        
-        # Then wait for actual results
-        result = WebDriverWait(driver, timeout).until(
-            lambda d: (
-                d.find_elements(*banner) or 
-                d.find_elements(*code_row) or 
-                len(d.find_elements(*table_row)) > 1
-            )
-        )
-        
-        # Debug: print what we found
-        if driver.find_elements(*banner):
-            print("Found results banner")
-        if driver.find_elements(*code_row):
-            print(f"Found specific course code row for: {query_text}")
-        if len(driver.find_elements(*table_row)) > 1:
-            print(f"Found {len(driver.find_elements(*table_row))} table rows")
-            
-        return True
-        
-    except Exception as e:
-        print(f"Timeout waiting for results: {e}")
-        # Debug: print current page state
+    deadline = time.monotonic() + timeout
+    interval = 0.05
+    last = None
+    stable_since = None
+    state = ""
+    while time.monotonic() < deadline:
         try:
-            page_source = driver.page_source
-            if "no results" in page_source.lower() or "no data" in page_source.lower():
-                print("Page indicates no results found")
-            elif "error" in page_source.lower():
-                print("Page shows an error")
-            else:
-                print("Page loaded but no clear results indicator found")
-        except:
-            pass
-        return False
+            state, rows = driver.execute_script(READINESS_JS, query_text)
+        except Exception:
+            state, rows = "", -1  # page is navigating
+        if state in {"results", "empty"}:
+            now = time.monotonic()
+            if (state, rows) != last:
+                last, stable_since = (state, rows), now
+            elif now - stable_since >= settle:
+                print("Found results" if state == "results" else "Page indicates no results found")
+                if state == "results":
+                    print(f"Found {rows} table rows")
+                return True
+            time.sleep(0.05)
+            continue
+        last = None
+        time.sleep(interval)
+        interval = min(interval * 1.5, 0.4)
+    print(f"Timeout waiting for results (last state: {state or 'pending'})")
+    return False
 
 # ...existing code...
 
@@ -151,23 +223,29 @@ def wait_present(driver, by, selector, timeout=30):
 
 def fill_and_submit(input_el, text: str):
     print(f"Filling input with: '{text}'")
-    
+    driver = input_el.parent
+
     # Make sure focus is on the input and we overwrite anything present
     input_el.click()
-    time.sleep(0.5)  # Small delay to ensure focus
-    
     input_el.send_keys(Keys.CONTROL, "a")
     input_el.send_keys(Keys.DELETE)
-    time.sleep(0.2)  # Small delay after clearing
-    
     input_el.send_keys(text)
-    time.sleep(0.5)  # Small delay after typing
-
-    # Try Enter first (many forms wire Enter to submit)
+    # Confirm the field holds exactly the query instead of sleeping after each step
+    try:
+        WebDriverWait(driver, 2, poll_frequency=0.05).until(
+            lambda d: (input_el.get_attribute("value") or "") == text)
+    except Exception:
+        print("Input value did not match the query; setting it directly")
+        driver.execute_script(
+            "arguments[0].value = arguments[1];"
+            "arguments[0].dispatchEvent(new Event('input', {bubbles: true}));"
+            "arguments[0].dispatchEvent(new Event('change', {bubbles: true}));", input_el, text)
+    mark_submitted(driver, text)
+
+    # Try Enter first (many forms wire Enter to submit); wait_for_results() detects the outcome
     try:
         print("Trying to submit with Enter key...")
         input_el.send_keys(Keys.ENTER)
-        time.sleep(1)  # Wait a moment for form submission
         return
     except Exception as e:
         print(f"Enter key submission failed: {e}")
@@ -181,30 +259,24 @@ def fill_and_submit(input_el, text: str):
             ".//input[@type='submit' or contains(translate(@value,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'submit')]"
             "|.//button[@type='submit' or contains(translate(.,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'submit')]"
         )
-        WebDriverWait(input_el.parent, 10).until(EC.element_to_be_clickable(submit))
+        WebDriverWait(driver, 10, poll_frequency=0.05).until(EC.element_to_be_clickable(submit))
         submit.click()
-        time.sleep(1)  # Wait for form submission
     except Exception as e:
         print(f"Form submit button failed: {e}")
         # Last resort: first submit/button on page
         try:
             print("Looking for any submit button on page...")
-            btn = WebDriverWait(input_el.parent, 10).until(EC.element_to_be_clickable((
+            btn = WebDriverWait(driver, 10, poll_frequency=0.05).until(EC.element_to_be_clickable((
                 By.XPATH,
                 "(//input[@type='submit' or contains(translate(@value,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'submit')]"
                 "|//button[@type='submit' or contains(translate(.,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'submit')])[1]"
             )))
             btn.click()
-            time.sleep(1)  # Wait for form submission
         except Exception as e2:
             print(f"All submit methods failed: {e2}")
             raise RuntimeError("Could not submit the search form")
 
 
-def normalize_filename(t: str) -> str:
-    t = re.sub(r"[^\w\s.-]", "", t).strip()
-    return re.sub(r"\s+", "_", t) or "file"
-
 def collect_results_rows(driver):
     print("Collecting results from page...")
     tables = driver.find_elements(By.XPATH, "//table")
@@ -258,6 +330,45 @@ def row_to_record(row) -> Dict[str, str]:
             break
     return rec
 
+# Extracts every result row in one round trip; same selection rules as collect_results_rows()/row_to_record()
+RESULTS_TABLE_JS = """
+const clean = el => (el.innerText || el.textContent || '').trim();
+for (const tbl of document.querySelectorAll('table')) {
+    const rows = tbl.querySelectorAll('tr');
+    if (rows.length < 2) continue;
+    const out = [];
+    for (let i = 1; i < rows.length; i++) {
+        const tds = rows[i].querySelectorAll('td');
+        if (tds.length < 5) continue;
+        const first = clean(tds[0]);
+        if (['course code', 'course_code'].includes(first.toLowerCase())) continue;
+        let href = '';
+        for (const a of rows[i].querySelectorAll('a')) {
+            if (clean(a).toLowerCase() === 'download') { href = a.href || ''; break; }
+        }
+        out.push([first, clean(tds[1]), clean(tds[2]), clean(tds[3]), clean(tds[4]), href]);
+    }
+    if (out.length) return out;
+}
+return [];
+"""
+
+def collect_records(driver) -> List[Dict[str, str]]:
+    """
+    Fast equivalent of [row_to_record(r) for r in collect_results_rows(driver)].
+    Uses a single execute_script call instead of one WebDriver call per cell,
+    falling back to parsing page_source if scripting fails.
+    """
+    try:
+        rows = driver.execute_script(RESULTS_TABLE_JS)
+        records = [dict(zip(("course_code", "course_name", "year", "semester", "exam_type", "download_href"),
+                            row)) for row in rows]
+    except Exception as e:
+        print(f"Script extraction failed, parsing page source instead: {e}")
+        records = parse_results_html(driver.page_source, driver.current_url)
+    print(f"Total valid rows collected: {len(records)}")
+    return records
+
 def pick_indices(n: int) -> List[int]:
     while True:
         raw = input("\nSelect items (e.g., 1,3-5) or 'a' for all: ").strip().lower()
@@ -295,17 +406,6 @@ def requests_session_from_driver(driver) -> requests.Session:
     return s
 
 
-def download_pdf(session: requests.Session, url: str, dest: pathlib.Path):
-    with session.get(url, stream=True, timeout=60) as r:
-        r.raise_for_status()
-        total = int(r.headers.get("Content-Length", 0))
-        with open(dest, "wb") as f, tqdm(total=total or None, unit="B", unit_scale=True,
-                                         desc=dest.name, leave=False) as pbar:
-            for chunk in r.iter_content(65536):
-                if chunk:
-                    f.write(chunk)
-                    if total: pbar.update(len(chunk))
-
 # ---------- NEW: robust open & input finders ----------
 
 def open_old_papers(driver):
@@ -395,21 +495,146 @@ def click_following_submit(inp):
         inp.send_keys(Keys.ENTER)
 
 
-# ---------- main ----------
+# ---------- search & download ----------
 
-def main():
+def open_search_page(driver):
+    """Load the home page and navigate to the Old Question Papers search form."""
+    with metrics.span("home_page"):
+        driver.get(ROOT_URL)
+    with metrics.span("open_old_papers"):
+        open_old_papers(driver)
+        WebDriverWait(driver, 30).until(
+            lambda d: (find_course_code_input(d) is not None) or (find_course_name_input(d) is not None)
+        )
+
+def search_records(driver, by_code: bool, query: str, timings: Optional[Dict[str, float]] = None):
+    """
+    Submit a search on an already-open search page and return the result records.
+    Returns None if the results never loaded, or an empty list if nothing matched.
+    Per-phase seconds (find_input, submit, wait, extract) are stored in `timings` if given.
+    """
+    timings = {} if timings is None else timings
+    t0 = time.perf_counter()
+    if by_code:
+        inp = find_course_code_input(driver)
+        if not inp:
+            raise RuntimeError("Couldn't locate the Course Code input.")
+    else:
+        inp = find_course_name_input(driver)
+        if not inp:
+            raise RuntimeError("Couldn't locate the Course Name input.")
+    t1 = time.perf_counter()
+    fill_and_submit(inp, query)
+    t2 = time.perf_counter()
+
+    # Wait for search results to load
+    print(f"Waiting for search results for: {query}")
+    loaded = wait_for_results(driver, query, timeout=20)
+    t3 = time.perf_counter()
+    records = collect_records(driver) if loaded else None
+    t4 = time.perf_counter()
+    timings.update(find_input=t1 - t0, submit=t2 - t1, wait=t3 - t2, extract=t4 - t3)
+    for phase, start, end in (("find_input", t0, t1), ("submit", t1, t2), ("results_wait", t2, t3),
+                              ("extract", t3, t4)):
+        metrics.record(phase, end - start, start)
+    print("Search timing: " + ", ".join(f"{k} {v:.2f}s" for k, v in timings.items()))
+    return records
+
+@contextmanager
+def new_driver():
+    """A one-off driver already on the search page; quit on exit."""
     driver = make_driver(DOWNLOAD_DIR, HEADLESS)
-    driver.get(ROOT_URL)
-    open_old_papers(driver)
-    WebDriverWait(driver, 30).until(
-        lambda d: (find_course_code_input(d) is not None) or (find_course_name_input(d) is not None)
-    )
+    try:
+        open_search_page(driver)
+        yield driver
+    finally:
+        driver.quit()
+
+class DriverSession:
+    """
+    Reuses one driver for many searches: checkout() returns it to the search page
+    between uses instead of launching a new browser each time.
+    """
+    def __init__(self):
+        self.driver = None
+        self.search_url = None
+
+    @contextmanager
+    def checkout(self):
+        if self.driver is None:
+            self.driver = make_driver(DOWNLOAD_DIR, HEADLESS)
+            open_search_page(self.driver)
+            self.search_url = self.driver.current_url
+        else:
+            with metrics.span("search_page_reset"):
+                self.driver.get(self.search_url)
+                WebDriverWait(self.driver, 30).until(
+                    lambda d: (find_course_code_input(d) is not None) or (find_course_name_input(d) is not None)
+                )
+        try:
+            yield self.driver
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+
+def run_crawl(engine: str = SEARCH_ENGINE, workers: int = 1):
+    """Crawl the whole catalog into the local store (resumes an interrupted crawl)."""
+    if workers > 1:
+        import shard
+        shard.crawl(workers=workers, engine=engine)
+        return
+    ds = DriverSession()
+
+    def search(prefix):
+        try:
+            return search_live(True, prefix, engine, checkout=ds.checkout)[0]
+        except Exception as e:
+            print(f"Search for prefix '{prefix}' failed: {e}")
+            return None
+
+    try:
+        catalog.crawl(search)
+    finally:
+        ds.close()
+
+
+# ---------- main ----------
 
-    import sys
+def main():
+    if sys.argv[1:2] == ["--crawl"]:
+        # --crawl [engine] [workers]
+        run_crawl(sys.argv[2].lower() if len(sys.argv) >= 3 else SEARCH_ENGINE,
+                  int(sys.argv[3]) if len(sys.argv) >= 4 else 1)
+        return
+    if sys.argv[1:2] == ["--batch"] and len(sys.argv) >= 3:
+        # --batch <file> [mergePdfs] [examFilter] [engine] [workers]
+        args = sys.argv[3:]
+        kwargs = dict(exam_filter=args[1] if len(args) >= 2 else "all",
+                      merge=len(args) >= 1 and args[0].lower() == "true",
+                      engine=args[2].lower() if len(args) >= 3 else SEARCH_ENGINE)
+        workers = int(args[3]) if len(args) >= 4 else 1
+        if workers > 1:
+            import shard
+            result = shard.run_batch(read_batch_file(sys.argv[2]), workers=workers, **kwargs)
+        else:
+            result = run_batch(read_batch_file(sys.argv[2]), **kwargs)
+        for course in result.courses:
+            print(f"  {course.query}: {course.message} (search {course.search_seconds:.2f}s, "
+                  f"download {course.download_seconds:.2f}s)")
+        return
     option = None
     value = None
     mergePdfs = False
     examFilter = "all"
+    engine = SEARCH_ENGINE
     if len(sys.argv) >= 3:
         option = sys.argv[1]
         value = sys.argv[2]
@@ -417,104 +642,47 @@ def main():
             mergePdfs = sys.argv[3].lower() == "true"
         if len(sys.argv) >= 5:
             examFilter = sys.argv[4]
+        if len(sys.argv) >= 6:
+            engine = sys.argv[5].lower()
     if option:
         by_code = option != "2"
         query = normalize_course_code(value.strip()) if by_code else value.strip()
-    else:
-        by_code = input("Enter 1 or 2: ").strip() != "2"
-        if by_code:
-            raw_input = input("Enter Course Code: ").strip()
-            query = normalize_course_code(raw_input)
-            print(f"Normalized course code: {query}")
-        else:
-            query = input("Enter Course Name (or part): ").strip()
+        # Non-interactive mode (called from backend): select all records and use provided merge setting
+        print(run_search(by_code, query, mergePdfs, examFilter, engine))
+        return
+
+    driver = make_driver(DOWNLOAD_DIR, HEADLESS)
+    try:
+        open_search_page(driver)
+        run_interactive(driver)
+    finally:
+        driver.quit()
+
+def run_interactive(driver):
+    by_code = input("Enter 1 or 2: ").strip() != "2"
     if by_code:
-        code_input = find_course_code_input(driver)
-        if not code_input:
-            raise RuntimeError("Couldn't locate the Course Code input.")
-        fill_and_submit(code_input, query)
+        raw_input = input("Enter Course Code: ").strip()
+        query = normalize_course_code(raw_input)
+        print(f"Normalized course code: {query}")
     else:
-        name_input = find_course_name_input(driver)
-        if not name_input:
-            raise RuntimeError("Couldn't locate the Course Name input.")
-        fill_and_submit(name_input, query)
+        query = input("Enter Course Name (or part): ").strip()
 
-    # Wait for search results to load
-    print(f"Waiting for search results for: {query}")
-    if not wait_for_results(driver, query, timeout=20):
+    records = search_records(driver, by_code, query)
+    if records is None:
         print("Search results did not load within timeout period.")
-        driver.quit()
         return
-
-    rows = collect_results_rows(driver)
-    if not rows:
+    if not records:
         print("No results found.")
-        driver.quit()
         return
 
-    records = []
-    for r in rows:
-        rec = row_to_record(r)
-        records.append(rec)
-
-    # Apply exam type filter if specified
-    if examFilter != "all":
-        records = [rec for rec in records if rec['exam_type'] == examFilter]
-        if not records:
-            print(f"No results found for exam type: {examFilter}")
-            driver.quit()
-            return
+    # Interactive mode: ask user for input
+    idxs = pick_indices(len(records))
+    merge_choice = input("Would you like to merge all PDFs for each course (only keep merged file)? (y/n): ").strip().lower()
 
-    # Check if running in non-interactive mode (called from backend)
-    if len(sys.argv) >= 3:
-        # Non-interactive mode: select all records and use provided merge setting
-        idxs = list(range(1, len(records) + 1))
-        merge_choice = 'y' if mergePdfs else 'n'
-    else:
-        # Interactive mode: ask user for input
-        idxs = pick_indices(len(records))
-        merge_choice = input("Would you like to merge all PDFs for each course (only keep merged file)? (y/n): ").strip().lower()
-    
     session = requests_session_from_driver(driver)
     chosen = [records[i-1] for i in idxs]
-    groups: Dict[str, List[Dict[str, str]]] = {}
-    for rec in chosen:
-        key = f"{rec['course_code']}__{normalize_filename(rec['course_name'])}"
-        groups.setdefault(key, []).append(rec)
-    
-    total = sum(1 for r in chosen if r["download_href"])
-    done = 0
-    from PyPDF2 import PdfMerger
-    for course_key, group in groups.items():
-        cdir = DOWNLOAD_DIR / course_key
-        cdir.mkdir(parents=True, exist_ok=True)
-        pdf_paths = []
-        for rec in group:
-            href = rec["download_href"]
-            if not href: continue
-            if href.startswith("/"): href = ROOT_URL.rstrip("/") + href
-            fname = f"{rec['course_code']}_{normalize_filename(rec['course_name'])}_{rec['year']}_{rec['semester']}_{rec['exam_type']}.pdf"
-            dest = cdir / fname
-            try:
-                download_pdf(session, href, dest)
-                pdf_paths.append(dest)
-                done += 1
-            except Exception:
-                pass
-        if merge_choice == 'y' and len(pdf_paths) > 1:
-            merger = PdfMerger()
-            for pdf in pdf_paths:
-                merger.append(str(pdf))
-            merged_path = cdir / f"{course_key}_merged.pdf"
-            merger.write(str(merged_path))
-            merger.close()
-            for pdf in pdf_paths:
-                try:
-                    pdf.unlink()
-                except Exception:
-                    pass
-    print(f"SUCCESS: Downloaded {done}/{total} file(s) to Downloads/ThaparPapers/")
-    driver.quit()
+    report = download_records(session, chosen, merge_choice == 'y')
+    print(f"SUCCESS: Downloaded {report.done}/{report.total} file(s) to Downloads/ThaparPapers/")
 
 if __name__ == "__main__":
     try:
@@ -8,3 +8,32 @@ export async function runPythonScript(option: string, value: string, mergePdfs:
   });
   return await res.json();
 }
+
+const STREAM_EVENTS = ["search_started", "rows_found", "record", "download_progress", "download_done", "merge_done", "done", "failed"];
+
+export function streamPythonScript(option: string, value: string, mergePdfs: boolean, examFilter: string,
+                                   onEvent: (name: string, data: any) => void) {
+  const params = new URLSearchParams({ option, value, mergePdfs: String(mergePdfs), examFilter });
+  const source = new EventSource(`http://localhost:8000/stream?${params}`);
+  let finished = false;
+  for (const name of STREAM_EVENTS) {
+    source.addEventListener(name, (e) => {
+      if (name === "done" || name === "failed") {
+        finished = true;
+        source.close();
+      }
+      onEvent(name, JSON.parse((e as MessageEvent).data));
+    });
+  }
+  // Never let the browser reconnect on its own: a new request to /stream would start another job.
+  // A refused stream (e.g. 429 when the server's queue is full) also ends up here without any event.
+  source.onerror = () => {
+    const refused = source.readyState === EventSource.CLOSED;
+    source.close();
+    if (!finished) {
+      finished = true;
+      onEvent("failed", { output: "", error: refused ? "Server is busy, try again shortly" : "Lost connection to the server" });
+    }
+  };
+  return source;
+}